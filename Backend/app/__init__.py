@@ -5,21 +5,30 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_caching import Cache
 from flasgger import Swagger
 
 # Local modules imports
-from app.logger import create_logger
+from app.logger import init_logging
+from app.metrics import init_metrics
 from app.error_handlers import register_error_handlers
+from app.ratelimit import rate_limit_key, route_cost, log_rate_limit_breach
+from app.chatgpt import init_chatgpt
+from app.passwords import init_passwords
+from app.presence import init_presence
+from app.query_profiler import init_query_profiler
 from config import Config
 
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
-limiter = Limiter(key_func=get_remote_address)
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache'})
+limiter = Limiter(
+    key_func=rate_limit_key,
+    application_limits_cost=route_cost,
+    on_breach=log_rate_limit_breach
+)
+cache = Cache()
 
 def create_app(config_class=Config):
     """
@@ -29,6 +38,10 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Create and config logger, before the extensions that log
+    init_logging(app)
+    init_metrics(app)
+
     # Initialize extensions with the app instance
     db.init_app(app)
     migrate.init_app(app, db)
@@ -38,13 +51,13 @@ def create_app(config_class=Config):
     swagger = Swagger(app)
     CORS(app, supports_credentials=True)
     register_error_handlers(app)
-
-    # Create and config logger
-    logger= create_logger()
-    app.logger = logger
+    init_chatgpt(app)
+    init_passwords(app)
+    init_presence(app)
+    init_query_profiler(app)
 
 
-    from .routes import auth, forum, snippets, chatgpt, oauth, news, profile
+    from .routes import auth, forum, snippets, chatgpt, oauth, news, profile, admin, search, uploads, metrics
 
     # Register blueprints for different application modules
     app.register_blueprint(auth.bp)     #Auth blueprints
@@ -54,5 +67,13 @@ def create_app(config_class=Config):
     app.register_blueprint(oauth.bp)    #OAuth blueprints
     app.register_blueprint(news.bp)    #News blueprints
     app.register_blueprint(profile.bp)    #Profile blueprints
+    app.register_blueprint(admin.bp)    #Admin blueprints
+    app.register_blueprint(search.bp)    #Search blueprints
+    app.register_blueprint(uploads.bp)    #Uploads blueprints
+    app.register_blueprint(metrics.bp)    #Metrics blueprints
+
+    # Register maintenance commands for the flask CLI
+    from .commands import register_commands
+    register_commands(app)
 
     return app
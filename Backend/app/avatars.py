@@ -0,0 +1,192 @@
+"""
+Profile picture processing and storage.
+
+Uploads are copied to disk in chunks while being hashed, so even a
+MAX_CONTENT_LENGTH upload is never held in memory. The image is then decoded,
+squared and resized into every size in AVATAR_SIZES, and re-encoded as WebP
+and JPEG.
+
+Files are stored under the SHA-256 of the original upload:
+
+    <UPLOAD_FOLDER>/avatars/<hash>-<size>.<webp|jpg>
+
+Identical uploads therefore share one set of files and are only processed
+once, names never collide between users, and a name always refers to the
+same content, so the files can be cached forever. ``User.profile_picture``
+holds ``avatars/<hash>``; older rows hold a plain file name, served as is
+for every size.
+
+The raw upload and the variants being written live in ``<UPLOAD_FOLDER>/.tmp``
+until they are complete. It is on the same filesystem, so moving a finished
+variant into place is atomic, and it is never served (see ``is_served``).
+"""
+
+# External imports
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from PIL import Image, ImageOps
+
+AVATAR_DIR = 'avatars'
+TMP_DIR = '.tmp'
+# Pillow format name -> file extension of the stored variants
+FORMATS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+CHUNK_SIZE = 64 * 1024
+# Names of stored variants, relative to the upload folder
+VARIANT_NAME = re.compile(r'^avatars/[0-9a-f]{64}-\d+\.(webp|jpg)$')
+
+
+class InvalidImage(Exception):
+    """
+    The upload is not a supported, decodable image.
+    """
+
+
+def _variant_name(avatar, size, extension):
+    return f"{avatar}-{size}.{extension}"
+
+
+def _save_upload(stream, directory):
+    """
+    Copy an upload stream to a temporary file in ``directory`` while hashing it.
+
+    Returns:
+        tuple: ``(path, sha256 hex digest)``.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.upload')
+    with os.fdopen(fd, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+
+def _write_variants(source_path, avatar_path, sizes, max_pixels, tmp_directory):
+    """
+    Decode the image at ``source_path`` and write every size and format,
+    each first to ``tmp_directory``.
+
+    Raises:
+        InvalidImage: If the file is not an accepted image or is too large.
+    """
+    try:
+        with Image.open(source_path) as image:
+            if image.format not in ACCEPTED_FORMATS:
+                raise InvalidImage(f"Unsupported image format {image.format}")
+            if image.width * image.height > max_pixels:
+                raise InvalidImage("Image dimensions are too large")
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            for size in sizes:
+                variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                for image_format, extension in FORMATS.items():
+                    if image_format == 'JPEG' and variant.mode == 'RGBA':
+                        # JPEG has no alpha channel: flatten onto white
+                        background = Image.new('RGB', variant.size, 'white')
+                        background.paste(variant, mask=variant.getchannel('A'))
+                        output = background
+                    else:
+                        output = variant
+                    target = _variant_name(avatar_path, size, extension)
+                    # Write aside and rename, so readers never see a partial
+                    # file. The name is unique per thread, as two requests may
+                    # store the same image at once.
+                    partial = os.path.join(
+                        tmp_directory, f"{os.path.basename(target)}.{os.getpid()}.{threading.get_ident()}.partial"
+                    )
+                    try:
+                        if image_format == 'JPEG':
+                            output.save(partial, image_format, quality=85, optimize=True, progressive=True)
+                        else:
+                            output.save(partial, image_format, quality=80, method=4)
+                        os.replace(partial, target)
+                    except BaseException:
+                        if os.path.exists(partial):
+                            os.remove(partial)
+                        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+
+
+def store_avatar(stream, upload_folder, sizes, max_pixels):
+    """
+    Process an uploaded profile picture.
+
+    Args:
+        stream (IO[bytes]): The uploaded file.
+        upload_folder (str): Root of the upload storage.
+        sizes (tuple[int]): Edge lengths of the square variants.
+        max_pixels (int): Largest accepted width * height of the upload.
+
+    Returns:
+        str: The value for ``User.profile_picture``, ``avatars/<hash>``.
+
+    Raises:
+        InvalidImage: If the upload is not an accepted image.
+    """
+    tmp_directory = os.path.join(upload_folder, TMP_DIR)
+    os.makedirs(os.path.join(upload_folder, AVATAR_DIR), exist_ok=True)
+    os.makedirs(tmp_directory, exist_ok=True)
+
+    upload_path, content_hash = _save_upload(stream, tmp_directory)
+    try:
+        avatar = f"{AVATAR_DIR}/{content_hash}"
+        avatar_path = os.path.join(upload_folder, avatar)
+        existing = all(
+            os.path.exists(_variant_name(avatar_path, size, extension))
+            for size in sizes for extension in FORMATS.values()
+        )
+        if not existing:
+            _write_variants(upload_path, avatar_path, sizes, max_pixels, tmp_directory)
+        return avatar
+    finally:
+        os.remove(upload_path)
+
+
+def is_variant(filename):
+    """
+    Whether a path in the upload folder is a stored variant, whose content
+    never changes.
+    """
+    return VARIANT_NAME.match(filename) is not None
+
+
+def is_served(filename):
+    """
+    Whether a path in the upload folder may be served: a stored variant or a
+    legacy picture at the top level, never a temporary file.
+    """
+    return is_variant(filename) or ('/' not in filename and not filename.startswith('.'))
+
+
+def avatar_urls(profile_picture, base_url, sizes):
+    """
+    URLs of the variants of a profile picture.
+
+    Args:
+        profile_picture (str): ``User.profile_picture``.
+        base_url (str): URL the upload folder is served under, with a trailing slash.
+        sizes (tuple[int]): Configured variant sizes.
+
+    Returns:
+        dict: ``{size: {'webp': url, 'jpeg': url}}`` with sizes as strings.
+        Legacy pictures map every size and format to the original file.
+    """
+    if not profile_picture:
+        return {}
+    if not profile_picture.startswith(AVATAR_DIR + '/'):
+        url = base_url + profile_picture
+        return {str(size): {'webp': url, 'jpeg': url} for size in sizes}
+    return {
+        str(size): {
+            'webp': base_url + _variant_name(profile_picture, size, FORMATS['WEBP']),
+            'jpeg': base_url + _variant_name(profile_picture, size, FORMATS['JPEG'])
+        } for size in sizes
+    }
@@ -0,0 +1,396 @@
+"""
+Bulk import and export of forum content, for seeding and migrations.
+
+Kinds: categories, subcategories, threads, snippets, news and comments, as
+JSON lines or CSV with a header row. Records refer to their parents by the
+ids the parents have in the source (``category_id``, ``subcategory_id``,
+``thread_id``, ``news_id``) and to their author by username (``author``).
+Export writes the same format, so an export of one database imports into
+another.
+
+Import streams the file in batches and keeps memory constant whatever its
+size. Each batch is one transaction that:
+
+- resolves parents through ``import_mapping``, which maps the source id of
+  every imported row to its new id, and authors by username;
+- inserts the rows with ``COPY`` on PostgreSQL (ids taken from the table's
+  sequence up front) and with ``executemany`` elsewhere;
+- counts the rows in the forum and user stats, which the session hooks and
+  write paths would otherwise maintain;
+- records the new ids in ``import_mapping``.
+
+Rows whose source id is already mapped are skipped, so an interrupted or
+failed import is resumed by running it again. Import the kinds in the order
+of KINDS, parents first. Categories merge with an existing category of the
+same name.
+"""
+
+# External imports
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, func, insert, select, text
+
+# Internal imports
+from . import db
+from . import forum_stats, user_stats
+from .models import User, Category, Subcategory, Thread, Comment, Snippet, News, ImportMapping
+
+# Importable kinds, parents first
+KINDS = {
+    'categories': {'model': Category, 'fields': ('name',), 'parents': {}, 'author': False},
+    'subcategories': {'model': Subcategory, 'fields': ('name', 'description'),
+                      'parents': {'category_id': 'categories'}, 'author': False},
+    'threads': {'model': Thread, 'fields': ('title', 'content', 'created_at'),
+                'parents': {'subcategory_id': 'subcategories'}, 'author': True},
+    'snippets': {'model': Snippet, 'fields': ('title', 'language', 'code', 'description', 'created_at'),
+                 'parents': {}, 'author': True},
+    'news': {'model': News, 'fields': ('title', 'content', 'created_at'), 'parents': {}, 'author': True},
+    'comments': {'model': Comment, 'fields': ('content', 'created_at'),
+                 'parents': {'thread_id': 'threads', 'news_id': 'news'}, 'author': True},
+}
+FORMATS = ('jsonl', 'csv')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class BulkImportError(Exception):
+    """
+    A record that cannot be imported; ``line`` is its line in the file.
+    """
+
+    def __init__(self, line, message):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+def columns(kind):
+    """
+    Field names of a kind, in file order.
+
+    Returns:
+        list[str]: ``id``, the fields, the parent ids and ``author``.
+    """
+    spec = KINDS[kind]
+    return ['id', *spec['fields'], *spec['parents'], *(['author'] if spec['author'] else [])]
+
+
+#=======================================
+# Reading and writing files
+#=======================================
+def read_records(f, file_format):
+    """
+    Records of a file, one at a time.
+
+    Yields:
+        tuple: ``(line number, record dict)``.
+    """
+    if file_format == 'csv':
+        # CSV cannot tell an empty string from a missing value: both are None.
+        # Line numbers are exact as long as no field spans several lines.
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, {field: value if value != '' else None for field, value in row.items()}
+        return
+    for line_number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise BulkImportError(line_number, f"Invalid JSON: {e}") from e
+        if not isinstance(record, dict):
+            raise BulkImportError(line_number, "Expected a JSON object")
+        yield line_number, record
+
+
+def write_records(f, records, kind, file_format):
+    """
+    Write records to a file in the import format.
+
+    Returns:
+        int: Number of records written.
+    """
+    fields = columns(kind)
+    writer = None
+    if file_format == 'csv':
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+    count = 0
+    for record in records:
+        record = {
+            field: value.isoformat() if isinstance(value, datetime) else value
+            for field, value in record.items()
+        }
+        if writer:
+            writer.writerow(record)
+        else:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+#=======================================
+# Export
+#=======================================
+def export_records(kind, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    All rows of a kind in id order, read in keyset-paginated batches so no
+    long-running cursor is held.
+
+    Yields:
+        dict: One record per row, with the fields of ``columns(kind)``.
+    """
+    spec = KINDS[kind]
+    model = spec['model']
+    query = select(model.id, *(getattr(model, field) for field in (*spec['fields'], *spec['parents'])))
+    if spec['author']:
+        query = query.add_columns(User.username.label('author')).join(User, model.user_id == User.id)
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(model.id > last_id).order_by(model.id).limit(batch_size)).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row._asdict()
+        last_id = rows[-1].id
+
+
+#=======================================
+# Import
+#=======================================
+def _convert(spec, line, record):
+    """
+    Typed column values of a record; CSV values arrive as strings.
+    """
+    model = spec['model']
+    values = {}
+    for field in ('id', *spec['fields'], *spec['parents']):
+        value = record.get(field)
+        column = model.__table__.c[field]
+        try:
+            if value is not None and (field == 'id' or field in spec['parents']):
+                value = int(value)
+            elif isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value) if value is not None else datetime.utcnow()
+                if value.tzinfo is not None:
+                    # Timestamps are stored as naive UTC
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError) as e:
+            raise BulkImportError(line, f"Invalid {field}: {value!r}") from e
+        if value is None and (field == 'id' or not column.nullable):
+            raise BulkImportError(line, f"Missing {field}")
+        values[field] = value
+    author = record.get('author')
+    if spec['author'] and not author:
+        raise BulkImportError(line, "Missing author")
+    return values, author
+
+
+def _mapped_ids(source, kind, source_ids):
+    """
+    ``{source id: target id}`` of the given rows already imported.
+    """
+    if not source_ids:
+        return {}
+    return dict(db.session.execute(
+        select(ImportMapping.source_id, ImportMapping.target_id)
+        .where(ImportMapping.source == source, ImportMapping.kind == kind,
+               ImportMapping.source_id.in_(source_ids))
+    ).all())
+
+
+def _copy(connection, table_name, column_names, rows):
+    """
+    Load rows into a PostgreSQL table with ``COPY FROM STDIN``.
+    """
+    buffer = io.StringIO()
+    # Strings are quoted, so '' stays an empty string and None becomes NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "{table_name}" ({", ".join(column_names)}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_rows(model, rows):
+    """
+    Insert rows into the table of a model in the current transaction.
+
+    Returns:
+        list[int]: The new ids, in the order of ``rows``.
+    """
+    connection = db.session.connection()
+    table = model.__table__
+    if connection.dialect.name == 'postgresql':
+        ids = connection.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {'table': table.name, 'count': len(rows)}
+        ).scalars().all()
+        column_names = ['id', *rows[0]]
+        _copy(connection, table.name, column_names,
+              ([new_id, *row.values()] for new_id, row in zip(ids, rows)))
+        return ids
+
+    connection.execute(insert(table), rows)
+    # The batch holds the SQLite write lock since its first insert, and
+    # without AUTOINCREMENT every new row gets max(rowid) + 1, so the ids of
+    # the batch are the last len(rows) ones
+    last_id = connection.scalar(select(func.max(table.c.id)))
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+def _record_mappings(source, kind, pairs):
+    connection = db.session.connection()
+    rows = [(source, kind, source_id, target_id) for source_id, target_id in pairs]
+    if connection.dialect.name == 'postgresql':
+        _copy(connection, ImportMapping.__tablename__, ('source', 'kind', 'source_id', 'target_id'), rows)
+    else:
+        connection.execute(insert(ImportMapping), [
+            {'source': source, 'kind': kind, 'source_id': source_id, 'target_id': target_id}
+            for source, kind, source_id, target_id in rows
+        ])
+
+
+def _import_batch(kind, source, batch, default_author_id):
+    """
+    Import one batch of ``(line, values, author)`` in the current
+    transaction.
+
+    Returns:
+        int: Number of rows imported; the others were imported before.
+    """
+    spec = KINDS[kind]
+    mapped = _mapped_ids(source, kind, [values['id'] for _, values, _ in batch])
+    pending = []
+    for line, values, author in batch:
+        if values['id'] in mapped:
+            continue
+        mapped[values['id']] = None  # Repeated ids within the batch
+        pending.append((line, values, author))
+    if not pending:
+        return 0
+
+    # Parents, through the ids they were given when they were imported
+    parents = {
+        field: _mapped_ids(source, parent_kind, list({
+            values[field] for _, values, _ in pending if values[field] is not None
+        }))
+        for field, parent_kind in spec['parents'].items()
+    }
+    authors = {}
+    if spec['author']:
+        names = list({User.normalize_username(author) for _, _, author in pending})
+        authors = dict(db.session.execute(
+            select(User.username_lower, User.id).where(User.username_lower.in_(names))
+        ).all())
+
+    rows = []
+    for line, values, author in pending:
+        row = {field: values[field] for field in spec['fields']}
+        for field, parent_kind in spec['parents'].items():
+            if values[field] is None:
+                row[field] = None
+            elif values[field] in parents[field]:
+                row[field] = parents[field][values[field]]
+            else:
+                raise BulkImportError(line, f"Unknown {field} {values[field]}; import the {parent_kind} first")
+        if kind == 'comments' and (row['thread_id'] is None) == (row['news_id'] is None):
+            raise BulkImportError(line, "A comment needs either a thread_id or a news_id")
+        if spec['author']:
+            user_id = authors.get(User.normalize_username(author), default_author_id)
+            if user_id is None:
+                raise BulkImportError(line, f"Unknown author {author}")
+            row['user_id'] = user_id
+        if kind == 'threads':
+            row['last_activity_at'] = row['created_at']
+        rows.append(row)
+
+    source_ids = [values['id'] for _, values, _ in pending]
+    if kind == 'categories':
+        # Category names are unique: merge with the categories of the same name
+        target_ids = dict(db.session.execute(
+            select(Category.name, Category.id).where(Category.name.in_({row['name'] for row in rows}))
+        ).all())
+        new = list({row['name']: row for row in rows if row['name'] not in target_ids}.values())
+        if new:
+            target_ids.update(zip((row['name'] for row in new), _insert_rows(Category, new)))
+        pairs = [(source_id, target_ids[row['name']]) for source_id, row in zip(source_ids, rows)]
+    else:
+        target_ids = _insert_rows(spec['model'], rows)
+        pairs = list(zip(source_ids, target_ids))
+        if kind == 'threads':
+            forum_stats.record_imported_threads(
+                (thread_id, row['subcategory_id'], row['created_at']) for thread_id, row in zip(target_ids, rows)
+            )
+        elif kind == 'comments':
+            forum_stats.record_imported_comments(
+                (comment_id, row['thread_id'], row['created_at'])
+                for comment_id, row in zip(target_ids, rows) if row['thread_id'] is not None
+            )
+        if spec['model'] in user_stats.COUNTERS:
+            user_stats.record_imported(spec['model'], (row['user_id'] for row in rows))
+    _record_mappings(source, kind, pairs)
+    return len(pending)
+
+
+def import_records(kind, records, source='default', batch_size=DEFAULT_BATCH_SIZE, default_author=None,
+                   progress=None):
+    """
+    Import records of one kind, committing after every batch.
+
+    Args:
+        kind (str): One of KINDS.
+        records (Iterable[tuple]): ``(line number, record dict)``, see read_records.
+        source (str): Name of the source system; source ids are unique per source.
+        batch_size (int): Records per transaction.
+        default_author (str, optional): Username to attribute records to when
+            their author does not exist here. Without it such records fail.
+        progress (callable, optional): Receives the running totals after
+            every batch.
+
+    Returns:
+        dict: ``{'read', 'imported', 'skipped'}`` totals.
+
+    Raises:
+        BulkImportError: For an invalid record. The batches before it are
+            committed; running the import again resumes after them.
+    """
+    default_author_id = None
+    if default_author:
+        default_author_id = db.session.scalar(
+            select(User.id).where(User.username_lower == User.normalize_username(default_author))
+        )
+        if default_author_id is None:
+            raise BulkImportError(0, f"Unknown default author {default_author}")
+
+    spec = KINDS[kind]
+    totals = {'read': 0, 'imported': 0, 'skipped': 0}
+    batch = []
+
+    def flush():
+        try:
+            imported = _import_batch(kind, source, batch, default_author_id)
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        totals['imported'] += imported
+        totals['skipped'] += len(batch) - imported
+        batch.clear()
+        if progress:
+            progress(totals)
+
+    for line, record in records:
+        values, author = _convert(spec, line, record)
+        batch.append((line, values, author))
+        totals['read'] += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return totals
@@ -0,0 +1,135 @@
+"""
+Tag-based invalidation for cached views.
+
+Every tag has a version token stored in the cache backend itself. A cached
+view mixes the current tokens of its tags into its cache key, so purging a tag
+is a single write of a new token: entries keyed on the old token can no longer
+be reached and simply expire. With a shared backend such as Redis the tokens,
+and therefore the invalidations, are shared by every worker.
+
+Tokens are only written by ``invalidate`` and never expire. An evicted token
+falls back to the initial version, which could make entries cached before the
+first invalidation reachable again, so a Redis backend that evicts should use
+a ``volatile-*`` policy, which only evicts keys with a TTL.
+
+Views can also key on a whitelist of normalized query arguments. Hits and
+misses are counted per key (without the tag tokens) so TTLs can be tuned.
+"""
+
+# External imports
+import threading
+import uuid
+from urllib.parse import urlencode
+from flask import request
+from flask_caching import cache_view_hit, cache_view_miss
+
+# Internal imports
+from . import cache
+
+TAG_KEY_PREFIX = 'tag/'
+# Version of a tag until its first invalidation
+INITIAL_VERSION = '0'
+
+# Upper bound on the number of keys with their own hit/miss counters; the
+# remaining keys are counted together under OTHER_KEYS.
+MAX_TRACKED_KEYS = 1000
+OTHER_KEYS = '<other>'
+
+_key_stats = {}
+_key_stats_lock = threading.Lock()
+
+
+def _tag_versions(tags):
+    """
+    Fetch the current version token of each tag. Reads never write: a tag
+    that has not been invalidated yet has the fixed INITIAL_VERSION, so tags
+    taken from request arguments cannot create keys in the backend.
+
+    Args:
+        tags (list[str]): Tag names.
+
+    Returns:
+        list[str]: One token per tag, in the same order.
+    """
+    versions = cache.get_many(*(TAG_KEY_PREFIX + tag for tag in tags))
+    return [INITIAL_VERSION if version is None else str(version) for version in versions]
+
+
+def cached_view(timeout=None, tags=(), query_args=None, unless=None, response_filter=None):
+    """
+    Cache a view like ``cache.cached`` and tag the entry so that it can be
+    purged with ``invalidate``.
+
+    Only the query arguments returned by ``query_args`` are part of the key,
+    so unknown parameters cannot create new cache entries.
+
+    Args:
+        timeout (int, optional): TTL in seconds, defaults to CACHE_DEFAULT_TIMEOUT.
+        tags (list[str] | callable): Tags of the entry, or a callable that
+            receives the view arguments and returns them.
+        query_args (callable, optional): Returns a dict of the normalized,
+            whitelisted query arguments of the current request. None values
+            are left out of the key.
+        unless (callable, optional): Bypass the cache when it returns True.
+        response_filter (callable, optional): Only store a response when it
+            returns True.
+
+    Returns:
+        function: Decorator for the view.
+    """
+    def make_cache_key(*args, **kwargs):
+        key = f"view/{request.path}"
+        if query_args:
+            params = sorted((name, value) for name, value in query_args().items() if value is not None)
+            if params:
+                key += '?' + urlencode(params)
+        entry_tags = tags(**kwargs) if callable(tags) else tags
+        return key + "|" + "|".join(_tag_versions(entry_tags))
+
+    return cache.cached(
+        timeout=timeout,
+        make_cache_key=make_cache_key,
+        unless=unless,
+        response_filter=response_filter
+    )
+
+
+def invalidate(*tags):
+    """
+    Purge every cached entry carrying one of the given tags.
+
+    Args:
+        *tags (str): Tag names, e.g. ``'category'`` or ``'snippet:42'``.
+    """
+    if tags:
+        cache.set_many({TAG_KEY_PREFIX + tag: uuid.uuid4().hex for tag in tags}, timeout=0)
+
+
+def key_stats():
+    """
+    Hit and miss counts of this process per cache key.
+
+    Returns:
+        dict: ``{key: {'hits': int, 'misses': int}}``.
+    """
+    with _key_stats_lock:
+        return {key: dict(stats) for key, stats in _key_stats.items()}
+
+
+def _record(outcome):
+    """
+    Build a signal receiver that counts ``outcome`` for the cache key.
+    """
+    def receiver(sender, cache_key=None, **extra):
+        # Strip the tag tokens so the counters survive invalidations
+        key = str(cache_key).split('|', 1)[0]
+        with _key_stats_lock:
+            if key not in _key_stats and len(_key_stats) >= MAX_TRACKED_KEYS:
+                key = OTHER_KEYS
+            stats = _key_stats.setdefault(key, {'hits': 0, 'misses': 0})
+            stats[outcome] += 1
+    return receiver
+
+
+cache_view_hit.connect(_record('hits'), weak=False)
+cache_view_miss.connect(_record('misses'), weak=False)
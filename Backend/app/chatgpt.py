@@ -0,0 +1,487 @@
+"""
+OpenAI chat completions off the request thread.
+
+``ChatGPTService`` runs every upstream call on a bounded thread pool and
+streams the answer back chunk by chunk:
+
+- At most CHATGPT_MAX_CONCURRENCY calls run at once. When all slots are taken
+  ``stream`` raises ``ChatGPTBusy`` right away instead of queueing, so a burst
+  of questions cannot pile up behind slow upstream calls and starve the
+  workers that serve the forum.
+- The request thread only relays chunks. It gives up after CHATGPT_TIMEOUT
+  seconds; once every request following an answer has gone, because of a
+  timeout or a client disconnect, the worker stops the upstream call.
+
+Answers are cached per normalized question (case and whitespace folded):
+
+- A small LRU of CHATGPT_CACHE_SIZE entries in the process, in front of the
+  shared cache backend, both with a TTL of CHATGPT_CACHE_TIMEOUT. With Redis,
+  eviction beyond the TTL follows its ``maxmemory-policy`` (use allkeys-lru).
+- Identical questions asked while an answer is being produced follow that
+  answer instead of calling OpenAI again (single-flight). Across processes a
+  short lock in the shared cache lets the other workers wait for the answer.
+
+Hits, deduplicated questions and upstream calls are counted in ``stats``.
+
+The service is created by ``init_chatgpt`` in ``create_app`` and looked up with
+``get_chatgpt``. Its client, and so the API key, is built once; it is only
+rebuilt by ``reload_credentials``, which replaces the client atomically while
+calls in flight finish with the old one. With OPENAI_API_KEY_FILE set, a
+rotated key is picked up every CHATGPT_KEY_REFRESH_INTERVAL seconds and on
+SIGHUP.
+"""
+
+# External imports
+import hashlib
+import math
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from openai import OpenAI
+
+ANSWER_KEY_PREFIX = 'chatgpt/answer/'
+LOCK_KEY_PREFIX = 'chatgpt/lock/'
+
+# Seconds between checks for an answer produced by another process
+SHARED_POLL_INTERVAL = 0.25
+
+
+class ChatGPTBusy(Exception):
+    """
+    All upstream slots are taken.
+    """
+
+
+class ChatGPTError(Exception):
+    """
+    The upstream call failed or timed out.
+    """
+
+
+def normalize_question(question):
+    """
+    Fold the differences between questions that should share an answer.
+
+    Args:
+        question (str): The question of the user.
+
+    Returns:
+        str: The question in lower case with collapsed whitespace.
+    """
+    return ' '.join(question.lower().split())
+
+
+class _Flight:
+    """
+    One answer being produced, followed by every request asking the question.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.cancelled = threading.Event()
+        self._changed = threading.Condition()
+
+    def put(self, chunk):
+        with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def follow(self, timeout):
+        """
+        Yield the chunks of the answer, from the first one, as they arrive.
+        """
+        deadline = time.monotonic() + timeout
+        position = 0
+        with self._changed:
+            self.followers += 1
+        try:
+            while True:
+                with self._changed:
+                    while position == len(self.chunks) and not self.done:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise ChatGPTError('Timed out waiting for OpenAI')
+                        self._changed.wait(remaining)
+                    chunks = self.chunks[position:]
+                    position = len(self.chunks)
+                    done, error = self.done, self.error
+                yield from chunks
+                if done:
+                    if error:
+                        raise ChatGPTError(str(error)) from error
+                    return
+        finally:
+            with self._changed:
+                self.followers -= 1
+                if not self.followers and not self.done:
+                    # Nobody is waiting for the rest of the answer anymore
+                    self.cancelled.set()
+
+
+class ChatGPTService:
+    """
+    Bounded, streaming and cached access to the OpenAI chat completions API.
+
+    Args:
+        client (OpenAI): The API client, shared by all calls.
+        model (str): Chat model to use.
+        max_tokens (int): Upper bound on the length of an answer.
+        max_concurrency (int): Number of upstream calls that may run at once.
+        timeout (float): Seconds an answer may take in total.
+        shared_cache (BaseCache, optional): Cache backend shared by all
+            processes. Accessed from worker threads, so it must be the
+            backend itself rather than the Flask-Caching wrapper.
+        cache_timeout (int): Seconds an answer stays cached, 0 disables caching.
+        cache_size (int): Number of answers kept in the process LRU.
+        api_key_loader (callable, optional): Returns the current API key;
+            used by ``reload_credentials``.
+    """
+
+    def __init__(self, client, model, max_tokens, max_concurrency, timeout,
+                 shared_cache=None, cache_timeout=0, cache_size=0, api_key_loader=None):
+        self.client = client
+        self.api_key_loader = api_key_loader
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.shared_cache = shared_cache
+        self.cache_timeout = cache_timeout
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='chatgpt')
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._answers = OrderedDict()  # key -> (expires_at, answer), least recently used first
+        self._stats = {'hits': 0, 'deduplicated': 0, 'upstream_calls': 0}
+
+    def stream(self, question):
+        """
+        Start answering a question.
+
+        Args:
+            question (str): The question of the user.
+
+        Returns:
+            Iterator[str]: Chunks of the answer as they arrive. Iterating
+            raises ChatGPTError if the upstream call fails or times out.
+
+        Raises:
+            ChatGPTBusy: If the answer is neither cached nor in flight and
+                all upstream slots are taken.
+        """
+        key = hashlib.sha256(normalize_question(question).encode()).hexdigest()
+
+        answer = self._cached_answer(key)
+        if answer is not None:
+            self._count('hits')
+            return iter([answer])
+
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.cancelled.is_set():
+                self._stats['deduplicated'] += 1
+                return flight.follow(self.timeout)
+
+            if not self._slots.acquire(blocking=False):
+                raise ChatGPTBusy()
+            flight = self._flights[key] = _Flight()
+
+        try:
+            future = self._executor.submit(self._run, question, key, flight)
+        except BaseException:
+            with self._lock:
+                self._flights.pop(key, None)
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return flight.follow(self.timeout)
+
+    def ask(self, question):
+        """
+        Answer a question in one piece.
+
+        Returns:
+            str: The complete answer.
+
+        Raises:
+            ChatGPTBusy: If all upstream slots are taken.
+            ChatGPTError: If the upstream call fails or times out.
+        """
+        return ''.join(self.stream(question)).strip()
+
+    def stats(self):
+        """
+        Cache and deduplication counters of this process.
+
+        Returns:
+            dict: ``hits``, ``deduplicated`` and ``upstream_calls`` counts and
+            ``hit_rate``, the share of questions answered without a new
+            upstream call.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats['hit_rate'] = (stats['hits'] + stats['deduplicated']) / total if total else 0.0
+        return stats
+
+    def reload_credentials(self):
+        """
+        Rebuild the client if the API key has changed.
+
+        Returns:
+            bool: True if the key was rotated.
+        """
+        if self.api_key_loader is None:
+            return False
+        api_key = self.api_key_loader()
+        if not api_key or api_key == self.client.api_key:
+            return False
+        # Workers read self.client once per call, so swapping the reference is
+        # enough: calls in flight finish with the old client.
+        self.client = self.client.with_options(api_key=api_key)
+        return True
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    #=======================================
+    # Answer cache
+    #=======================================
+    def _cached_answer(self, key):
+        """
+        Look an answer up in the process LRU, then in the shared cache.
+        """
+        if not self.cache_timeout:
+            return None
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is not None:
+                expires_at, answer = entry
+                if expires_at > time.monotonic():
+                    self._answers.move_to_end(key)
+                    return answer
+                del self._answers[key]
+
+        if self.shared_cache is None:
+            return None
+        answer = self.shared_cache.get(ANSWER_KEY_PREFIX + key)
+        if answer is not None:
+            self._remember(key, answer)
+        return answer
+
+    def _remember(self, key, answer):
+        """
+        Put an answer into the process LRU, evicting the least recently used.
+        """
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._answers[key] = (time.monotonic() + self.cache_timeout, answer)
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.cache_size:
+                self._answers.popitem(last=False)
+
+    def _store(self, key, answer):
+        """
+        Cache a complete answer in the process and the shared cache.
+        """
+        if not self.cache_timeout or not answer:
+            return
+        self._remember(key, answer)
+        if self.shared_cache is not None:
+            self.shared_cache.set(ANSWER_KEY_PREFIX + key, answer, timeout=self.cache_timeout)
+
+    def _wait_for_other_process(self, key, flight):
+        """
+        Wait for an answer another process is producing for the same question.
+
+        Returns:
+            str: The answer, or None if this process has to ask OpenAI itself.
+        """
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline and not flight.cancelled.is_set():
+            time.sleep(SHARED_POLL_INTERVAL)
+            answer = self.shared_cache.get(ANSWER_KEY_PREFIX + key)
+            if answer is not None:
+                return answer
+            if not self.shared_cache.has(LOCK_KEY_PREFIX + key):
+                return None
+        return None
+
+    #=======================================
+    # Worker
+    #=======================================
+    def _run(self, question, key, flight):
+        """
+        Worker: produce the answer into ``flight``, from another process or
+        from OpenAI, and cache it when complete.
+        """
+        locked = False
+        try:
+            if self.shared_cache is not None and self.cache_timeout:
+                locked = self.shared_cache.add(LOCK_KEY_PREFIX + key, 1, timeout=math.ceil(self.timeout))
+                if not locked:
+                    answer = self._wait_for_other_process(key, flight)
+                    if answer is not None:
+                        self._count('deduplicated')
+                        self._remember(key, answer)
+                        flight.put(answer)
+                        flight.finish()
+                        return
+
+            # Every follower left while the question was queued or waiting on
+            # another process: nobody would read a paid answer
+            if flight.cancelled.is_set():
+                flight.finish(ChatGPTError('Cancelled'))
+                return
+
+            self._count('upstream_calls')
+            client = self.client
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=[{'role': 'user', 'content': question}],
+                max_tokens=self.max_tokens,
+                stream=True,
+                timeout=self.timeout,
+            )
+            with response:
+                for chunk in response:
+                    if flight.cancelled.is_set():
+                        flight.finish(ChatGPTError('Cancelled'))
+                        return
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        flight.put(content)
+            self._store(key, ''.join(flight.chunks))
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            if locked:
+                self.shared_cache.delete(LOCK_KEY_PREFIX + key)
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def shutdown(self):
+        """
+        Stop accepting questions and release the worker threads.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+#=======================================
+# Setup and credential rotation
+#=======================================
+def _api_key_loader(config):
+    """
+    Build a function returning the current API key: the contents of
+    OPENAI_API_KEY_FILE when set, OPENAI_API_KEY otherwise.
+    """
+    key_file = config.get('OPENAI_API_KEY_FILE')
+    if not key_file:
+        return lambda: config['OPENAI_API_KEY']
+
+    def load():
+        with open(key_file) as f:
+            return f.read().strip()
+    return load
+
+
+def _refresh_periodically(service, interval, logger):
+    """
+    Start a daemon thread that calls ``reload_credentials`` every ``interval`` seconds.
+    """
+    def refresh():
+        while True:
+            time.sleep(interval)
+            try:
+                if service.reload_credentials():
+                    logger.info("OpenAI API key rotated")
+            except Exception as e:
+                logger.error(f"Could not reload the OpenAI API key: {e}")
+
+    threading.Thread(target=refresh, name='chatgpt-key-refresh', daemon=True).start()
+
+
+def _reload_on_sighup(service, logger):
+    """
+    Reload the API key on SIGHUP, chaining to any previous handler. Signal
+    handlers can only be installed from the main thread, so this is skipped
+    elsewhere (e.g. apps created by a threaded test runner).
+    """
+    if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def handler(signum, frame):
+        # Runs between bytecodes of the main thread; the file read is short
+        try:
+            if service.reload_credentials():
+                logger.info("OpenAI API key rotated on SIGHUP")
+        except Exception as e:
+            logger.error(f"Could not reload the OpenAI API key: {e}")
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGHUP, handler)
+
+
+def init_chatgpt(app):
+    """
+    Create the ChatGPT service of the app from its configuration. Must run
+    after the cache extension has been initialized.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    # Imported here, as app/__init__.py imports this module before creating the cache
+    from . import cache
+
+    api_key_loader = _api_key_loader(app.config)
+    client = OpenAI(
+        api_key=api_key_loader(),
+        base_url=app.config.get('OPENAI_BASE_URL'),
+        max_retries=0,
+    )
+    service = app.extensions['chatgpt'] = ChatGPTService(
+        client,
+        model=app.config['CHATGPT_MODEL'],
+        max_tokens=app.config['CHATGPT_MAX_TOKENS'],
+        max_concurrency=app.config['CHATGPT_MAX_CONCURRENCY'],
+        timeout=app.config['CHATGPT_TIMEOUT'],
+        shared_cache=app.extensions['cache'][cache],
+        cache_timeout=app.config['CHATGPT_CACHE_TIMEOUT'],
+        cache_size=app.config['CHATGPT_CACHE_SIZE'],
+        api_key_loader=api_key_loader,
+    )
+
+    if app.config.get('OPENAI_API_KEY_FILE'):
+        interval = app.config.get('CHATGPT_KEY_REFRESH_INTERVAL', 0)
+        if interval:
+            _refresh_periodically(service, interval, app.logger)
+        if app.config.get('CHATGPT_RELOAD_ON_SIGHUP'):
+            _reload_on_sighup(service, app.logger)
+
+
+def get_chatgpt():
+    """
+    The ChatGPT service of the current app.
+
+    Returns:
+        ChatGPTService: The service.
+    """
+    return current_app.extensions['chatgpt']
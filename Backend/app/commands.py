@@ -0,0 +1,171 @@
+"""
+Maintenance commands, available through the ``flask`` CLI.
+
+Usage:
+    flask forum recount [--subcategory ID ...]
+    flask users recount [--user ID ...]
+    flask queries report [--log FILE ...] [--type slow_query|n_plus_one] [--top N]
+    flask data export KIND [FILE] [--format jsonl|csv]
+    flask data import KIND FILE [--format jsonl|csv] [--source NAME] [--batch-size N] [--default-author USERNAME]
+"""
+
+# External imports
+import glob
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+# Internal imports
+from . import db
+from . import forum_stats, user_stats
+from .bulk import DEFAULT_BATCH_SIZE, FORMATS, KINDS, BulkImportError, export_records, import_records, \
+    read_records, write_records
+from .caching import invalidate
+from .models import User, Snippet
+from .profiles import invalidate_profiles
+from .query_profiler import aggregate_reports
+
+forum_cli = AppGroup('forum', help='Forum maintenance commands.')
+users_cli = AppGroup('users', help='User maintenance commands.')
+queries_cli = AppGroup('queries', help='SQL profiler reports.')
+data_cli = AppGroup('data', help='Bulk import and export of forum content.')
+
+
+#=======================================
+# Forum
+#=======================================
+@forum_cli.command('recount')
+@click.option('--subcategory', 'subcategory_ids', type=int, multiple=True,
+              help='Only repair this subcategory. Can be given more than once.')
+def recount_command(subcategory_ids):
+    """
+    Recompute thread/comment counts and last activity of subcategories and threads.
+    """
+    subcategories, threads = forum_stats.recount(list(subcategory_ids))
+    db.session.commit()
+    invalidate('category')
+    click.echo(f"Recounted {subcategories} subcategories and {threads} threads.")
+
+
+#=======================================
+# Users
+#=======================================
+@users_cli.command('recount')
+@click.option('--user', 'user_ids', type=int, multiple=True,
+              help='Only repair this user. Can be given more than once.')
+def recount_users_command(user_ids):
+    """
+    Recompute the thread, comment and snippet counts of users.
+    """
+    users = user_stats.recount(list(user_ids))
+    db.session.commit()
+    invalidate_profiles(user_ids or db.session.scalars(select(User.id)))
+    click.echo(f"Recounted {users} users.")
+
+
+#=======================================
+# SQL profiler
+#=======================================
+@queries_cli.command('report')
+@click.option('--log', 'log_files', type=click.Path(exists=True, dir_okay=False), multiple=True,
+              help='JSON log file to read. Defaults to LOG_DIR/app.log and its backups.')
+@click.option('--type', 'report_type', type=click.Choice(['slow_query', 'n_plus_one']),
+              help='Only show this kind of report.')
+@click.option('--top', type=int, default=20, show_default=True, help='Number of entries to show.')
+def queries_report_command(log_files, report_type, top):
+    """
+    Aggregate the slow query and N+1 reports of the SQL profiler.
+    """
+    if not log_files:
+        log_files = sorted(glob.glob(os.path.join(current_app.config['LOG_DIR'], 'app.log*')))
+
+    def lines():
+        for log_file in log_files:
+            with open(log_file, encoding='utf-8') as f:
+                yield from f
+
+    groups = aggregate_reports(lines(), report_type)
+    if not groups:
+        click.echo("No query reports found.")
+        return
+    for group in groups[:top]:
+        click.echo(f"{group['type']}  {group['reports']}x  {group['route']}  {group['location']}")
+        details = f"total {group['total_ms']:.1f} ms, max {group['max_ms']:.1f} ms"
+        if group['type'] == 'n_plus_one':
+            details += f", up to {group['max_count']} statements per request"
+        click.echo(f"    {details}")
+        click.echo(f"    {group['statement'][:300]}")
+
+
+#=======================================
+# Bulk data
+#=======================================
+def _file_format(file_format, f):
+    """
+    The given format, or the one of the file extension.
+    """
+    return file_format or ('csv' if getattr(f, 'name', '').endswith('.csv') else 'jsonl')
+
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('output', type=click.File('w', encoding='utf-8', lazy=True), default='-')
+@click.option('--format', 'file_format', type=click.Choice(FORMATS),
+              help='File format. Defaults to the file extension, else jsonl.')
+def export_command(kind, output, file_format):
+    """
+    Write all rows of a kind to OUTPUT (stdout by default).
+    """
+    count = write_records(output, export_records(kind), kind, _file_format(file_format, output))
+    click.echo(f"Exported {count} {kind}.", err=True)
+
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('input_file', metavar='FILE', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'file_format', type=click.Choice(FORMATS),
+              help='File format. Defaults to the file extension, else jsonl.')
+@click.option('--source', default='default', show_default=True,
+              help='Name of the system the file comes from. Ids are mapped per source.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True,
+              help='Records per transaction.')
+@click.option('--default-author', help='Username for records whose author does not exist here.')
+def import_command(kind, input_file, file_format, source, batch_size, default_author):
+    """
+    Import the rows of a kind from FILE. Import the parents first, in the
+    order categories, subcategories, threads, snippets, news, comments.
+    Running an import again skips the rows imported before, which resumes an
+    interrupted import.
+    """
+    def progress(totals):
+        click.echo(f"{kind}: {totals['read']} read, {totals['imported']} imported, "
+                   f"{totals['skipped']} already imported", err=True)
+
+    records = read_records(input_file, _file_format(file_format, input_file))
+    try:
+        totals = import_records(kind, records, source, batch_size, default_author, progress)
+    except BulkImportError as e:
+        raise click.ClickException(f"{e}. Fix it and run the import again to resume.") from e
+
+    # The imported rows went past the views' cache invalidation
+    if totals['imported'] and kind == 'snippets':
+        languages = db.session.scalars(select(Snippet.language).distinct())
+        invalidate('snippets', *(f'snippets:lang:{language}' for language in languages))
+    elif totals['imported']:
+        invalidate('category')
+    click.echo(f"Imported {totals['imported']} {kind}, skipped {totals['skipped']} imported before.")
+
+
+def register_commands(app):
+    """
+    Register the maintenance command groups on the app.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    app.cli.add_command(forum_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(queries_cli)
+    app.cli.add_command(data_cli)
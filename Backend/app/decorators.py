@@ -2,19 +2,20 @@ from functools import wraps
 from flask import jsonify, current_app
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
-from app.models import User
+from app.identity import current_role
 
 
 #=======================================
 # Decorator: Resource Author or Admin Required
 #=======================================
-def resource_author_or_admin_required(model=None, role_check_field='user_id'):
+def resource_author_or_admin_required(model=None, role_check_field='user_id', id_arg='resource_id'):
     """
     Restrict access to a resource based on ownership or admin role.
     
     Args:
         model (db.Model): The database model to check ownership against.
         role_check_field (str): The field on the model that represents the owner's ID.
+        id_arg (str): The view argument holding the resource's ID.
     """
     def decorator(f):
         @wraps(f)
@@ -23,18 +24,18 @@ def resource_author_or_admin_required(model=None, role_check_field='user_id'):
             if not user_id:
                 return jsonify({'message': 'Authentication required'}), 401
 
-            user = User.query.get(user_id)
-            if not user:
+            role = current_role()
+            if not role:
                 return jsonify({'message': 'User not found'}), 404
 
             # Check resource permissions
             if model:
-                resource_id = kwargs.get('resource_id')
+                resource_id = kwargs.get(id_arg)
                 resource = model.query.get(resource_id)
                 if not resource:
                     return jsonify({'message': f'{model.__name__} not found'}), 404
 
-                if getattr(resource, role_check_field) != user_id and not is_admin(user):
+                if getattr(resource, role_check_field) != user_id and not is_admin(role):
                     return jsonify({'message': 'Unauthorized'}), 403
 
             return f(*args, **kwargs)
@@ -43,19 +44,19 @@ def resource_author_or_admin_required(model=None, role_check_field='user_id'):
 
 
 #=======================================
-# Helper: Check If User is Admin
+# Helper: Check If Role is Admin
 #=======================================
-def is_admin(user):
+def is_admin(role):
     """
-    Check if the user has an admin role.
+    Check if a role is an admin role.
 
     Args:
-        user (User): The user object.
+        role (str): The user's role.
 
     Returns:
-        bool: True if the user is an admin, False otherwise.
+        bool: True if the role is an admin role, False otherwise.
     """
-    return user.role in current_app.config.get('ADMIN_ROLES', [])
+    return role in current_app.config.get('ADMIN_ROLES', [])
 
 
 #=======================================
@@ -69,8 +70,7 @@ def news_admin_required(fn):
     @jwt_required()
     def wrapper(*args, **kwargs):
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or user.role not in ['news_admin', 'super_admin']:
+        if current_role() not in ['news_admin', 'super_admin']:
             current_app.logger.warning(f"Unauthorized access attempt by user ID {user_id}")
             return jsonify({'message': 'Admins only!'}), 403
         return fn(*args, **kwargs)
@@ -91,9 +91,7 @@ def role_required(roles):
         @wraps(fn)
         @jwt_required()
         def wrapper(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or user.role not in roles:
+            if current_role() not in roles:
                 return jsonify({'message': 'Access denied'}), 403
             return fn(*args, **kwargs)
         return wrapper
@@ -1,4 +1,5 @@
 from flask import jsonify
+from werkzeug.exceptions import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm.exc import NoResultFound
 from marshmallow import ValidationError
@@ -7,7 +8,7 @@ def register_error_handlers(app):
     @app.errorhandler(SQLAlchemyError)
     def handle_sqlalchemy_error(e):
         app.logger.error(f"Database error: {str(e)}")
-        app.extensions['sqlalchemy'].db.session.rollback()
+        app.extensions['sqlalchemy'].session.rollback()
         return jsonify({'message': 'A database error occurred', 'error': 'Database error'}), 500
 
     @app.errorhandler(ValidationError)
@@ -31,5 +32,8 @@ def register_error_handlers(app):
 
     @app.errorhandler(Exception)
     def handle_unexpected_error(e):
+        # Let HTTP errors such as 429 from the rate limiter keep their status
+        if isinstance(e, HTTPException):
+            return e
         app.logger.error(f"Unexpected error: {str(e)}")
         return jsonify({'message': 'An unexpected error occurred', 'error': 'Unexpected error'}), 500
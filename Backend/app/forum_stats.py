@@ -0,0 +1,264 @@
+"""
+Denormalized activity stats of subcategories and threads.
+
+Subcategory and Thread carry their thread/comment counts and the time and id
+of their latest activity, so listings can show and sort by them without
+aggregating over the comment table. The write paths call ``record_thread``
+and ``record_comment`` before committing (bulk imports call the batched
+``record_imported_*`` variants); the counters are incremented in SQL
+so concurrent posts cannot overwrite each other's updates, and the stats
+commit or roll back together with the post itself.
+
+``recount`` recomputes every stat from the source rows. It backs the
+``flask forum recount`` command and repairs drift, e.g. after rows were
+deleted outside the application.
+"""
+
+# External imports
+from datetime import datetime
+from sqlalchemy import DateTime, bindparam, case, func, null, or_, select, true, update
+
+# Internal imports
+from . import db
+from .models import Subcategory, Thread, Comment
+
+
+def _is_latest(column, timestamp):
+    """
+    SQL condition that ``timestamp`` is at least as recent as ``column``.
+    """
+    return or_(column.is_(None), column <= timestamp)
+
+
+def _latest(column, timestamp, value, current):
+    """
+    SQL expression that sets ``value`` only when ``timestamp`` is the latest
+    activity according to ``column``, and keeps ``current`` otherwise, so
+    out-of-order commits never move the stats backwards.
+    """
+    return case((_is_latest(column, timestamp), value), else_=current)
+
+
+# Parameters of the counter updates, one parameter set per row to update.
+# They are named apart from the columns, which Core reserves in UPDATE.
+_TARGET_ID = bindparam('target_id')
+_COUNT = bindparam('count')
+_TIMESTAMP = bindparam('timestamp', type_=DateTime)
+_THREAD_ID = bindparam('latest_thread_id')
+_POST_ID = bindparam('latest_post_id')
+
+
+def _add_threads(rows):
+    """
+    Add new threads to subcategories.
+
+    Args:
+        rows (list[dict]): ``target_id`` (subcategory), ``count``, and the
+            ``timestamp`` and ``latest_thread_id`` of the latest new thread.
+    """
+    subcategories = Subcategory.__table__
+    db.session.execute(
+        update(subcategories)
+        .where(subcategories.c.id == _TARGET_ID)
+        .values(
+            thread_count=subcategories.c.thread_count + _COUNT,
+            last_thread_id=_latest(subcategories.c.last_activity_at, _TIMESTAMP, _THREAD_ID,
+                                   subcategories.c.last_thread_id),
+            last_post_id=_latest(subcategories.c.last_activity_at, _TIMESTAMP, null(), subcategories.c.last_post_id),
+            last_activity_at=_latest(subcategories.c.last_activity_at, _TIMESTAMP, _TIMESTAMP,
+                                     subcategories.c.last_activity_at)
+        ),
+        rows
+    )
+
+
+def _add_comments(rows, subcategory_rows):
+    """
+    Add new comments to threads and subcategories.
+
+    Args:
+        rows (list[dict]): ``target_id`` (thread), ``count``, and the
+            ``timestamp`` and ``latest_post_id`` of the latest new comment.
+        subcategory_rows (list[dict]): The same per subcategory, plus the
+            ``latest_thread_id`` of the latest comment.
+    """
+    threads = Thread.__table__
+    subcategories = Subcategory.__table__
+    db.session.execute(
+        update(threads)
+        .where(threads.c.id == _TARGET_ID)
+        .values(
+            comment_count=threads.c.comment_count + _COUNT,
+            last_post_id=_latest(threads.c.last_activity_at, _TIMESTAMP, _POST_ID, threads.c.last_post_id),
+            last_activity_at=_latest(threads.c.last_activity_at, _TIMESTAMP, _TIMESTAMP, threads.c.last_activity_at)
+        ),
+        rows
+    )
+    db.session.execute(
+        update(subcategories)
+        .where(subcategories.c.id == _TARGET_ID)
+        .values(
+            comment_count=subcategories.c.comment_count + _COUNT,
+            last_thread_id=_latest(subcategories.c.last_activity_at, _TIMESTAMP, _THREAD_ID,
+                                   subcategories.c.last_thread_id),
+            last_post_id=_latest(subcategories.c.last_activity_at, _TIMESTAMP, _POST_ID,
+                                 subcategories.c.last_post_id),
+            last_activity_at=_latest(subcategories.c.last_activity_at, _TIMESTAMP, _TIMESTAMP,
+                                     subcategories.c.last_activity_at)
+        ),
+        subcategory_rows
+    )
+
+
+def record_thread(thread):
+    """
+    Count a new thread in its subcategory. Call after adding the thread to
+    the session and before committing.
+
+    Args:
+        thread (Thread): The new thread.
+    """
+    if thread.created_at is None:
+        thread.created_at = datetime.utcnow()
+    thread.comment_count = 0
+    thread.last_activity_at = thread.created_at
+    db.session.flush()
+    _add_threads([{'target_id': thread.subcategory_id, 'count': 1, 'timestamp': thread.created_at,
+                   'latest_thread_id': thread.id}])
+
+
+def record_comment(comment, thread):
+    """
+    Count a new comment in its thread and the thread's subcategory. Call
+    after adding the comment to the session and before committing.
+
+    Args:
+        comment (Comment): The new comment.
+        thread (Thread): The thread the comment belongs to.
+    """
+    if comment.created_at is None:
+        comment.created_at = datetime.utcnow()
+    db.session.flush()
+    latest = {'count': 1, 'timestamp': comment.created_at, 'latest_thread_id': thread.id,
+              'latest_post_id': comment.id}
+    _add_comments([{**latest, 'target_id': thread.id}], [{**latest, 'target_id': thread.subcategory_id}])
+
+
+def _latest_per(rows):
+    """
+    Group new rows by the id of the row to update.
+
+    Args:
+        rows (Iterable[dict]): ``target_id``, ``timestamp`` and the ids of
+            one new row each.
+
+    Returns:
+        list[dict]: One parameter set per ``target_id``, with the ``count``
+        of its rows and the ids of the latest one.
+    """
+    groups = {}
+    for row in rows:
+        group = groups.get(row['target_id'])
+        if group is None:
+            groups[row['target_id']] = {**row, 'count': 1}
+            continue
+        group['count'] += 1
+        if (row['timestamp'], row.get('latest_post_id') or row['latest_thread_id']) > \
+                (group['timestamp'], group.get('latest_post_id') or group['latest_thread_id']):
+            group.update(row)
+    return list(groups.values())
+
+
+def record_imported_threads(threads):
+    """
+    Count threads inserted without the ORM (bulk imports), with one update
+    per subcategory. The threads must have been inserted with a comment count
+    of 0 and their creation time as last activity. The caller commits.
+
+    Args:
+        threads (Iterable[tuple]): ``(id, subcategory_id, created_at)`` per thread.
+    """
+    rows = _latest_per(
+        {'target_id': subcategory_id, 'timestamp': created_at, 'latest_thread_id': thread_id}
+        for thread_id, subcategory_id, created_at in threads
+    )
+    if rows:
+        _add_threads(rows)
+
+
+def record_imported_comments(comments):
+    """
+    Count thread comments inserted without the ORM (bulk imports), with one
+    update per thread and one per subcategory. The caller commits.
+
+    Args:
+        comments (Iterable[tuple]): ``(id, thread_id, created_at)`` per comment.
+    """
+    comments = list(comments)
+    if not comments:
+        return
+    subcategories = dict(db.session.execute(
+        select(Thread.id, Thread.subcategory_id).where(Thread.id.in_({thread_id for _, thread_id, _ in comments}))
+    ).all())
+    rows = [
+        {'timestamp': created_at, 'latest_thread_id': thread_id, 'latest_post_id': comment_id}
+        for comment_id, thread_id, created_at in comments
+    ]
+    _add_comments(
+        _latest_per({**row, 'target_id': row['latest_thread_id']} for row in rows),
+        _latest_per({**row, 'target_id': subcategories[row['latest_thread_id']]} for row in rows)
+    )
+
+
+def recount(subcategory_ids=None):
+    """
+    Recompute the stats of subcategories and their threads from the source
+    rows. The caller commits.
+
+    Args:
+        subcategory_ids (list[int], optional): Limit the repair to these
+            subcategories. Defaults to all of them.
+
+    Returns:
+        tuple: ``(subcategories, threads)``, the number of rows recomputed.
+    """
+    thread_filter = Thread.subcategory_id.in_(subcategory_ids) if subcategory_ids else true()
+    subcategory_filter = Subcategory.id.in_(subcategory_ids) if subcategory_ids else true()
+
+    comments = select(Comment).where(Comment.thread_id == Thread.id)
+    latest_comment = comments.with_only_columns(Comment.id) \
+        .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(1)
+    threads = db.session.execute(
+        update(Thread)
+        .where(thread_filter)
+        .values(
+            comment_count=comments.with_only_columns(func.count(Comment.id)).scalar_subquery(),
+            last_post_id=latest_comment.scalar_subquery(),
+            last_activity_at=func.coalesce(
+                comments.with_only_columns(func.max(Comment.created_at)).scalar_subquery(),
+                Thread.created_at
+            )
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    # Runs after the thread update, so it aggregates the repaired thread stats
+    child = db.aliased(Thread)
+    children = select(child).where(child.subcategory_id == Subcategory.id)
+    latest_thread = children.order_by(child.last_activity_at.desc(), child.id.desc()).limit(1)
+    subcategories = db.session.execute(
+        update(Subcategory)
+        .where(subcategory_filter)
+        .values(
+            thread_count=children.with_only_columns(func.count(child.id)).scalar_subquery(),
+            comment_count=children.with_only_columns(
+                func.coalesce(func.sum(child.comment_count), 0)
+            ).scalar_subquery(),
+            last_thread_id=latest_thread.with_only_columns(child.id).scalar_subquery(),
+            last_post_id=latest_thread.with_only_columns(child.last_post_id).scalar_subquery(),
+            last_activity_at=children.with_only_columns(func.max(child.last_activity_at)).scalar_subquery()
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    return subcategories, threads
@@ -0,0 +1,123 @@
+"""
+Identity of the authenticated user.
+
+Authorization decorators and handlers all need the current user or its role.
+This module loads them at most once per request and lets role checks skip
+the database altogether:
+
+- ``current_user`` caches the loaded User on ``flask.g`` for the request.
+- ``current_role`` trusts the ``role`` claim of the access token when
+  JWT_ROLE_CLAIM_ENABLED is set, then falls back to a short-lived
+  ``user_id -> role`` entry in the shared cache, and only then to the database.
+  The claim is only as fresh as the token, so it is off by default.
+- Changing ``User.role`` through the session, by attribute or by a bulk
+  ``update()``, drops the cached entries on commit. Changes made outside the
+  session (raw SQL, another service) show after USER_ROLE_CACHE_TIMEOUT.
+"""
+
+# External imports
+from flask import current_app, g
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+
+# Internal imports
+from . import db, cache
+from .models import User
+
+ROLE_CACHE_KEY = 'user-role/{}'
+
+
+def create_user_token(user):
+    """
+    Create an access token for a user, carrying its role as a claim.
+
+    Args:
+        user (User): The authenticated user.
+
+    Returns:
+        str: The encoded access token.
+    """
+    return create_access_token(identity=user.id, additional_claims={'role': user.role})
+
+
+def current_user():
+    """
+    The user of the current request's JWT, loaded once per request.
+
+    Returns:
+        User: The user, or None if unauthenticated or not found.
+    """
+    if 'current_user' not in g:
+        user_id = get_jwt_identity()
+        g.current_user = User.query.get(user_id) if user_id is not None else None
+    return g.current_user
+
+
+def current_role():
+    """
+    Role of the user of the current request's JWT.
+
+    Returns:
+        str: The role, or None if unauthenticated or the user was not found.
+    """
+    user_id = get_jwt_identity()
+    if user_id is None:
+        return None
+
+    if current_app.config.get('JWT_ROLE_CLAIM_ENABLED'):
+        role = get_jwt().get('role')
+        if role:
+            return role
+
+    timeout = current_app.config.get('USER_ROLE_CACHE_TIMEOUT', 0)
+    if timeout:
+        role = cache.get(ROLE_CACHE_KEY.format(user_id))
+        if role:
+            return role
+
+    user = current_user()
+    if not user:
+        return None
+    if timeout:
+        cache.set(ROLE_CACHE_KEY.format(user_id), user.role, timeout=timeout)
+    return user.role
+
+
+def invalidate_user_role(user_id):
+    """
+    Drop the cached role of a user.
+
+    Args:
+        user_id (int): ID of the user.
+    """
+    cache.delete(ROLE_CACHE_KEY.format(user_id))
+
+
+@event.listens_for(User.role, 'set')
+def _remember_role_change(target, value, oldvalue, initiator):
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault('role_changed', set()).add(target.id)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _remember_bulk_role_change(orm_execute_state):
+    # A bulk UPDATE skips the attribute event, so look up the affected users
+    # before it runs
+    statement = orm_execute_state.statement
+    if not orm_execute_state.is_update or orm_execute_state.bind_mapper is not User.__mapper__:
+        return
+    if 'role' not in statement.compile().params:
+        return
+    query = select(User.id)
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+    user_ids = orm_execute_state.session.scalars(query).all()
+    orm_execute_state.session.info.setdefault('role_changed', set()).update(user_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_roles(session):
+    for user_id in session.info.pop('role_changed', ()):
+        invalidate_user_role(user_id)
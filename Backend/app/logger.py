@@ -1,38 +1,207 @@
-import os
+"""
+Non-blocking, structured application logging.
+
+The "Backend" logger only puts records on a bounded in-memory queue; a
+``QueueListener`` thread formats them and does the console and file I/O
+(including rotation checks). Request threads therefore never wait on disk.
+When the queue is full, records are dropped instead of blocking and counted
+in the ``log_records_dropped_total`` metric (see app/metrics.py).
+
+Every record is written as one JSON line with the request id, method, route
+(endpoint), path and, for the per-request ``request completed`` line, the
+status and latency. Structured ``extra`` fields such as ``rate_limit`` are
+included as they are. Messages and string fields longer than
+LOG_MAX_FIELD_LENGTH are truncated before they are queued, and successful
+requests are logged at the rate LOG_REQUEST_SAMPLE_RATE.
+
+Possible levels for LOG_LEVEL: DEBUG, INFO, WARNING, ERROR, CRITICAL.
+"""
+
+# External imports
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, has_request_context, request
+
+# Internal imports
+from .metrics import record_dropped_log_record
+
+LOGGER_NAME = "Backend"
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Attributes of every LogRecord; everything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def _truncate(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... [{len(value) - limit} more characters]"
+    return value
 
-def create_logger():
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format a record as a single JSON line.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
     """
-    Logger to log both to CLI of server and log file
+    Queue records for the listener thread without ever blocking.
+
+    Records get the fields of the current request attached and their long
+    strings truncated on the calling thread, as neither the request nor the
+    original arguments are available once the record is queued.
 
-    Possilbe states : DEBUG, INFO, WARNING, ERROR, CRITICAL
+    Args:
+        log_queue (queue.Queue): Bounded queue read by the listener.
+        max_field_length (int): Longest message or string field kept whole.
     """
-    logger = logging.getLogger("Backend")
-    logger.setLevel(logging.DEBUG)
 
-    if logger.hasHandlers():
+    def __init__(self, log_queue, max_field_length):
+        super().__init__(log_queue)
+        self.max_field_length = max_field_length
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if has_request_context():
+            for name, value in request_fields().items():
+                if not hasattr(record, name):
+                    setattr(record, name, value)
+        # Render the message and traceback here: the arguments and the
+        # exception may not survive the trip to the listener thread
+        record.msg = _truncate(record.getMessage(), self.max_field_length)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and isinstance(value, str):
+                setattr(record, name, _truncate(value, self.max_field_length))
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            record_dropped_log_record()
+
+
+def request_fields():
+    """
+    Log fields of the current request.
+
+    Returns:
+        dict: ``request_id``, ``method``, ``route`` (the endpoint) and ``path``.
+    """
+    return {
+        'request_id': g.get('request_id'),
+        'method': request.method,
+        'route': request.endpoint,
+        'path': request.path
+    }
+
+
+def create_logger(config):
+    """
+    Logger to log both to CLI of server and log file, through a queue.
+
+    The handlers and the listener thread are created once per process; later
+    calls only apply the level of ``config``.
+
+    Args:
+        config (dict): The application configuration.
+
+    Returns:
+        logging.Logger: The "Backend" logger.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(config.get('LOG_LEVEL', 'INFO'))
+
+    if _listener is not None:
         return logger
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    formatter = JsonFormatter()
 
     # Console logging
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
 
     # File-logger
-    log_dir = "logs"
+    log_dir = config.get('LOG_DIR', 'logs')
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    file_handler = RotatingFileHandler (
+    file_handler = RotatingFileHandler(
         f'{log_dir}/app.log', maxBytes=5 * 1024 * 1024, backupCount=3)
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+    logger.addHandler(BoundedQueueHandler(log_queue, config.get('LOG_MAX_FIELD_LENGTH', 1000)))
+    _listener = QueueListener(log_queue, console_handler, file_handler)
+    _listener.start()
+    # Write out what is still queued when the process exits
+    atexit.register(_listener.stop)
 
     return logger
 
-logger = create_logger()
\ No newline at end of file
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+
+def _log_request(app, response):
+    if 'request_id' not in g:
+        # Another before_request hook ended the request before ours ran
+        return response
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    sample_rate = app.config.get('LOG_REQUEST_SAMPLE_RATE', 1.0)
+    if response.status_code < 400 and random.random() >= sample_rate:
+        return response
+    level = logging.ERROR if response.status_code >= 500 else logging.INFO
+    app.logger.log(level, "request completed", extra={
+        'status': response.status_code,
+        'latency_ms': round((time.perf_counter() - g.request_started) * 1000, 2)
+    })
+    return response
+
+
+def init_logging(app):
+    """
+    Use the queued "Backend" logger as the app's logger and log every
+    request with its id and latency. The request id is taken from the
+    X-Request-ID header when the client (or proxy) sends one, and echoed in
+    the response.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    app.logger = create_logger(app.config)
+    app.before_request(_start_request)
+    app.after_request(lambda response: _log_request(app, response))
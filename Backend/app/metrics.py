@@ -0,0 +1,165 @@
+"""
+Request-level performance metrics in the Prometheus format.
+
+Recorded per endpoint (the Flask endpoint name, so the label set stays
+bounded; unmatched URLs are counted under ``<unmatched>``):
+
+- ``http_request_duration_seconds``: latency histogram, also labelled with
+  method and status.
+- ``db_statements_per_request`` and ``db_time_per_request_seconds``: number
+  and total duration of the SQL statements of a request, measured with
+  SQLAlchemy cursor events on every engine.
+- ``cache_requests_total``: view and memoize cache hits and misses, from the
+  signals of the cache extension.
+- ``rate_limited_requests_total``: requests rejected by the limiter.
+
+And without labels:
+
+- ``log_records_dropped_total``: log records dropped because the log queue
+  was full (see app/logger.py).
+
+``/metrics`` serves them (see app/routes/metrics.py). With several gunicorn
+workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the
+workers before they start. Every worker then writes its values to files in
+it, ``/metrics`` merges the files of all workers, and ``gunicorn.conf.py``
+removes the files of workers that exited.
+"""
+
+# External imports
+import os
+import time
+from flask import g, has_request_context, request
+from flask_caching import cache_memoize_hit, cache_memoize_miss, cache_view_hit, cache_view_miss
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+UNMATCHED = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency per endpoint.',
+    ['endpoint', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_STATEMENTS = Histogram(
+    'db_statements_per_request', 'Number of SQL statements per request.',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_TIME = Histogram(
+    'db_time_per_request_seconds', 'Time spent in SQL statements per request.',
+    ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups of views and memoized functions.',
+    ['endpoint', 'result']
+)
+RATE_LIMITED = Counter(
+    'rate_limited_requests_total', 'Requests rejected by the rate limiter.',
+    ['endpoint']
+)
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full.'
+)
+
+
+def _endpoint():
+    return request.endpoint or UNMATCHED
+
+
+#=======================================
+# SQL statements
+#=======================================
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, which is dropped with the statement even when
+    # it raises and after_cursor_execute never runs
+    context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    # Statements outside requests (CLI, background threads) are not attributed
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_sql_statements += 1
+        g.metrics_sql_time += time.perf_counter() - context._metrics_started
+
+
+#=======================================
+# Cache and rate limiter
+#=======================================
+def _cache_receiver(result):
+    def receiver(sender, **extra):
+        if has_request_context():
+            CACHE_REQUESTS.labels(_endpoint(), result).inc()
+    return receiver
+
+
+cache_view_hit.connect(_cache_receiver('hit'), weak=False)
+cache_view_miss.connect(_cache_receiver('miss'), weak=False)
+cache_memoize_hit.connect(_cache_receiver('hit'), weak=False)
+cache_memoize_miss.connect(_cache_receiver('miss'), weak=False)
+
+
+def record_rate_limited():
+    """
+    Count a request of the current endpoint rejected by the rate limiter.
+    """
+    RATE_LIMITED.labels(_endpoint()).inc()
+
+
+def record_dropped_log_record():
+    """
+    Count a log record dropped because the log queue was full.
+    """
+    LOG_RECORDS_DROPPED.inc()
+
+
+#=======================================
+# Requests
+#=======================================
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql_statements = 0
+    g.metrics_sql_time = 0.0
+
+
+def _record_request(response):
+    if 'metrics_started' not in g:
+        return response
+    endpoint = _endpoint()
+    REQUEST_LATENCY.labels(endpoint, request.method, str(response.status_code)) \
+        .observe(time.perf_counter() - g.metrics_started)
+    DB_STATEMENTS.labels(endpoint).observe(g.metrics_sql_statements)
+    DB_TIME.labels(endpoint).observe(g.metrics_sql_time)
+    return response
+
+
+def init_metrics(app):
+    """
+    Measure every request of the app.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+
+
+def render_metrics():
+    """
+    All metrics in the Prometheus text format, merged across the worker
+    processes when PROMETHEUS_MULTIPROC_DIR is set.
+
+    Returns:
+        tuple: ``(body, content type)``.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
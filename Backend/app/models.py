@@ -4,6 +4,7 @@ from . import db  # Database instance from the application
 # Import external modules
 from datetime import datetime  # To handle timestamps
 from sqlalchemy import Index, func  # For database indexing and SQL functions
+from sqlalchemy.orm import validates  # To keep derived columns in sync
 from werkzeug.security import generate_password_hash, check_password_hash  # For password hashing and verification
 
 
@@ -15,7 +16,7 @@ class User(db.Model):
     username = db.Column(db.String(80), nullable=True)  # Display username (optional)
     username_lower = db.Column(db.String(80), unique=True, nullable=True)  # Lowercase username for uniqueness
     email = db.Column(db.String(120), unique=True, nullable=False)  # Unique email for authentication
-    password = db.Column(db.String(128), nullable=True)  # Password hash (nullable for OAuth users)
+    password = db.Column(db.String(255), nullable=True)  # Password hash (nullable for OAuth users)
     oauth_provider = db.Column(db.String(50), nullable=True)  # OAuth provider name (e.g., Google, Facebook)
     oauth_id = db.Column(db.String(100), nullable=True)  # Unique OAuth user ID
     display_name = db.Column(db.String(80), nullable=True, default="User")  # Default visningsnamn
@@ -34,6 +35,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Timestamp when the user is created
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     accepted_privacy_policy = db.Column(db.Boolean, default=False, nullable=False)
+    # Denormalized activity stats, maintained by app.user_stats
+    thread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    snippet_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     threads = db.relationship('Thread', backref='author', lazy=True)  # One-to-many relationship with Thread
@@ -41,8 +46,23 @@ class User(db.Model):
     comments = db.relationship('Comment', backref='author', lazy=True)
     news = db.relationship('News', backref='author', lazy=True)  # One-to-many relationship with News
 
+    @staticmethod
+    def normalize_username(username):
+        """
+        Case-insensitive lookup form of a username, as stored in username_lower.
+        """
+        return username.lower() if username else None
+
+    @validates('username')
+    def _sync_username_lower(self, key, username):
+        # Username lookups compare username_lower, so it must follow every change
+        self.username_lower = User.normalize_username(username)
+        return username
+
 # Create a unique index for lowercase usernames to ensure case-insensitive uniqueness
 Index('ix_user_username_lower', func.lower(User.username), unique=True)
+# Unique index backing the OAuth login lookup
+Index('ix_user_oauth_provider_oauth_id', User.oauth_provider, User.oauth_id, unique=True)
 
 
 class Category(db.Model):
@@ -68,12 +88,24 @@ class Subcategory(db.Model):
         name (str): Name of the subcategory.
         description (str): Description of the subcategory.
         category_id (int): Foreign key to Category.
+        thread_count (int): Number of threads, maintained by app.forum_stats.
+        comment_count (int): Number of comments in all threads, maintained by app.forum_stats.
+        last_activity_at (datetime): Time of the latest thread or comment.
+        last_thread_id (int): Thread of the latest activity.
+        last_post_id (int): Latest comment, None if the latest activity is a new thread.
         threads (list[Thread]): Relationship to Thread objects.
     """
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)  # New column for descriptions
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    # Denormalized activity stats. The last_* ids are plain integers, as
+    # foreign keys would make the thread and comment tables circular.
+    thread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, nullable=True)
+    last_thread_id = db.Column(db.Integer, nullable=True)
+    last_post_id = db.Column(db.Integer, nullable=True)
     threads = db.relationship('Thread', backref='subcategory', lazy=True)
 
 
@@ -88,6 +120,9 @@ class Thread(db.Model):
         created_at (datetime): Timestamp of thread creation.
         user_id (int): Foreign key to User.
         subcategory_id (int): Foreign key to Subcategory.
+        comment_count (int): Number of comments, maintained by app.forum_stats.
+        last_activity_at (datetime): Time of the latest comment, or of creation.
+        last_post_id (int): Latest comment, None while there are no comments.
         comments (list[Comment]): Relationship to Comment objects.
     """
     id = db.Column(db.Integer, primary_key=True)
@@ -96,8 +131,17 @@ class Thread(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     subcategory_id = db.Column(db.Integer, db.ForeignKey('subcategory.id'), nullable=False)
+    # Denormalized activity stats, see Subcategory
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    last_post_id = db.Column(db.Integer, nullable=True)
     comments = db.relationship('Comment', backref='thread', lazy=True)
 
+# Composite index backing the keyset-paginated thread listing of a subcategory
+Index('ix_thread_subcategory_id_created_at', Thread.subcategory_id, Thread.created_at.desc(), Thread.id)
+# Composite index backing the "recently active" thread listing of a subcategory
+Index('ix_thread_subcategory_id_last_activity_at', Thread.subcategory_id, Thread.last_activity_at.desc(), Thread.id)
+
 
 class Comment(db.Model):
     """
@@ -108,13 +152,18 @@ class Comment(db.Model):
         content (str): The content of the comment.
         created_at (datetime): Timestamp of comment creation.
         user_id (int): Foreign key to User.
-        thread_id (int): Foreign key to Thread.
+        thread_id (int): Foreign key to Thread (None for news comments).
+        news_id (int): Foreign key to News (None for thread comments).
     """
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    thread_id = db.Column(db.Integer, db.ForeignKey('thread.id'), nullable=False)
+    thread_id = db.Column(db.Integer, db.ForeignKey('thread.id'), nullable=True)
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id'), nullable=True)
+
+# Composite index backing the keyset-paginated comment pages of a thread
+Index('ix_comment_thread_id_created_at', Comment.thread_id, Comment.created_at, Comment.id)
 
 
 class Snippet(db.Model):
@@ -129,6 +178,9 @@ class Snippet(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Timestamp when the snippet is created
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Foreign key to User (author)
 
+# Composite index backing the language-filtered snippet listing
+Index('ix_snippet_language_created_at', Snippet.language, Snippet.created_at.desc())
+
 
 class News(db.Model):
     """
@@ -138,4 +190,22 @@ class News(db.Model):
     title = db.Column(db.String(200), nullable=False)  # Title of the news article
     content = db.Column(db.Text, nullable=False)  # Content of the news article
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Foreign key to User (author)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Timestamp when the news article is created
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Timestamp when the news article is created
+
+
+class ImportMapping(db.Model):
+    """
+    New id of every row brought in by ``flask data import``, keyed by the id
+    the row had in its source. Parents are resolved through it, and rows that
+    already have a mapping are skipped when an import is run again.
+
+    Attributes:
+        source (str): Name of the imported system, e.g. ``oldforum``.
+        kind (str): Kind of row, see app.bulk.KINDS.
+        source_id (int): Id of the row in the source.
+        target_id (int): Id of the row in this database.
+    """
+    source = db.Column(db.String(50), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    source_id = db.Column(db.BigInteger, primary_key=True)
+    target_id = db.Column(db.Integer, nullable=False)
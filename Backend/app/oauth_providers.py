@@ -0,0 +1,161 @@
+"""
+User info lookups at the OAuth providers.
+
+Every login through GitHub or Google needs the profile of the user from the
+provider's API. These calls go through one pooled ``requests`` session per
+app, so connections to the provider are kept alive between logins, with
+strict connect/read timeouts and a bounded number of retries on connection
+errors and 5xx responses. The two GitHub calls (``/user`` and
+``/user/emails``) are issued concurrently.
+
+Profiles are cached per access token for OAUTH_USERINFO_CACHE_TIMEOUT
+seconds, so a repeated callback with the same token does not call the
+provider again.
+"""
+
+# External imports
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Internal imports
+from . import cache
+
+USERINFO_KEY_PREFIX = 'oauth/userinfo/'
+
+# Threads for the concurrent GitHub calls, shared by all requests
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='oauth')
+
+
+class OAuthProviderError(Exception):
+    """
+    The provider could not be reached or returned an error.
+    """
+
+
+def _http():
+    """
+    The pooled session of the current app, created on first use.
+    """
+    http = current_app.extensions.get('oauth_http')
+    if http is None:
+        config = current_app.config
+        retry = Retry(
+            total=config['OAUTH_HTTP_RETRIES'],
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=('GET',),
+        )
+        adapter = HTTPAdapter(pool_maxsize=config['OAUTH_HTTP_POOL_SIZE'], max_retries=retry)
+        http = requests.Session()
+        http.mount('https://', adapter)
+        http.mount('http://', adapter)
+        http.headers['Accept'] = 'application/json'
+        current_app.extensions['oauth_http'] = http
+    return http
+
+
+def _get_json(http, url, access_token, timeout):
+    """
+    GET a JSON document from a provider API.
+
+    Raises:
+        OAuthProviderError: On connection errors, timeouts, non-2xx responses
+            and bodies that are not JSON.
+    """
+    try:
+        response = http.get(url, headers={'Authorization': f"Bearer {access_token}"}, timeout=timeout)
+        if not response.ok:
+            raise OAuthProviderError(f"{url} returned {response.status_code}")
+        return response.json()
+    except ValueError as e:
+        # Before RequestException: requests' JSONDecodeError is both
+        raise OAuthProviderError(f"{url} returned invalid JSON") from e
+    except requests.RequestException as e:
+        raise OAuthProviderError(str(e)) from e
+
+
+def _account_id(info, url):
+    """
+    The provider's id of the account, which links it to a local user.
+
+    Raises:
+        OAuthProviderError: If the profile has no id.
+    """
+    account_id = info.get('id') if isinstance(info, dict) else None
+    if account_id is None or account_id == '':
+        raise OAuthProviderError(f"{url} returned a profile without an id")
+    return str(account_id)
+
+
+def _github_profile(http, base_url, access_token, timeout):
+    """
+    Fetch the GitHub user and its emails concurrently.
+    """
+    user = _executor.submit(_get_json, http, f"{base_url}/user", access_token, timeout)
+    emails = _executor.submit(_get_json, http, f"{base_url}/user/emails", access_token, timeout)
+    info = user.result()
+    oauth_id = _account_id(info, f"{base_url}/user")
+    email_list = emails.result()
+    if not isinstance(email_list, list) or not all(isinstance(email, dict) for email in email_list):
+        raise OAuthProviderError(f"{base_url}/user/emails did not return a list of emails")
+    primary_emails = [
+        email.get('email') for email in email_list if email.get('primary') and email.get('verified')
+    ]
+    return {
+        'email': primary_emails[0] if primary_emails else None,
+        'username': info.get('login'),
+        'oauth_id': oauth_id
+    }
+
+
+def _google_profile(http, base_url, access_token, timeout):
+    """
+    Fetch the Google user info.
+    """
+    url = f"{base_url}/oauth2/v2/userinfo"
+    info = _get_json(http, url, access_token, timeout)
+    oauth_id = _account_id(info, url)
+    return {
+        'email': info.get('email'),
+        'username': info.get('name'),
+        'oauth_id': oauth_id
+    }
+
+
+PROVIDERS = {
+    'github': ('GITHUB_API_URL', _github_profile),
+    'google': ('GOOGLE_API_URL', _google_profile),
+}
+
+
+def fetch_profile(provider, access_token):
+    """
+    Profile of the user an access token belongs to.
+
+    Args:
+        provider (str): 'github' or 'google'.
+        access_token (str): The OAuth access token of the user.
+
+    Returns:
+        dict: ``email`` (None if the provider has no verified email),
+        ``username`` and ``oauth_id``.
+
+    Raises:
+        OAuthProviderError: If the provider could not be queried.
+    """
+    key = USERINFO_KEY_PREFIX + provider + '/' + hashlib.sha256(access_token.encode()).hexdigest()
+    profile = cache.get(key)
+    if profile is not None:
+        return profile
+
+    config = current_app.config
+    url_setting, fetch = PROVIDERS[provider]
+    timeout = (config['OAUTH_HTTP_CONNECT_TIMEOUT'], config['OAUTH_HTTP_READ_TIMEOUT'])
+    profile = fetch(_http(), config[url_setting].rstrip('/'), access_token, timeout)
+
+    cache.set(key, profile, timeout=config['OAUTH_USERINFO_CACHE_TIMEOUT'])
+    return profile
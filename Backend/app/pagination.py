@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings are ordered on ``(created_at, id)`` and the position of the last row
+on a page is handed back to the client as an opaque ``next_cursor``. The next
+page then continues with a plain indexed range scan instead of an ``OFFSET``,
+so the cost of a page does not grow with how deep the client has scrolled.
+The cursor names the timestamp column it was taken from, so it is rejected
+by a listing sorted on another one.
+"""
+
+# External imports
+import base64
+import json
+from datetime import datetime
+
+from flask import request
+from marshmallow import ValidationError
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at, row_id, sort_key='created_at'):
+    """
+    Encode the position of a row as an opaque, URL-safe cursor.
+
+    Args:
+        created_at (datetime): Timestamp of the row.
+        row_id (int): Primary key of the row.
+        sort_key (str): Name of the timestamp column the listing is sorted on.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = json.dumps([sort_key, created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_key='created_at'):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+        sort_key (str): Name of the timestamp column the listing is sorted on.
+
+    Returns:
+        tuple: ``(created_at, id)`` of the last row on the previous page.
+
+    Raises:
+        ValidationError: If the cursor is malformed or was taken from a
+            listing sorted on another column.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # Cursors issued before the sort key was added are by created_at
+        cursor_key, created_at, row_id = payload if len(payload) == 3 else ['created_at', *payload]
+        position = datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+    if cursor_key != sort_key:
+        raise ValidationError({'cursor': ['Cursor belongs to another sort order.']})
+    return position
+
+
+def get_page_args(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Read ``limit`` and ``cursor`` from the query string.
+
+    The limit is clamped to ``1..maximum`` so a client cannot request an
+    unbounded page.
+
+    Returns:
+        tuple: ``(limit, cursor)`` where cursor is None for the first page.
+    """
+    limit = request.args.get('limit', default, type=int)
+    limit = max(1, min(limit, maximum))
+    cursor = request.args.get('cursor') or None
+    return limit, cursor
+
+
+def paginate_keyset(query, created_at_column, id_column, limit, cursor=None, descending=True):
+    """
+    Apply keyset pagination to a query ordered by ``(created_at, id)``.
+
+    One extra row is fetched to find out whether another page exists, so no
+    ``COUNT`` query is needed.
+
+    Args:
+        query (Query): The base query, already filtered.
+        created_at_column (Column): The timestamp column to order by, e.g.
+            ``created_at`` or ``last_activity_at``. Rows must expose it
+            under the same name.
+        id_column (Column): The primary key column used as tie-breaker.
+        limit (int): Page size.
+        cursor (str, optional): Cursor returned with the previous page.
+        descending (bool): Newest first when True, oldest first otherwise.
+
+    Returns:
+        tuple: ``(rows, next_cursor)``; next_cursor is None on the last page.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor, created_at_column.key)
+        if descending:
+            query = query.filter(or_(
+                created_at_column < created_at,
+                and_(created_at_column == created_at, id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_at_column > created_at,
+                and_(created_at_column == created_at, id_column > row_id)
+            ))
+
+    if descending:
+        query = query.order_by(created_at_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_at_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_at_column.key), last.id, created_at_column.key)
+    return rows, next_cursor
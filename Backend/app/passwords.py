@@ -0,0 +1,129 @@
+"""
+Password hashing on a bounded worker pool.
+
+Password hashes are slow by design, so hashing inline lets a burst of logins
+pin every request worker. ``PasswordHasher`` runs hashing and verification on
+a pool of PASSWORD_HASH_WORKERS threads. werkzeug hashes with hashlib's
+scrypt/pbkdf2, which release the GIL, so the pool really runs them in
+parallel while the request thread waits.
+
+At most PASSWORD_HASH_MAX_PENDING jobs may be running or queued. Further
+requests get ``PasswordHasherBusy`` immediately, which the routes turn into a
+503, instead of queueing without bound.
+
+The algorithm and cost come from PASSWORD_HASH_METHOD (a werkzeug method
+string). ``needs_rehash`` tells whether a stored hash was made with other
+parameters, so it can be upgraded on the next successful login.
+"""
+
+# External imports
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Too many hashing jobs are running or queued.
+    """
+
+
+class PasswordHasher:
+    """
+    Bounded pool for hashing and verifying passwords.
+
+    Args:
+        method (str): werkzeug hash method, e.g. ``scrypt:32768:8:1`` or
+            ``pbkdf2:sha256:1000000``.
+        workers (int): Number of hashing threads.
+        max_pending (int): Number of jobs that may be running or queued.
+        timeout (float): Seconds a request waits for its job.
+    """
+
+    def __init__(self, method, workers, max_pending, timeout):
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._pending = threading.BoundedSemaphore(max(workers, max_pending))
+        # Methods like 'pbkdf2:sha256' get their default cost filled in, so
+        # compare stored hashes with the prefix of a real hash
+        self.method_prefix = generate_password_hash('', method=method).split('$', 1)[0]
+
+    def _run(self, function, *args):
+        """
+        Run ``function(*args)`` on the pool and wait for its result.
+
+        Raises:
+            PasswordHasherBusy: If the pool is saturated or the job timed out.
+        """
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        """
+        Hash a password with the configured method.
+
+        Returns:
+            str: The werkzeug hash string.
+
+        Raises:
+            PasswordHasherBusy: If the pool is saturated.
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        Check a password against a stored hash.
+
+        Returns:
+            bool: True if the password matches.
+
+        Raises:
+            PasswordHasherBusy: If the pool is saturated.
+        """
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Whether a stored hash was made with other parameters than the
+        configured method.
+        """
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+
+def init_passwords(app):
+    """
+    Create the password hasher of the app from its configuration.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+
+
+def get_password_hasher():
+    """
+    The password hasher of the current app.
+
+    Returns:
+        PasswordHasher: The hasher.
+    """
+    return current_app.extensions['password_hasher']
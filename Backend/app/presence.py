@@ -0,0 +1,246 @@
+"""
+Presence tracking: ``User.last_seen`` and the list of online users.
+
+Writing ``last_seen`` on every authenticated request would turn every read
+into a write and make active users contend for their row lock. Instead:
+
+- ``PresenceTracker.record`` notes the activity in memory. A user is queued
+  for a database write at most once per PRESENCE_WRITE_INTERVAL seconds,
+  across all workers: the first worker to claim ``presence/written/<id>`` in
+  the shared cache for the interval writes it, the others skip it.
+- ``flush`` runs every PRESENCE_FLUSH_INTERVAL seconds on a background
+  thread and writes all queued users with one statement per batch,
+  ``WITH seen (id, last_seen) AS (VALUES ...) UPDATE "user" ... FROM seen``,
+  a form of ``UPDATE ... FROM (VALUES ...)`` that PostgreSQL and SQLite
+  both accept.
+- Active user IDs are also published to per-minute sets in the shared cache,
+  ``presence/online/<minute>``. ``online_user_ids`` unions the sets of the
+  last PRESENCE_ONLINE_WINDOW seconds and never queries the user table.
+  Workers merge into the sets with read-modify-write, so an ID can be lost
+  from a minute when two flushes race; the next flush restores it.
+"""
+
+# External imports
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import DateTime, Integer, bindparam, text
+
+WRITE_KEY = 'presence/written/{}'
+ONLINE_KEY = 'presence/online/{}'
+BATCH_SIZE = 500
+
+
+def _minute(timestamp):
+    return int(timestamp // 60)
+
+
+class PresenceTracker:
+    """
+    Collects user activity and writes it to the database in batches.
+
+    Args:
+        shared_cache (flask_caching.backends.BaseCache): Cache shared by all
+            workers, used for the write throttle and the online sets.
+        write_interval (int): Least number of seconds between two writes of
+            the same user's last_seen.
+        online_window (int): Seconds after their last request that a user
+            counts as online.
+    """
+
+    def __init__(self, shared_cache, write_interval, online_window):
+        self.write_interval = write_interval
+        self.online_window = online_window
+        self._shared = shared_cache
+        self._lock = threading.Lock()
+        self._active = {}     # user_id -> time of the last request, for the online sets
+        self._published = {}  # user_id -> minute it was last published in
+        self._claimed = {}    # user_id -> time of the last queued write, the local throttle
+        self._pending = {}    # user_id -> last_seen waiting for the next flush
+
+    def record(self, user_id, now=None):
+        """
+        Note a request of a user.
+
+        Args:
+            user_id (int): ID of the user.
+            now (float, optional): Time of the request, defaults to the current time.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._active[user_id] = now
+            claimed = self._claimed.get(user_id)
+            if claimed is not None and now - claimed < self.write_interval:
+                return
+            self._claimed[user_id] = now
+        # Another worker wrote this user within the interval
+        if not self._shared.add(WRITE_KEY.format(user_id), 1, timeout=self.write_interval):
+            return
+        with self._lock:
+            self._pending[user_id] = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None)
+
+    def online_user_ids(self, now=None):
+        """
+        IDs of the users with a request in the last ``online_window`` seconds.
+
+        Returns:
+            list[int]: The user IDs, sorted.
+        """
+        now = time.time() if now is None else now
+        first_minute = _minute(now - self.online_window)
+        keys = [ONLINE_KEY.format(minute) for minute in range(first_minute, _minute(now) + 1)]
+        online = set()
+        for ids in self._shared.get_many(*keys):
+            online.update(ids or ())
+        with self._lock:
+            online.update(user_id for user_id, seen in self._active.items() if seen >= now - self.online_window)
+        return sorted(online)
+
+    def flush(self, now=None):
+        """
+        Publish the online users and write the queued last_seen values.
+        Must run in an app context. Failed writes are queued again.
+
+        Returns:
+            int: Number of users whose last_seen was written.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            unpublished = {}
+            for user_id, seen in self._active.items():
+                minute = _minute(seen)
+                if self._published.get(user_id) != minute:
+                    unpublished.setdefault(minute, set()).add(user_id)
+                    self._published[user_id] = minute
+            self._prune(now)
+
+        for minute, user_ids in unpublished.items():
+            key = ONLINE_KEY.format(minute)
+            self._shared.set(key, (self._shared.get(key) or set()) | user_ids,
+                             timeout=self.online_window + 120)
+
+        if not pending:
+            return 0
+        try:
+            write_last_seen(pending)
+        except Exception:
+            with self._lock:
+                for user_id, seen in pending.items():
+                    self._pending.setdefault(user_id, seen)
+            raise
+        return len(pending)
+
+    def _prune(self, now):
+        # Forget users that are neither online nor throttled any more
+        for user_id, seen in list(self._active.items()):
+            if seen < now - self.online_window:
+                del self._active[user_id]
+                self._published.pop(user_id, None)
+        for user_id, claimed in list(self._claimed.items()):
+            if claimed < now - self.write_interval:
+                del self._claimed[user_id]
+
+
+def write_last_seen(last_seen):
+    """
+    Set ``User.last_seen`` of many users, BATCH_SIZE users per statement.
+
+    Args:
+        last_seen (dict): ``{user_id: datetime}``.
+    """
+    # Imported here, as app/__init__.py imports this module before the models
+    from . import db
+    from .models import User
+
+    table = db.engine.dialect.identifier_preparer.quote(User.__tablename__)
+    items = list(last_seen.items())
+    with db.engine.begin() as connection:
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = items[start:start + BATCH_SIZE]
+            values = ', '.join(f"(:id{i}, :seen{i})" for i in range(len(batch)))
+            statement = text(
+                f"WITH seen (id, last_seen) AS (VALUES {values}) "
+                f"UPDATE {table} SET last_seen = seen.last_seen FROM seen WHERE {table}.id = seen.id"
+            ).bindparams(
+                *(bindparam(f"id{i}", type_=Integer) for i in range(len(batch))),
+                *(bindparam(f"seen{i}", type_=DateTime) for i in range(len(batch)))
+            )
+            params = {}
+            for i, (user_id, seen) in enumerate(batch):
+                params[f"id{i}"] = user_id
+                params[f"seen{i}"] = seen
+            connection.execute(statement, params)
+
+
+def _record_request(response):
+    """
+    after_request hook noting the user of requests with a verified JWT.
+    """
+    try:
+        get_jwt()
+    except RuntimeError:
+        # The endpoint did not verify a token
+        return response
+    user_id = get_jwt_identity()
+    if user_id is not None:
+        current_app.extensions['presence'].record(user_id)
+    return response
+
+
+def _flush_periodically(app, tracker, interval):
+    """
+    Start a daemon thread that flushes the tracker every ``interval``
+    seconds, and flush once more when the process exits.
+    """
+    def flush():
+        with app.app_context():
+            try:
+                tracker.flush()
+            except Exception as e:
+                app.logger.error(f"Could not write last_seen: {e}")
+
+    def run():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    threading.Thread(target=run, name='presence-flush', daemon=True).start()
+    atexit.register(flush)
+
+
+def init_presence(app):
+    """
+    Create the presence tracker of the app and record the user of every
+    authenticated request. Must run after the cache extension has been
+    initialized.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    # Imported here, as app/__init__.py imports this module before creating the cache
+    from . import cache
+
+    tracker = app.extensions['presence'] = PresenceTracker(
+        shared_cache=app.extensions['cache'][cache],
+        write_interval=app.config['PRESENCE_WRITE_INTERVAL'],
+        online_window=app.config['PRESENCE_ONLINE_WINDOW'],
+    )
+    app.after_request(_record_request)
+
+    interval = app.config.get('PRESENCE_FLUSH_INTERVAL', 0)
+    if interval:
+        _flush_periodically(app, tracker, interval)
+
+
+def get_presence():
+    """
+    The presence tracker of the current app.
+
+    Returns:
+        PresenceTracker: The tracker.
+    """
+    return current_app.extensions['presence']
@@ -0,0 +1,128 @@
+"""
+Cached public profiles.
+
+Author names, avatars and hover cards need the public profile of many users
+per page. ``public_profiles`` resolves any number of users by ID or username
+with at most one query: each public profile is cached for
+PROFILE_CACHE_TIMEOUT seconds under ``profile/public/<id>``, usernames are
+mapped to IDs under ``profile/username/<username_lower>``, and only the
+misses are loaded, together, from the user table.
+
+An entry is dropped on commit whenever the user row is changed through the
+ORM or its activity counters change (see app/user_stats.py). ``last_seen``
+is written outside the ORM (see app/presence.py) and may lag by up to the
+cache timeout, which is no coarser than its own write interval.
+"""
+
+# External imports
+from flask import current_app
+from sqlalchemy import event, inspect, or_
+
+# Internal imports
+from . import db, cache
+from . import user_stats
+from .models import User
+
+PROFILE_KEY = 'profile/public/{}'
+USERNAME_KEY = 'profile/username/{}'
+
+
+def _public_profile(user):
+    """
+    Cacheable public fields of a user. The picture is kept as stored;
+    the routes turn it into URLs.
+    """
+    return {
+        'id': user.id,
+        'username': user.username,
+        'displayName': user.display_name,
+        'title': user.title,
+        'location': user.location,
+        'aboutMe': user.about_me,
+        'profile_picture': user.profile_picture,
+        'website': user.website,
+        'twitter': user.twitter,
+        'github': user.github,
+        'role': user.role,
+        'createdAt': user.created_at,
+        'lastSeen': user.last_seen,
+        'stats': {
+            'threads': user.thread_count,
+            'comments': user.comment_count,
+            'snippets': user.snippet_count
+        }
+    }
+
+
+def public_profiles(user_ids=(), usernames=()):
+    """
+    Public profiles of users, from the cache where possible.
+
+    Args:
+        user_ids (list[int]): IDs of the users.
+        usernames (list[str]): Usernames in any case.
+
+    Returns:
+        list[dict]: The profiles of the users that exist, in the order they
+        were asked for, without duplicates.
+    """
+    names = [User.normalize_username(username) for username in usernames]
+    mapped = cache.get_many(*[USERNAME_KEY.format(name) for name in names]) if names else []
+    wanted = list(user_ids) + [user_id for user_id in mapped if user_id is not None]
+    cached = cache.get_many(*[PROFILE_KEY.format(user_id) for user_id in wanted]) if wanted else []
+    profiles = {user_id: profile for user_id, profile in zip(wanted, cached) if profile is not None}
+
+    missing_ids = {user_id for user_id in wanted if user_id not in profiles}
+    missing_names = {name for name, user_id in zip(names, mapped) if user_id is None}
+    if missing_ids or missing_names:
+        users = User.query.filter(or_(User.id.in_(missing_ids), User.username_lower.in_(missing_names))).all()
+        loaded = {user.id: _public_profile(user) for user in users}
+        timeout = current_app.config['PROFILE_CACHE_TIMEOUT']
+        cache.set_many({PROFILE_KEY.format(user_id): profile for user_id, profile in loaded.items()},
+                       timeout=timeout)
+        cache.set_many({USERNAME_KEY.format(user.username_lower): user.id for user in users if user.username_lower},
+                       timeout=timeout)
+        profiles.update(loaded)
+        ids_by_name = {user.username_lower: user.id for user in users}
+        mapped = [user_id if user_id is not None else ids_by_name.get(name) for name, user_id in zip(names, mapped)]
+
+    result, seen = [], set()
+    for user_id in list(user_ids) + mapped:
+        if user_id in profiles and user_id not in seen:
+            seen.add(user_id)
+            result.append(profiles[user_id])
+    return result
+
+
+def invalidate_profiles(user_ids, usernames=()):
+    """
+    Drop the cached profiles of users.
+
+    Args:
+        user_ids (Iterable[int]): IDs of the users.
+        usernames (Iterable[str]): Normalized usernames whose mapping to drop.
+    """
+    keys = [PROFILE_KEY.format(user_id) for user_id in user_ids]
+    keys += [USERNAME_KEY.format(name) for name in usernames]
+    if keys:
+        cache.delete_many(*keys)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _remember_profile_changes(session, flush_context, instances):
+    for user in session.dirty | session.deleted:
+        if isinstance(user, User) and user.id is not None:
+            changed = session.info.setdefault('profiles_changed', (set(), set()))
+            changed[0].add(user.id)
+            changed[1].update(name for name in inspect(user).attrs.username_lower.history.deleted if name)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_profiles(session):
+    user_ids, usernames = session.info.pop('profiles_changed', (set(), set()))
+    invalidate_profiles(user_ids | user_stats.changed_users(session), usernames)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_profile_changes(session):
+    session.info.pop('profiles_changed', None)
@@ -0,0 +1,182 @@
+"""
+Shared query builders for the listing endpoints.
+
+Every listing serializes the author of each row. Going through the lazy
+``author`` backref costs one extra SELECT per row, so these builders load the
+authors together with the rows instead: a join for many-to-one relations and
+a single ``IN`` query (``selectinload``) for collections, while long
+collections such as thread comments are paged separately.
+"""
+
+# External imports
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+# Internal imports
+from . import db
+from .models import User, Category, Thread, Comment, Snippet, News
+
+
+#=======================================
+# Users
+#=======================================
+def user_by_username(username):
+    """
+    Case-insensitive username lookup.
+
+    Compares the normalized name with the unique ``username_lower`` column
+    as is, so the lookup is a single index probe. Wrapping the column in
+    ``lower()`` would force a scan of the user table.
+
+    Args:
+        username (str): Username in any case.
+
+    Returns:
+        User: The user, or None if not found.
+    """
+    return User.query.filter(User.username_lower == User.normalize_username(username)).first()
+
+
+#=======================================
+# Forum
+#=======================================
+def categories_with_subcategories():
+    """
+    All categories with their subcategories, loaded in two queries.
+
+    Returns:
+        list[Category]: The categories.
+    """
+    return Category.query.options(selectinload(Category.subcategories)).order_by(Category.id).all()
+
+
+def thread_titles(thread_ids):
+    """
+    Titles of the given threads, loaded in a single query.
+
+    Args:
+        thread_ids (list[int]): Thread IDs; None values are ignored.
+
+    Returns:
+        dict: ``{thread_id: {'id': int, 'title': str}}``.
+    """
+    thread_ids = {thread_id for thread_id in thread_ids if thread_id is not None}
+    if not thread_ids:
+        return {}
+    rows = db.session.query(Thread.id, Thread.title).filter(Thread.id.in_(thread_ids))
+    return {row.id: {'id': row.id, 'title': row.title} for row in rows}
+
+
+def thread_summaries(subcategory_id):
+    """
+    Column-only listing of the threads in a subcategory.
+
+    Rows expose ``id``, ``title``, ``created_at``, ``comment_count``,
+    ``last_activity_at``, ``author_id`` and ``author_username``; the thread
+    content is never loaded.
+
+    Args:
+        subcategory_id (int): ID of the subcategory.
+
+    Returns:
+        Query: Unordered query, ready for pagination.
+    """
+    return db.session.query(
+        Thread.id,
+        Thread.title,
+        Thread.created_at,
+        Thread.comment_count,
+        Thread.last_activity_at,
+        User.id.label('author_id'),
+        User.username.label('author_username')
+    ).join(User, Thread.user_id == User.id).filter(Thread.subcategory_id == subcategory_id)
+
+
+def thread_detail(thread_id):
+    """
+    Load a thread with its author. Comments are paged separately through
+    ``thread_comments``.
+
+    Args:
+        thread_id (int): ID of the thread.
+
+    Returns:
+        Thread: The thread, or None if it does not exist.
+    """
+    return Thread.query.options(joinedload(Thread.author)).filter(Thread.id == thread_id).first()
+
+
+def thread_comments(thread_id):
+    """
+    Comments of a thread with their authors.
+
+    Args:
+        thread_id (int): ID of the thread.
+
+    Returns:
+        Query: Unordered query of Comment objects, ready for pagination.
+    """
+    return Comment.query.options(joinedload(Comment.author)).filter(Comment.thread_id == thread_id)
+
+
+#=======================================
+# Snippets
+#=======================================
+SNIPPET_PREVIEW_LENGTH = 200
+
+
+def snippet_summaries(language=None):
+    """
+    Column-only listing of snippets.
+
+    Rows expose ``id``, ``title``, ``language``, ``created_at``,
+    ``author_username`` and ``code_preview``, the first
+    SNIPPET_PREVIEW_LENGTH characters of the code cut in SQL. The full code
+    and description are never loaded.
+
+    Args:
+        language (str, optional): Programming language to filter by.
+
+    Returns:
+        Query: Unordered query, ready for pagination.
+    """
+    query = db.session.query(
+        Snippet.id,
+        Snippet.title,
+        Snippet.language,
+        Snippet.created_at,
+        User.username.label('author_username'),
+        func.substr(Snippet.code, 1, SNIPPET_PREVIEW_LENGTH).label('code_preview')
+    ).join(User, Snippet.user_id == User.id)
+    if language:
+        query = query.filter(Snippet.language == language)
+    return query
+
+
+#=======================================
+# News
+#=======================================
+def news_listing():
+    """
+    News articles with their authors, newest first.
+
+    Returns:
+        Query: Ordered query of News objects.
+    """
+    return News.query.options(joinedload(News.author)) \
+        .order_by(News.created_at.desc(), News.id.desc())
+
+
+def news_comments(news_id):
+    """
+    Comments of a news article with their authors, oldest first.
+
+    Args:
+        news_id (int): ID of the news article.
+
+    Returns:
+        Query: Ordered query of Comment objects.
+    """
+    return Comment.query.options(joinedload(Comment.author)) \
+        .filter(Comment.news_id == news_id) \
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
@@ -0,0 +1,221 @@
+"""
+Opt-in SQL profiler: slow statements and N+1 query patterns.
+
+Enabled with QUERY_PROFILER_ENABLED, it listens to the cursor events of the
+app's engine and reports, through the app logger with a ``query_report``
+field:
+
+- ``slow_query``: every statement slower than SLOW_QUERY_THRESHOLD_MS,
+  with its parameters and its plan (``EXPLAIN QUERY PLAN`` on SQLite,
+  ``EXPLAIN`` elsewhere).
+- ``n_plus_one``: statements of the same shape run at least
+  N_PLUS_ONE_THRESHOLD times within one request, such as the per-row user
+  loads behind a lazy ``thread.author``. Statements that differ only in
+  their parameters, or in the length of an ``IN`` list, have the same shape.
+
+Each report carries the route of the request and the line of application
+code that issued the statement (the innermost frame outside the standard
+library and the installed packages, relative to the working directory).
+The reports end up in the JSON log (see app/logger.py); ``flask queries
+report`` aggregates them offline.
+"""
+
+# External imports
+import json
+import os
+import re
+import sys
+import sysconfig
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)'
+# An IN list of placeholders of any length
+_PLACEHOLDER_LIST = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)')
+# Numbered parameter names, e.g. %(id_1)s or :param_2
+_NUMBERED_PARAMETER = re.compile(r'(%\(\w+?|:\w+?)_\d+')
+_WHITESPACE = re.compile(r'\s+')
+
+_CWD = os.getcwd() + os.sep
+_LIBRARY_PATHS = tuple({
+    path for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+    if (path := sysconfig.get_paths().get(name))
+})
+_EXPLAIN_SAVEPOINT = 'query_profiler_explain'
+
+
+def statement_shape(statement):
+    """
+    The statement with its parameter lists collapsed, so statements that only
+    differ in their parameters compare equal.
+
+    Args:
+        statement (str): SQL as sent to the driver.
+
+    Returns:
+        str: The normalized statement.
+    """
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _NUMBERED_PARAMETER.sub(r'\1', shape)
+    return _PLACEHOLDER_LIST.sub('(?...)', shape)
+
+
+def _caller():
+    """
+    ``file:line in function`` of the innermost application frame.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__ and not filename.startswith(_LIBRARY_PATHS):
+            if filename.startswith(_CWD):
+                filename = os.path.relpath(filename)
+            return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _explain(connection, statement, parameters):
+    """
+    Plan of a statement, run on a raw cursor so the profiler does not see it.
+
+    Outside SQLite the EXPLAIN runs inside a savepoint: it shares the
+    request's transaction, which a failed statement would otherwise leave
+    aborted for the rest of the request (PostgreSQL).
+    """
+    sqlite = connection.dialect.name == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN' if sqlite else 'EXPLAIN'
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if not sqlite:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        cursor.execute(f"{prefix} {statement}", parameters)
+        plan = [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+        if not sqlite:
+            cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        return plan
+    except Exception as e:
+        if not sqlite:
+            try:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            except Exception:
+                # No savepoint was set, as on an autocommit connection
+                pass
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def _request_fields():
+    if not has_request_context():
+        return {'route': None}
+    return {'route': request.endpoint, 'method': request.method, 'path': request.path}
+
+
+def _report(report, message):
+    current_app.logger.warning(message, extra={'query_report': report})
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_app_context():
+        return
+    duration_ms = (time.perf_counter() - context._profiler_started) * 1000
+    config = current_app.config
+    shape = statement_shape(statement)
+
+    location = None
+    if has_request_context():
+        statements = g.setdefault('query_profile', {})
+        seen = statements.get(shape)
+        if seen is None:
+            location = _caller()
+            statements[shape] = {'count': 1, 'location': location, 'duration_ms': duration_ms}
+        else:
+            seen['count'] += 1
+            seen['duration_ms'] += duration_ms
+
+    if duration_ms >= config['SLOW_QUERY_THRESHOLD_MS']:
+        report = {
+            'type': 'slow_query',
+            **_request_fields(),
+            'location': location or _caller(),
+            'statement': shape,
+            'parameters': repr(parameters)[:500],
+            'duration_ms': round(duration_ms, 2),
+            'plan': None if executemany else _explain(conn, statement, parameters),
+        }
+        _report(report, f"Slow query ({report['duration_ms']} ms) at {report['location']}")
+
+
+def _report_repeated_statements(response):
+    threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+    for shape, seen in g.pop('query_profile', {}).items():
+        if seen['count'] >= threshold:
+            report = {
+                'type': 'n_plus_one',
+                **_request_fields(),
+                'location': seen['location'],
+                'statement': shape,
+                'count': seen['count'],
+                'duration_ms': round(seen['duration_ms'], 2),
+            }
+            _report(report, f"Statement repeated {seen['count']} times in one request at {seen['location']}")
+    return response
+
+
+def init_query_profiler(app):
+    """
+    Profile the SQL of the app when QUERY_PROFILER_ENABLED is set. Must run
+    after the database extension has been initialized.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    # Imported here, as app/__init__.py imports this module before creating db
+    from . import db
+
+    if not app.config.get('QUERY_PROFILER_ENABLED'):
+        return
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    event.listen(engine, 'after_cursor_execute', _after_execute)
+    app.after_request(_report_repeated_statements)
+
+
+def aggregate_reports(lines, report_type=None):
+    """
+    Group the profiler reports found in JSON log lines.
+
+    Args:
+        lines (Iterable[str]): Lines of the JSON log; other lines are skipped.
+        report_type (str, optional): Only ``slow_query`` or ``n_plus_one``.
+
+    Returns:
+        list[dict]: One entry per type, route, location and statement, with
+        the number of reports, their total and maximum duration and the most
+        repetitions in one request; slowest in total first.
+    """
+    groups = {}
+    for line in lines:
+        try:
+            report = json.loads(line).get('query_report')
+        except (ValueError, AttributeError):
+            continue
+        if not report or (report_type and report['type'] != report_type):
+            continue
+        key = (report['type'], report.get('route'), report.get('location'), report['statement'])
+        group = groups.setdefault(key, {
+            'type': key[0], 'route': key[1], 'location': key[2], 'statement': key[3],
+            'reports': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'max_count': 0
+        })
+        group['reports'] += 1
+        group['total_ms'] += report['duration_ms']
+        group['max_ms'] = max(group['max_ms'], report['duration_ms'])
+        group['max_count'] = max(group['max_count'], report.get('count', 1))
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
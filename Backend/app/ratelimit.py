@@ -0,0 +1,226 @@
+"""
+Rate limiter helpers.
+
+- ``rate_limit_key`` keys limits on the JWT identity when the request carries a
+  valid token and on the client IP otherwise.
+- ``route_cost`` charges each endpoint its configured cost against the shared
+  application budget.
+- ``log_rate_limit_breach`` logs every 429 decision in a structured form and
+  counts it in the metrics.
+- ``SQLiteStorage`` is a ``limits`` storage registered for ``sqlite://`` URIs.
+  It keeps the counters in a local file shared by all worker processes and is
+  used when no Redis is configured.
+"""
+
+# External imports
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from limits.storage import MovingWindowSupport, Storage
+
+# Internal imports
+from .metrics import record_rate_limited
+
+
+#=======================================
+# Keys, costs and breach logging
+#=======================================
+def rate_limit_key():
+    """
+    Rate limit key of the current request.
+
+    Returns:
+        str: ``user:<id>`` for requests with a valid JWT, ``ip:<address>`` otherwise.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        # Invalid or expired tokens are rejected by @jwt_required() itself
+        user_id = None
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address()}"
+
+
+def route_cost():
+    """
+    Cost of the current endpoint against the application-wide budget.
+
+    Returns:
+        int: The cost from RATELIMIT_ROUTE_COSTS, 1 for unlisted endpoints.
+    """
+    return current_app.config.get('RATELIMIT_ROUTE_COSTS', {}).get(request.endpoint, 1)
+
+
+def log_rate_limit_breach(request_limit):
+    """
+    Log a rejected request. Called by Flask-Limiter for every breached limit.
+
+    Args:
+        request_limit (RequestLimit): The breached limit.
+    """
+    fields = {
+        'event': 'rate_limit_exceeded',
+        'key': rate_limit_key(),
+        'limit': str(request_limit.limit),
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path
+    }
+    record_rate_limited()
+    current_app.logger.warning(
+        "Rate limit exceeded " + " ".join(f"{name}={value}" for name, value in fields.items()),
+        extra={'rate_limit': fields}
+    )
+
+
+#=======================================
+# SQLite storage
+#=======================================
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """
+    Rate limit storage in a local SQLite file, for the fixed and moving window
+    strategies.
+
+    Every update runs in a ``BEGIN IMMEDIATE`` transaction, which takes the
+    database write lock, so check-and-acquire is atomic across threads and
+    processes sharing the file.
+
+    URI format: ``sqlite:///relative/path.db`` or ``sqlite:////absolute/path.db``.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, timeout=5.0, **options):
+        self.path = uri.split('://', 1)[1][1:] if uri else ':memory:'
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        if self.path != ':memory:':
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """
+        Connection of the current thread, reopened after a fork.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            if self.path != ':memory:':
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit_counter "
+                "(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit_entry "
+                "(key TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ratelimit_entry_key_created_at "
+                "ON ratelimit_entry (key, created_at)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ratelimit_entry_expires_at "
+                "ON ratelimit_entry (expires_at)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _transaction(self, work):
+        """
+        Run ``work(connection)`` inside a write-locked transaction.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(connection)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def incr(self, key, expiry, amount=1):
+        def work(connection):
+            now = time.time()
+            connection.execute("DELETE FROM ratelimit_counter WHERE key = ? AND expires_at <= ?", (key, now))
+            connection.execute(
+                "INSERT INTO ratelimit_counter (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, amount, now + expiry)
+            )
+            return connection.execute("SELECT value FROM ratelimit_counter WHERE key = ?", (key,)).fetchone()[0]
+        return self._transaction(work)
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM ratelimit_counter WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            "SELECT expires_at FROM ratelimit_counter WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        def work(connection):
+            counters = connection.execute("DELETE FROM ratelimit_counter").rowcount
+            entries = connection.execute("DELETE FROM ratelimit_entry").rowcount
+            return max(counters, entries)
+        return self._transaction(work)
+
+    def clear(self, key):
+        def work(connection):
+            connection.execute("DELETE FROM ratelimit_counter WHERE key = ?", (key,))
+            connection.execute("DELETE FROM ratelimit_entry WHERE key = ?", (key,))
+        self._transaction(work)
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+
+        def work(connection):
+            now = time.time()
+            connection.execute("DELETE FROM ratelimit_entry WHERE expires_at <= ?", (now,))
+            count = connection.execute(
+                "SELECT COUNT(*) FROM ratelimit_entry WHERE key = ? AND created_at > ?", (key, now - expiry)
+            ).fetchone()[0]
+            if count + amount > limit:
+                return False
+            connection.executemany(
+                "INSERT INTO ratelimit_entry (key, created_at, expires_at) VALUES (?, ?, ?)",
+                [(key, now, now + expiry)] * amount
+            )
+            return True
+        return self._transaction(work)
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        oldest, count = self._connection().execute(
+            "SELECT MIN(created_at), COUNT(*) FROM ratelimit_entry WHERE key = ? AND created_at > ?",
+            (key, now - expiry)
+        ).fetchone()
+        if not count:
+            return now, 0
+        return oldest, count
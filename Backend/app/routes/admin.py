@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify
+
+# Internal imports
+from app.caching import key_stats
+from app.chatgpt import get_chatgpt
+from app.decorators import role_required
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+#=======================================
+# Cache section
+#=======================================
+
+@bp.route('/cache-stats', methods=['GET'], endpoint='admin_cache_stats')
+@role_required(['super_admin'])
+def cache_stats():
+    """
+    Hit and miss counts per cache key of the worker serving the request.
+
+    Returns:
+        200: Counters per key, sorted by total lookups.
+        403: Unauthorized access for non-super-admins.
+    """
+    stats = sorted(key_stats().items(), key=lambda item: item[1]['hits'] + item[1]['misses'], reverse=True)
+    return jsonify([{
+        'key': key,
+        'hits': counts['hits'],
+        'misses': counts['misses']
+    } for key, counts in stats]), 200
+
+
+#=======================================
+# ChatGPT section
+#=======================================
+
+@bp.route('/chatgpt-stats', methods=['GET'], endpoint='admin_chatgpt_stats')
+@role_required(['super_admin'])
+def chatgpt_stats():
+    """
+    ChatGPT answer cache and deduplication counters of the worker serving the request.
+
+    Returns:
+        200: Cache hits, deduplicated questions, upstream calls and the hit rate.
+        403: Unauthorized access for non-super-admins.
+    """
+    return jsonify(get_chatgpt().stats()), 200
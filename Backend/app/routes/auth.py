@@ -1,17 +1,31 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from sqlalchemy import func
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import SQLAlchemyError
 
 # Internal imports
-from app import db
+from app import db, limiter
 from app.models import User
 from app.decorators import role_required
+from app.identity import create_user_token
+from app.queries import user_by_username
+from app.passwords import PasswordHasherBusy, get_password_hasher
 from app.validators import validate_registration, validate_login
 
 # Define the Blueprint
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# Seconds a client should wait before retrying when password hashing is saturated
+BUSY_RETRY_AFTER = 1
+
+
+def _hashing_busy():
+    """
+    Response for requests rejected because the password hashing pool is full.
+    """
+    current_app.logger.warning(f"Password hashing saturated, rejected {request.endpoint}")
+    return jsonify({'message': 'Server is busy, please try again shortly'}), 503, \
+        {'Retry-After': str(BUSY_RETRY_AFTER)}
+
 
 #=======================================
 # Auth section
@@ -24,12 +38,13 @@ def register():
 
     - Validates input data (email, username, password).
     - Ensures email and username are unique.
-    - Hashes the password before storing it in the database.
+    - Hashes the password on the hashing pool before storing it in the database.
     - Creates and saves a new user.
 
     Returns:
         201: User registered successfully.
         400: Missing or invalid input data.
+        503: Password hashing is saturated, retry later.
     """
     data = request.get_json()
 
@@ -39,20 +54,20 @@ def register():
         current_app.logger.warning(f"Registration validation failed: {errors}")
         return jsonify({'message': 'Validation failed', 'errors': errors}), 400
 
-    username_lower = data['username'].lower()
-
     # Check for username or email duplicates
-    if User.query.filter(func.lower(User.username_lower) == username_lower).first():
+    if user_by_username(data['username']):
         return jsonify({'message': 'Username already taken'}), 400
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'Email already registered'}), 400
 
     # Hash the password and save the new user
-    hashed_password = generate_password_hash(data['password'])
+    try:
+        hashed_password = get_password_hasher().hash(data['password'])
+    except PasswordHasherBusy:
+        return _hashing_busy()
     new_user = User(
         email=data['email'],
         username=data['username'],
-        username_lower=username_lower,
         password=hashed_password,
         accepted_privacy_policy=data['accepted_privacy_policy']
     )
@@ -64,18 +79,22 @@ def register():
 
 
 @bp.route('/login', methods=['POST'], endpoint='auth_login')
+@limiter.limit("10 per minute")
 def login():
     """
     Authenticate a user and provide a JWT token.
 
     - Validates username and password.
-    - Checks credentials against the database.
+    - Checks credentials against the database, verifying the password on the hashing pool.
+    - Upgrades the stored hash if it was made with outdated parameters.
     - Returns a JWT access token if authentication is successful.
 
     Returns:
         200: Login successful, returns a JWT token.
         400: Missing or invalid input data.
         401: Invalid credentials.
+        429: Too many login attempts.
+        503: Password hashing is saturated, retry later.
     """
     data = request.get_json()
 
@@ -86,9 +105,26 @@ def login():
         return jsonify({'message': 'Validation failed', 'errors': errors}), 400
 
     # Authenticate user
-    user = User.query.filter(func.lower(User.username_lower) == data['username'].lower()).first()
-    if user and check_password_hash(user.password, data['password']):
-        access_token = create_access_token(identity=user.id)
+    user = user_by_username(data['username'])
+    hasher = get_password_hasher()
+    try:
+        authenticated = user is not None and hasher.verify(user.password, data['password'])
+    except PasswordHasherBusy:
+        return _hashing_busy()
+
+    if authenticated:
+        if hasher.needs_rehash(user.password):
+            try:
+                user.password = hasher.hash(data['password'])
+                db.session.commit()
+                current_app.logger.info(f"Upgraded password hash of user {user.username}")
+            except PasswordHasherBusy:
+                pass  # Upgraded on a later login
+            except SQLAlchemyError:
+                # The old hash still verifies, so the login goes ahead
+                db.session.rollback()
+                current_app.logger.exception(f"Could not store the upgraded password hash of user {user.username}")
+        access_token = create_user_token(user)
         current_app.logger.info(f"User {user.username} logged in successfully")
         return jsonify({'access_token': access_token, 'username': user.username, 'role': user.role}), 200
 
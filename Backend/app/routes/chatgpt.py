@@ -3,25 +3,27 @@ ChatGPT Integration Blueprint.
 
 This module provides routes for:
 - Asking questions to OpenAI's GPT model.
-- Returning AI-generated answers.
+- Returning AI-generated answers, in one piece or streamed as Server-Sent Events.
 
 Requires:
 - JWT authentication for access control.
-- OpenAI API key stored in the database.
+- The ChatGPT service set up by `create_app` (see app/chatgpt.py).
 """
 
 # External imports
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import openai
 
 # Internal imports
-from .. import db
-from app.models import User
+from app.chatgpt import ChatGPTBusy, ChatGPTError, get_chatgpt
 
 # Define the Blueprint
 bp = Blueprint('chatgpt', __name__, url_prefix='/chatgpt')
 
+# Seconds a client should wait before retrying when all slots are taken
+BUSY_RETRY_AFTER = 5
+
 
 @bp.route('/ask', methods=['POST'])
 @jwt_required()
@@ -30,13 +32,20 @@ def ask_chatgpt():
     Handle questions to OpenAI's GPT model.
 
     - Validates the request to ensure a question is provided.
-    - Fetches the OpenAI API key from the database.
-    - Sends the question to OpenAI's API and returns the response.
+    - Hands the question to the ChatGPT worker pool.
+    - Streams the answer as Server-Sent Events when the client accepts
+      `text/event-stream`, otherwise returns it as JSON once complete.
+
+    Event stream:
+        - `data: {"token": "..."}` for every chunk of the answer.
+        - `event: done` when the answer is complete.
+        - `event: error` if OpenAI fails or times out mid-answer.
 
     Returns:
         200: AI-generated answer to the question.
         400: Missing or invalid input data.
-        500: Error communicating with OpenAI.
+        503: All ChatGPT slots are busy, retry later.
+        504: Error communicating with OpenAI or timeout.
     """
     # Parse and validate the input data
     data = request.get_json()
@@ -44,22 +53,37 @@ def ask_chatgpt():
     if not question:
         return jsonify({'message': 'Question is required'}), 400
 
-    # Fetch OpenAI API key from the database
-    openai.api_key = db.session.query(db.func.current_setting('openai_api_key')).scalar()
-
     try:
-        # Send the question to OpenAI and retrieve the response
-        response = openai.Completion.create(
-            engine="text-davinci-003",  # Specify the GPT model to use
-            prompt=question,
-            max_tokens=150,
-            n=1,
-            stop=None,
-            temperature=0.7,  # Adjust the creativity of the response
+        chunks = get_chatgpt().stream(question)
+    except ChatGPTBusy:
+        current_app.logger.warning(f"ChatGPT busy, rejected question from user {get_jwt_identity()}")
+        return jsonify({'message': 'ChatGPT is busy, please try again shortly'}), 503, \
+            {'Retry-After': str(BUSY_RETRY_AFTER)}
+
+    if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+        return Response(
+            stream_with_context(_event_stream(chunks)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
         )
-        # Extract the answer from the response
-        answer = response.choices[0].text.strip()
-        return jsonify({'answer': answer}), 200
-    except Exception as e:
-        # Handle errors from OpenAI or the system
-        return jsonify({'message': 'Error communicating with OpenAI', 'error': str(e)}), 500
+
+    try:
+        answer = ''.join(chunks).strip()
+    except ChatGPTError as e:
+        current_app.logger.error(f"Error communicating with OpenAI: {e}")
+        return jsonify({'message': 'Error communicating with OpenAI', 'error': str(e)}), 504
+    return jsonify({'answer': answer}), 200
+
+
+def _event_stream(chunks):
+    """
+    Format answer chunks as Server-Sent Events.
+    """
+    try:
+        for chunk in chunks:
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+    except ChatGPTError as e:
+        current_app.logger.error(f"Error communicating with OpenAI: {e}")
+        yield f"event: error\ndata: {json.dumps({'message': 'Error communicating with OpenAI'})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
@@ -4,33 +4,53 @@ from marshmallow import ValidationError
 
 # Local imports
 from app.decorators import resource_author_or_admin_required
-from app import cache
+from app.caching import cached_view, invalidate
 from app import limiter
 from ..validators import ThreadSchema, CategorySchema, SubcategorySchema, CommentSchema
 from .. import db
 from ..models import Category, Subcategory, Thread, Comment
+from .. import queries
+from .. import forum_stats
+from ..pagination import get_page_args, paginate_keyset
 
 bp = Blueprint('forum', __name__, url_prefix='/forum')
 
+# Orderings of the thread listing of a subcategory
+THREAD_SORT_COLUMNS = {
+    'created': Thread.created_at,
+    'activity': Thread.last_activity_at
+}
+
 
 @bp.route('/categories', methods=['GET'], endpoint='forum_get_categories')
-@cache.cached(timeout=60)
+@cached_view(tags=['category'])
 @limiter.limit("10 per minute")
 def get_categories():
     """
-    Fetch all categories with their subcategories.
+    Fetch all categories with their subcategories and their activity stats.
+
+    The stats are read from the denormalized columns maintained by
+    `forum_stats`, so the cost does not depend on the number of posts.
 
     Returns:
         200: A list of categories and their subcategories.
     """
-    categories = Category.query.all()
+    categories = queries.categories_with_subcategories()
+    latest_threads = queries.thread_titles(
+        [subcategory.last_thread_id for category in categories for subcategory in category.subcategories]
+    )
     result = [{
         'id': category.id,
         'name': category.name,
         'subcategories': [{
             'id': subcategory.id,
             'name': subcategory.name,
-            'description': subcategory.description
+            'description': subcategory.description,
+            'thread_count': subcategory.thread_count,
+            'comment_count': subcategory.comment_count,
+            'last_activity_at': subcategory.last_activity_at,
+            'last_post_id': subcategory.last_post_id,
+            'last_thread': latest_threads.get(subcategory.last_thread_id)
         } for subcategory in category.subcategories]
     } for category in categories]
 
@@ -64,7 +84,9 @@ def create_thread():
         user_id=user_id
     )
     db.session.add(new_thread)
+    forum_stats.record_thread(new_thread)
     db.session.commit()
+    invalidate('category')
 
     current_app.logger.info(f"User {user_id} created thread {new_thread.id} in subcategory {data['subcategory_id']}")
     return jsonify({'message': 'Thread created successfully', 'thread': {'id': new_thread.id}}), 201
@@ -75,39 +97,45 @@ def create_thread():
 @limiter.limit("10 per minute")
 def get_thread(thread_id):
     """
-    Fetch a specific thread with its comments.
+    Fetch a specific thread with the first page of its comments.
+
+    Comments are ordered oldest first; further pages are fetched from
+    `get_comments` with the returned `next_cursor`.
 
     Args:
         thread_id (int): ID of the thread.
 
+    Query Parameters:
+        - limit (int): Number of comments on the first page (max 100).
+
     Returns:
-        200: Thread details and its comments.
+        200: Thread details, its first page of comments and the cursor for the next page.
         404: Thread not found.
     """
-    thread = Thread.query.get(thread_id)
+    thread = queries.thread_detail(thread_id)
 
     if not thread:
         current_app.logger.warning(f"Thread with ID {thread_id} not found.")
         return jsonify({'message': 'Thread not found'}), 404
 
+    limit, _ = get_page_args()
+    comments, next_cursor = paginate_keyset(
+        queries.thread_comments(thread.id), Comment.created_at, Comment.id, limit, descending=False
+    )
+
     result = {
         'id': thread.id,
         'title': thread.title,
         'content': thread.content,
         'created_at': thread.created_at,
+        'comment_count': thread.comment_count,
+        'last_activity_at': thread.last_activity_at,
         'author': {
             'id': thread.author.id,
             'username': thread.author.username
         },
-        'comments': [{
-            'id': comment.id,
-            'content': comment.content,
-            'created_at': comment.created_at,
-            'author': {
-                'id': comment.author.id,
-                'username': comment.author.username
-            }
-        } for comment in thread.comments]
+        'comments': [_serialize_comment(comment) for comment in comments],
+        'next_cursor': next_cursor
     }
 
     return jsonify(result), 200
@@ -127,19 +155,26 @@ def create_comment(thread_id):
     Returns:
         201: Comment created successfully.
         400: Missing or invalid data.
+        404: Thread not found.
     """
     schema = CommentSchema()
     data = schema.load(request.get_json())
 
-    
+    thread = Thread.query.get(thread_id)
+    if not thread:
+        current_app.logger.warning(f"Thread with ID {thread_id} not found.")
+        return jsonify({'message': 'Thread not found'}), 404
+
     content = data.get('content')
     user_id = get_jwt_identity()
 
-
-    current_app.logger.info(f"User {user_id} from IP {request.remote_addr} added comment: {content} to {thread_id}")
     new_comment = Comment(content=content, user_id=user_id, thread_id=thread_id)
     db.session.add(new_comment)
+    forum_stats.record_comment(new_comment, thread)
     db.session.commit()
+    invalidate('category')
+
+    current_app.logger.info(f"User {user_id} from IP {request.remote_addr} added comment {new_comment.id} to {thread_id}")
 
     return jsonify({
     'message': 'Comment created successfully',
@@ -160,13 +195,18 @@ def create_comment(thread_id):
 @limiter.limit("10 per minute")
 def get_comments(thread_id):
     """
-    Fetch all comments for a specific thread.
+    Fetch a page of comments for a specific thread, oldest first.
 
     Args:
         thread_id (int): ID of the thread.
 
+    Query Parameters:
+        - limit (int): Number of comments per page (max 100).
+        - cursor (str): `next_cursor` from the thread or the previous page.
+
     Returns:
-        200: List of comments.
+        200: List of comments and the cursor for the next page.
+        400: Invalid cursor.
         404: Thread not found.
     """
     thread = Thread.query.get(thread_id)
@@ -174,9 +214,21 @@ def get_comments(thread_id):
         current_app.logger.warning(f"Thread with ID {thread_id} not found.")
         return jsonify({'message': 'Thread not found'}), 404
 
-    comments = Comment.query.filter_by(thread_id=thread.id).order_by(Comment.created_at.asc()).all()
+    limit, cursor = get_page_args()
+    comments, next_cursor = paginate_keyset(
+        queries.thread_comments(thread.id), Comment.created_at, Comment.id, limit, cursor, descending=False
+    )
 
-    result = [{
+    result = [_serialize_comment(comment) for comment in comments]
+
+    return jsonify({'comments': result, 'next_cursor': next_cursor}), 200
+
+
+def _serialize_comment(comment):
+    """
+    Serialize a thread comment with its (eagerly loaded) author.
+    """
+    return {
         'id': comment.id,
         'content': comment.content,
         'created_at': comment.created_at,
@@ -184,9 +236,7 @@ def get_comments(thread_id):
             'id': comment.author.id,
             'username': comment.author.username
         }
-    } for comment in comments]
-
-    return jsonify(result), 200
+    }
     
 
 
@@ -195,34 +245,52 @@ def get_comments(thread_id):
 @limiter.limit("10 per minute")
 def get_threads_in_subcategory(subcategory_id):
     """
-    Fetch all threads in a specific subcategory.
+    Fetch a page of threads in a specific subcategory, newest first.
+
+    Only a summary of each thread is returned; the content is loaded by
+    `get_thread`.
 
     Args:
         subcategory_id (int): ID of the subcategory.
 
+    Query Parameters:
+        - limit (int): Number of threads per page (max 100).
+        - cursor (str): `next_cursor` from the previous page.
+        - sort (str): `created` (default) for the newest threads first,
+          `activity` for the most recently active threads first.
+
     Returns:
-        200: List of threads.
+        200: List of thread summaries and the cursor for the next page.
+        400: Invalid cursor or sort order.
         404: Subcategory not found.
     """
+    sort = request.args.get('sort', 'created')
+    if sort not in THREAD_SORT_COLUMNS:
+        return jsonify({'message': f"Invalid sort order: {sort}"}), 400
+
     subcategory = Subcategory.query.get(subcategory_id)
     if not subcategory:
         current_app.logger.warning(f"subcategory with ID {subcategory_id} not found.")
         return jsonify({'message': 'subcategory not found'}), 404
 
-    threads = Thread.query.filter_by(subcategory_id=subcategory.id).order_by(Thread.created_at.desc()).all()
+    limit, cursor = get_page_args()
+    threads, next_cursor = paginate_keyset(
+        queries.thread_summaries(subcategory.id), THREAD_SORT_COLUMNS[sort], Thread.id, limit, cursor
+    )
 
     result = [{
         'id': thread.id,
         'title': thread.title,
-        'content': thread.content,
         'created_at': thread.created_at,
+        'comment_count': thread.comment_count,
+        'last_activity_at': thread.last_activity_at,
         'author': {
-            'id': thread.author.id,
-            'username': thread.author.username
+            'id': thread.author_id,
+            'username': thread.author_username
         }
     } for thread in threads]
 
-    return jsonify(result), 200
+    return jsonify({'threads': result, 'next_cursor': next_cursor}), 200
 
 
 @bp.route('/latest', methods=['GET'], endpoint='forum_get_latest_posts')
@@ -255,7 +323,8 @@ def get_latest_threads():
 
 @bp.route('/categories', methods=['POST'], endpoint='forum_create_category')
 @limiter.limit("10 per minute")
-@resource_author_or_admin_required
+@jwt_required()
+@resource_author_or_admin_required()
 def create_category():
     """
     Create a new forum category.
@@ -272,9 +341,13 @@ def create_category():
 
     name = data.get('name')
 
+    if Category.query.filter_by(name=name).first():
+        return jsonify({'message': 'Category already exists'}), 400
+
     new_category = Category(name=name)
     db.session.add(new_category)
     db.session.commit()
+    invalidate('category')
 
     current_app.logger.info(f"New category '{name}' created with ID {new_category.id}")
     return jsonify({
@@ -284,7 +357,8 @@ def create_category():
 
 @bp.route('/categories/<int:category_id>/subcategories', methods=['POST'], endpoint='forum_create_subcategory')
 @limiter.limit("10 per minute")
-@resource_author_or_admin_required
+@jwt_required()
+@resource_author_or_admin_required()
 def create_subcategory(category_id):
     """
     Create a new subcategory under a specific category.
@@ -311,6 +385,7 @@ def create_subcategory(category_id):
     new_subcategory = Subcategory(name=data['name'], category_id=category.id)
     db.session.add(new_subcategory)
     db.session.commit()
+    invalidate('category')
 
     current_app.logger.info(f"Subcategory '{new_subcategory.name}' created in category {category_id} with ID {new_subcategory.id}")
     return jsonify({
@@ -0,0 +1,38 @@
+"""
+Metrics Blueprint exposing the Prometheus metrics (see app/metrics.py).
+"""
+
+# External imports
+import hmac
+from flask import Blueprint, current_app, jsonify, request
+
+# Internal imports
+from app import limiter
+from app.metrics import render_metrics
+
+# Define the Blueprint
+bp = Blueprint('metrics', __name__)
+# Scrapes are not charged to the rate limit
+limiter.exempt(bp)
+
+
+#=======================================
+# Metrics Endpoints
+#=======================================
+@bp.route('/metrics', methods=['GET'], endpoint='metrics')
+def metrics():
+    """
+    All metrics in the Prometheus text format.
+
+    When METRICS_AUTH_TOKEN is set, the scraper must send it as a bearer token.
+
+    Returns:
+        200: The metrics.
+        401: Missing or wrong token.
+    """
+    token = current_app.config.get('METRICS_AUTH_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({'message': 'Unauthorized'}), 401
+
+    body, content_type = render_metrics()
+    return body, 200, {'Content-Type': content_type}
@@ -6,6 +6,7 @@ from .. import db
 from app.models import News, User, Comment
 from app.decorators import news_admin_required
 from app import limiter
+from app import queries
 
 bp = Blueprint('news', __name__, url_prefix='/news')
 
@@ -99,8 +100,7 @@ def get_all_news():
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
-    news_query = News.query.order_by(News.created_at.desc())
-    news_pagination = news_query.paginate(page=page, per_page=per_page, error_out=False)
+    news_pagination = queries.news_listing().paginate(page=page, per_page=per_page, error_out=False)
 
     result = [{
         'id': n.id,
@@ -231,7 +231,7 @@ def get_comments_in_news(news_id):
         200: List of comments.
     """
     news = News.query.get_or_404(news_id)
-    comments = Comment.query.filter_by(news_id=news.id).order_by(Comment.created_at.asc()).all()
+    comments = queries.news_comments(news.id).all()
 
     result = [{
         'id': comment.id,
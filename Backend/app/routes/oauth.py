@@ -4,21 +4,22 @@ OAuth Blueprint for handling third-party authentication.
 This module provides:
 - GitHub and Google OAuth integration.
 - Login redirection to the respective providers.
-- Callback handling to fetch user information.
+- Callback handling to fetch user information (see app/oauth_providers.py).
 - Automatic user creation and JWT token generation.
 """
 
 # External imports
 import os
-from flask import Blueprint, redirect, url_for, session, jsonify
+from flask import Blueprint, current_app, redirect, url_for, session, jsonify
 from flask_dance.contrib.github import make_github_blueprint, github
 from flask_dance.contrib.google import make_google_blueprint, google
-from flask_jwt_extended import create_access_token
-from sqlalchemy import func
 
 # Internal imports
 from .. import db
 from app.models import User
+from app.identity import create_user_token
+from app.oauth_providers import OAuthProviderError, fetch_profile
+from app.queries import user_by_username
 
 # Define the Blueprint
 bp = Blueprint('oauth', __name__, url_prefix='/oauth')
@@ -68,6 +69,7 @@ def oauth_callback(provider):
     Handle the callback from the OAuth provider.
 
     - Fetches user information from the provider.
+    - Looks the user up by its provider account, `(oauth_provider, oauth_id)`.
     - Creates a new user in the database if not already registered.
     - Generates a JWT token for the authenticated user.
 
@@ -76,52 +78,40 @@ def oauth_callback(provider):
 
     Returns:
         200: User authenticated successfully with a JWT token.
-        400: If user information or email is unavailable.
+        400: If the provider is unsupported or the email is unavailable.
+        409: If the email or username belongs to another account.
+        502: If user information could not be fetched from the provider.
     """
-    if provider == 'github' and not github.authorized:
-        return redirect(url_for('github.login'))
-    if provider == 'google' and not google.authorized:
-        return redirect(url_for('google.login'))
-
-    # Fetch user info based on the provider
-    if provider == 'github':
-        resp = github.get('/user')
-        if not resp.ok:
-            return jsonify({'message': 'Failed to fetch user info from GitHub'}), 400
-        github_info = resp.json()
-
-        email_resp = github.get('/user/emails')
-        if not email_resp.ok:
-            return jsonify({'message': 'Failed to fetch user emails from GitHub'}), 400
-        emails = email_resp.json()
-        primary_emails = [email['email'] for email in emails if email.get('primary') and email.get('verified')]
-        email = primary_emails[0] if primary_emails else None
-        username = github_info.get('login')
-        oauth_id = str(github_info.get('id'))
-
-    elif provider == 'google':
-        resp = google.get('/oauth2/v2/userinfo')
-        if not resp.ok:
-            return jsonify({'message': 'Failed to fetch user info from Google'}), 400
-        google_info = resp.json()
-        email = google_info.get('email')
-        username = google_info.get('name')
-        oauth_id = google_info.get('id')
+    oauth = {'github': github, 'google': google}.get(provider)
+    if oauth is None:
+        return jsonify({'message': 'Unsupported provider'}), 400
+    if not oauth.authorized:
+        return redirect(url_for(f'{provider}.login'))
+
+    # Fetch user info from the provider
+    try:
+        profile = fetch_profile(provider, oauth.token['access_token'])
+    except OAuthProviderError as e:
+        current_app.logger.warning(f"Failed to fetch user info from {provider}: {e}")
+        return jsonify({'message': f'Failed to fetch user info from {provider}'}), 502
+    email = profile['email']
+    username = profile['username']
+    oauth_id = profile['oauth_id']
 
     # Validate the email
     if not email:
         return jsonify({'message': 'Email not available from OAuth provider'}), 400
 
-    # Standardize username to lowercase
-    username_lower = username.lower() if username else None
-
     # Check if the user already exists, otherwise create a new one
-    user = User.query.filter(func.lower(User.username_lower) == username_lower).first()
+    user = User.query.filter_by(oauth_provider=provider, oauth_id=oauth_id).first()
     if not user:
+        if User.query.filter_by(email=email).first():
+            return jsonify({'message': 'An account with this email already exists'}), 409
+        if username and user_by_username(username):
+            return jsonify({'message': 'Username is already taken'}), 409
         user = User(
             email=email,
             username=username,
-            username_lower=username_lower,
             oauth_provider=provider,
             oauth_id=oauth_id
         )
@@ -129,5 +119,5 @@ def oauth_callback(provider):
         db.session.commit()
 
     # Generate a JWT token
-    access_token = create_access_token(identity=user.id)
+    access_token = create_user_token(user)
     return jsonify({'access_token': access_token, 'username': user.username}), 200
@@ -1,18 +1,43 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
-import os
 from .. import db
+from ..avatars import InvalidImage, avatar_urls, store_avatar
 from ..models import User
+from ..identity import current_user
+from ..presence import get_presence
+from ..profiles import public_profiles
 
 bp = Blueprint('profile', __name__, url_prefix='/profile')
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+MAX_BULK_USERS = 100
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def profile_pictures(profile_picture):
+    """
+    Variant URLs of a stored profile picture, see app/avatars.py.
+
+    Args:
+        profile_picture (str): ``User.profile_picture``.
+
+    Returns:
+        dict: ``{size: {'webp': url, 'jpeg': url}}``.
+    """
+    return avatar_urls(profile_picture, f"{request.url_root}uploads/", current_app.config['AVATAR_SIZES'])
+
+
+def profile_picture_url(pictures):
+    """
+    URL of the largest JPEG variant, the single picture older clients show.
+    """
+    if not pictures:
+        return None
+    return pictures[max(pictures, key=int)]['jpeg']
+
+
 @bp.route('', methods=['GET'], endpoint='get_profile')
 @jwt_required()
 def get_profile():
@@ -24,12 +49,12 @@ def get_profile():
         404: User not found.
     """
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         current_app.logger.warning(f"User with ID {user_id} not found.")
         return jsonify({'message': 'User not found'}), 404
     
-    profile_picture_url = f"{request.url_root}uploads/{user.profile_picture}"
+    pictures = profile_pictures(user.profile_picture)
 
     current_app.logger.info(f"Profile data retrieved for user {user.username}.")
     return jsonify({
@@ -40,7 +65,8 @@ def get_profile():
         'title': user.title,
         'location': user.location,
         'aboutMe': user.about_me,
-        'profile_picture': profile_picture_url,
+        'profile_picture': profile_picture_url(pictures),
+        'profile_pictures': pictures,
         'website': user.website,
         'twitter': user.twitter,
         'github': user.github,
@@ -50,6 +76,59 @@ def get_profile():
     }), 200
 
 
+@bp.route('/online', methods=['GET'], endpoint='online_users')
+def online_users():
+    """
+    Users with a request in the last PRESENCE_ONLINE_WINDOW seconds.
+
+    Read from the presence tracker only, without querying the user table.
+
+    Returns:
+        200: Number and IDs of the online users.
+    """
+    user_ids = get_presence().online_user_ids()
+    return jsonify({'count': len(user_ids), 'user_ids': user_ids}), 200
+
+
+def _with_picture_urls(profile):
+    """
+    A cached public profile with its stored picture turned into URLs.
+    """
+    pictures = profile_pictures(profile['profile_picture'])
+    return {**profile, 'profile_picture': profile_picture_url(pictures), 'profile_pictures': pictures}
+
+
+@bp.route('/users', methods=['GET'], endpoint='get_user_profiles')
+def get_user_profiles():
+    """
+    Retrieve the public profiles of many users at once.
+
+    Query parameters:
+        - ids (str): Comma-separated user IDs.
+        - usernames (str): Comma-separated usernames, in any case.
+
+    At most 100 users can be requested. Profiles are served from the cache
+    and the rest are loaded with a single query.
+
+    Returns:
+        200: Profiles of the users that exist, in the requested order.
+        400: No users, too many users or an invalid ID.
+    """
+    try:
+        user_ids = [int(user_id) for user_id in request.args.get('ids', '').split(',') if user_id.strip()]
+    except ValueError:
+        return jsonify({'message': 'ids must be comma-separated integers'}), 400
+    usernames = [username.strip() for username in request.args.get('usernames', '').split(',') if username.strip()]
+
+    if not user_ids and not usernames:
+        return jsonify({'message': 'ids or usernames is required'}), 400
+    if len(user_ids) + len(usernames) > MAX_BULK_USERS:
+        return jsonify({'message': f'At most {MAX_BULK_USERS} users can be requested at once'}), 400
+
+    profiles = public_profiles(user_ids=user_ids, usernames=usernames)
+    return jsonify({'users': [_with_picture_urls(profile) for profile in profiles]}), 200
+
+
 @bp.route('/users/<string:username>', methods=['GET'], endpoint='get_user_profile')
 def get_user_profile(username):
     """
@@ -59,29 +138,16 @@ def get_user_profile(username):
         username (str): The username of the user.
 
     Returns:
-        200: User profile data.
+        200: User profile data, with thread, comment and snippet counts.
         404: User not found.
     """
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    profiles = public_profiles(usernames=[username])
+    if not profiles:
         current_app.logger.warning(f"User with username '{username}' not found.")
         return jsonify({'message': 'User not found'}), 404
 
     current_app.logger.info(f"Profile data retrieved for user {username}.")
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'displayName': user.display_name,
-        'title': user.title,
-        'location': user.location,
-        'aboutMe': user.about_me,
-        'website': user.website,
-        'twitter': user.twitter,
-        'github': user.github,
-        'role': user.role,
-        'createdAt': user.created_at,
-        'lastSeen': user.last_seen
-    }), 200
+    return jsonify(_with_picture_urls(profiles[0])), 200
 
 
 @bp.route('/users/<string:username>', methods=['PUT'], endpoint='update_user_profile')
@@ -99,7 +165,7 @@ def update_user_profile(username):
         404: User not found or unauthorized.
     """
     user_id = get_jwt_identity()
-    user = User.query.filter_by(id=user_id, username=username).first()
+    user = User.query.filter_by(id=user_id, username_lower=User.normalize_username(username)).first()
     if not user:
         current_app.logger.warning(f"Unauthorized profile update attempt by user ID {user_id}.")
         return jsonify({'message': 'User not found or unauthorized'}), 404
@@ -148,6 +214,14 @@ def update_user_profile(username):
 def upload_profile_picture():
     """
     Endpoint to upload a profile picture for the current user.
+
+    The image is resized into the sizes in AVATAR_SIZES and stored as WebP
+    and JPEG under the hash of the upload (see app/avatars.py).
+
+    Returns:
+        200: Picture stored, with the URLs of its variants.
+        400: No file, or the file is not a supported image.
+        404: User not found.
     """
     if 'file' not in request.files:
         return jsonify({'message': 'No file part'}), 400
@@ -157,19 +231,27 @@ def upload_profile_picture():
         return jsonify({'message': 'No selected file'}), 400
 
     if file and allowed_file(file.filename):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'message': 'User not found'}), 404
 
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-
-        # Uppdatera användarens profilbild
-        user.profile_picture = filename
+        try:
+            user.profile_picture = store_avatar(
+                file.stream,
+                current_app.config['UPLOAD_FOLDER'],
+                current_app.config['AVATAR_SIZES'],
+                current_app.config['AVATAR_MAX_PIXELS']
+            )
+        except InvalidImage as e:
+            current_app.logger.warning(f"Invalid profile picture from user {user.username}: {e}")
+            return jsonify({'message': 'Invalid image'}), 400
         db.session.commit()
 
-        return jsonify({'message': 'Profile picture uploaded successfully', 'profile_picture': filename}), 200
+        pictures = profile_pictures(user.profile_picture)
+        return jsonify({
+            'message': 'Profile picture uploaded successfully',
+            'profile_picture': profile_picture_url(pictures),
+            'profile_pictures': pictures
+        }), 200
 
-    return jsonify({'message': 'Invalid file type'}), 400
\ No newline at end of file
+    return jsonify({'message': 'Invalid file type'}), 400
@@ -0,0 +1,47 @@
+from flask import Blueprint, request, jsonify
+from app import limiter
+from app.search import KINDS, search as run_search
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Define the Blueprint
+bp = Blueprint('search', __name__, url_prefix='/search')
+
+
+#=======================================
+# Search Endpoints
+#=======================================
+@bp.route('', methods=['GET'], strict_slashes=False, endpoint='search')
+@limiter.limit("30 per minute")
+def search():
+    """
+    Ranked full-text search over threads, comments, snippets and news.
+
+    Query parameters:
+        - q (str): Search text. Every word must match, the last one as a prefix.
+        - type (str, optional): Comma-separated kinds to search
+          (thread, comment, snippet, news). Defaults to all of them.
+        - page (int, optional): Page number, starting at 1.
+        - per_page (int, optional): Hits per page, at most 100.
+
+    Returns:
+        200: Hits ordered by relevance, with HTML highlights.
+        400: Empty query or unknown type.
+    """
+    query_text = request.args.get('q', '').strip()
+    kinds = None
+    if request.args.get('type'):
+        kinds = [kind.strip() for kind in request.args['type'].split(',') if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            return jsonify({'message': f"Unknown type: {', '.join(unknown)}"}), 400
+
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = max(1, min(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+    hits, has_next = run_search(query_text, kinds=kinds, page=page, per_page=per_page)
+    return jsonify({
+        'results': hits,
+        'page': page,
+        'per_page': per_page,
+        'has_next': has_next
+    }), 200
@@ -1,44 +1,113 @@
 from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.decorators import resource_author_or_admin_required
-from app import db, cache, limiter
+from app import db, limiter
+from app.caching import cached_view, invalidate
 from app.models import Snippet
+from app import queries
+from app.pagination import get_page_args, paginate_keyset
 from ..validators import SnippetsSchema
 
 # Define the Blueprint
 bp = Blueprint('snippets', __name__, url_prefix='/snippets')
 
+MAX_LANGUAGE_LENGTH = 50  # Length of the Snippet.language column
+
+
+def _listing_tags(language):
+    """
+    Cache tags of the snippet listings that change when a snippet in
+    `language` is created, updated or deleted.
+    """
+    return ['snippets', f'snippets:lang:{language}']
+
+
+def _listing_args():
+    """
+    Normalized, whitelisted query arguments of the snippet listing.
+
+    These are the only arguments the listing reads. All but the cursor are
+    part of its cache key.
+    """
+    language = request.args.get('language', '').strip() or None
+    limit, cursor = get_page_args()
+    return {'language': language, 'limit': limit, 'cursor': cursor}
+
+
+def _listing_key_args():
+    """
+    Query arguments of the snippet listing that are part of its cache key.
+    """
+    args = _listing_args()
+    return {'language': args['language'], 'limit': args['limit']}
+
+
+def _requested_listing_tags():
+    """
+    Cache tag of the snippet listing served for the current request.
+    """
+    language = _listing_args()['language']
+    return [f'snippets:lang:{language}'] if language else ['snippets']
+
+
+def _uncacheable_listing():
+    """
+    Bypass the cache for later pages, whose cursors are unbounded, and for
+    arguments that can never match a stored snippet.
+    """
+    args = _listing_args()
+    if args['cursor']:
+        return True
+    return args['language'] is not None and len(args['language']) > MAX_LANGUAGE_LENGTH
+
+
+def _has_results(rv):
+    """
+    Only cache listings with results, so random filter values cannot fill
+    the cache with empty entries.
+    """
+    response = rv[0] if isinstance(rv, tuple) else rv
+    return bool(response.get_json().get('snippets'))
+
 
 @bp.route('', methods=['GET'], strict_slashes=False, endpoint='get_snippets')
-@cache.cached(timeout=60)
+@cached_view(
+    tags=_requested_listing_tags,
+    query_args=_listing_key_args,
+    unless=_uncacheable_listing,
+    response_filter=_has_results
+)
 @limiter.limit("10 per minute")
 def get_snippets():
     """
-    Retrieve all snippets or filter by programming language.
+    Retrieve a page of snippet summaries, newest first, optionally filtered
+    by programming language.
+
+    The full code and description are returned by `get_snippet` only.
 
-    Args (optional):
-        language (str): Programming language to filter by.
+    Query Parameters:
+        - language (str): Programming language to filter by.
+        - limit (int): Number of snippets per page (max 100).
+        - cursor (str): `next_cursor` from the previous page.
 
     Returns:
-        200: List of snippets.
-    """
-    language = request.args.get('language')
-    query = Snippet.query
-    if language:
-        query = query.filter_by(language=language)
-    
-    snippets = query.order_by(Snippet.created_at.desc()).all()
+        200: List of snippet summaries and the cursor for the next page.
+        400: Invalid cursor.
+    """
+    args = _listing_args()
+    snippets, next_cursor = paginate_keyset(
+        queries.snippet_summaries(args['language']), Snippet.created_at, Snippet.id, args['limit'], args['cursor']
+    )
     result = [{
         'id': snippet.id,
         'title': snippet.title,
         'language': snippet.language,
-        'code': snippet.code,
-        'description': snippet.description,
-        'author': snippet.author.username,
+        'code_preview': snippet.code_preview,
+        'author': snippet.author_username,
         'created_at': snippet.created_at
     } for snippet in snippets]
 
-    return jsonify(result), 200
+    return jsonify({'snippets': result, 'next_cursor': next_cursor}), 200
 
 
 @bp.route('', methods=['POST'], strict_slashes=False, endpoint='post_snippet')
@@ -71,13 +140,14 @@ def post_snippet():
     )
     db.session.add(new_snippet)
     db.session.commit()
+    invalidate(*_listing_tags(new_snippet.language))
 
     current_app.logger.info(f"User {user_id} created snippet {new_snippet.id}")
     return jsonify({'message': 'Snippet created successfully', 'snippet': {'id': new_snippet.id}}), 201
 
 
 @bp.route('/<int:snippet_id>', methods=['GET'], strict_slashes=False, endpoint='get_snippet')
-@cache.cached(timeout=60)
+@cached_view(tags=lambda snippet_id: [f'snippet:{snippet_id}'])
 @limiter.limit("10 per minute")
 def get_snippet(snippet_id):
     """
@@ -106,7 +176,7 @@ def get_snippet(snippet_id):
 @bp.route('/<int:snippet_id>', methods=['PUT'], strict_slashes=False, endpoint='update_snippet')
 @limiter.limit("5 per minute")
 @jwt_required()
-@resource_author_or_admin_required(model=Snippet)
+@resource_author_or_admin_required(model=Snippet, id_arg='snippet_id')
 def update_snippet(snippet_id):
     """
     Update a snippet's details.
@@ -122,12 +192,14 @@ def update_snippet(snippet_id):
         404: Snippet not found.
     """
     snippet = Snippet.query.get_or_404(snippet_id)
+    old_language = snippet.language
     data = request.get_json()
     snippet.title = data.get('title', snippet.title)
     snippet.language = data.get('language', snippet.language)
     snippet.code = data.get('code', snippet.code)
     snippet.description = data.get('description', snippet.description)
     db.session.commit()
+    invalidate(f'snippet:{snippet_id}', *_listing_tags(old_language), *_listing_tags(snippet.language))
 
     current_app.logger.info(f"Snippet {snippet_id} updated by user {get_jwt_identity()}")
     return jsonify({'message': 'Snippet updated successfully'}), 200
@@ -136,7 +208,7 @@ def update_snippet(snippet_id):
 @bp.route('/<int:snippet_id>', methods=['DELETE'], strict_slashes=False, endpoint='delete_snippet')
 @limiter.limit("5 per minute")
 @jwt_required()
-@resource_author_or_admin_required(model=Snippet)
+@resource_author_or_admin_required(model=Snippet, id_arg='snippet_id')
 def delete_snippet(snippet_id):
     """
     Delete a snippet.
@@ -151,6 +223,7 @@ def delete_snippet(snippet_id):
     snippet = Snippet.query.get_or_404(snippet_id)
     db.session.delete(snippet)
     db.session.commit()
+    invalidate(f'snippet:{snippet_id}', *_listing_tags(snippet.language))
 
     current_app.logger.info(f"Snippet {snippet_id} deleted by user {get_jwt_identity()}")
     return jsonify({'message': 'Snippet deleted successfully'}), 200
@@ -0,0 +1,71 @@
+"""
+Uploads Blueprint serving the files in UPLOAD_FOLDER.
+
+Profile pictures are linked as ``/uploads/<path>``. Responses support
+conditional requests (ETag/If-None-Match, Last-Modified/If-Modified-Since)
+and Range requests. Hashed avatar variants (see app/avatars.py) never change
+and are cached for a year as immutable; legacy pictures are cached for
+UPLOADS_MAX_AGE seconds and then revalidated. Anything else in the folder,
+such as the temporary files of uploads in progress, is not served.
+
+When UPLOADS_ACCEL_REDIRECT_PREFIX is set, the body is left to nginx through
+an X-Accel-Redirect header; USE_X_SENDFILE does the same for Apache and
+lighttpd through X-Sendfile.
+"""
+
+# External imports
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import Blueprint, current_app, jsonify, send_file
+from werkzeug.security import safe_join
+
+# Internal imports
+from app import limiter
+from app.avatars import is_served, is_variant
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Define the Blueprint
+bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+# Static files are cheap to serve, so they are not charged to the rate limit
+limiter.exempt(bp)
+
+
+#=======================================
+# Upload Endpoints
+#=======================================
+@bp.route('/<path:filename>', methods=['GET'], endpoint='serve_upload')
+def serve_upload(filename):
+    """
+    Serve an uploaded file.
+
+    Args:
+        filename (str): Path of the file relative to UPLOAD_FOLDER.
+
+    Returns:
+        200: The file, or an X-Accel-Redirect to it.
+        206: The requested range of the file.
+        304: The client's copy is still current.
+        404: File not found.
+    """
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not is_served(filename) or not os.path.isfile(path):
+        return jsonify({'message': 'File not found'}), 404
+
+    immutable = is_variant(filename)
+    max_age = IMMUTABLE_MAX_AGE if immutable else current_app.config['UPLOADS_MAX_AGE']
+
+    accel_prefix = current_app.config['UPLOADS_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        # nginx handles conditional and range requests for the internal location
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(filename)
+        response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        response = send_file(path, conditional=True, etag=True, max_age=max_age)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = immutable
+    return response
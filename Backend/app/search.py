@@ -0,0 +1,243 @@
+"""
+Full-text search over threads, comments, snippets and news.
+
+Two backends share one interface, ``search``:
+
+- PostgreSQL: every searchable table has a generated, GIN-indexed
+  ``search_vector`` tsvector column (title weighted above body). Hits from the
+  four tables are ranked together with ``ts_rank`` and highlighted with
+  ``ts_headline``. ``ts_rank`` reads the stored vector of every row it ranks,
+  so per table only the first SEARCH_MAX_MATCHES matches the index returns
+  are ranked, and only the best ``offset + limit`` of them are merged. A word
+  found in more rows than that is ranked among an arbitrary subset of them.
+  PostgreSQL recomputes a STORED generated column on every UPDATE of its
+  row, so each counter bump on ``thread`` (see app/forum_stats.py) also
+  re-tokenizes the thread's title and content.
+- SQLite: a single FTS5 table, ``search_index``, is kept in sync by triggers.
+  Its rowid encodes the source row as ``id * 4 + kind``, so the triggers and
+  the result mapping never need a secondary lookup. The update triggers only
+  fire when an indexed column changes. Hits are ranked with ``bm25`` and
+  highlighted with ``snippet``.
+
+The schema is created by migration; for ``db.create_all`` (tests, local
+SQLite) it is installed by a metadata ``after_create`` hook.
+"""
+
+# External imports
+import html
+import re
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import event, text
+
+# Internal imports
+from . import db
+from .models import Comment
+
+# Position in KINDS is the kind code used in SQLite rowids
+KINDS = ('thread', 'comment', 'snippet', 'news')
+
+# Highlight markers from the private use area, replaced by <mark> tags after
+# the surrounding text has been HTML-escaped
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_STOP = '\ue001'
+
+
+#=======================================
+# Schema
+#=======================================
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(title, body, tokenize='porter unicode61')",
+]
+# (table, kind code, title expression, body expression, indexed columns) for
+# the sync triggers
+SQLITE_SOURCES = [
+    ('thread', 0, "{row}.title", "{row}.content", "title, content"),
+    ('comment', 1, "''", "{row}.content", "content"),
+    ('snippet', 2, "{row}.title", "coalesce({row}.description, '') || ' ' || {row}.code", "title, description, code"),
+    ('news', 3, "{row}.title", "{row}.content", "title, content"),
+]
+for _table, _code, _title, _body, _columns in SQLITE_SOURCES:
+    _values = (
+        f"VALUES ({{row}}.id * 4 + {_code}, {_title}, {_body})"
+    )
+    SQLITE_DDL += [
+        f"CREATE TRIGGER IF NOT EXISTS {_table}_search_insert AFTER INSERT ON {_table} BEGIN "
+        f"INSERT INTO search_index (rowid, title, body) {_values.format(row='new')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {_table}_search_update AFTER UPDATE OF {_columns} ON {_table} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = old.id * 4 + {_code}; "
+        f"INSERT INTO search_index (rowid, title, body) {_values.format(row='new')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {_table}_search_delete AFTER DELETE ON {_table} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = old.id * 4 + {_code}; END",
+    ]
+
+POSTGRES_VECTORS = {
+    'thread': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+              "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+    'comment': "to_tsvector('english', coalesce(content, ''))",
+    'snippet': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+               "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+               "setweight(to_tsvector('english', coalesce(code, '')), 'C')",
+    'news': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+}
+POSTGRES_DDL = []
+for _table, _vector in POSTGRES_VECTORS.items():
+    POSTGRES_DDL += [
+        f'ALTER TABLE "{_table}" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+        f"GENERATED ALWAYS AS ({_vector}) STORED",
+        f'CREATE INDEX IF NOT EXISTS ix_{_table}_search_vector ON "{_table}" USING gin (search_vector)',
+    ]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_search_schema(target, connection, **kw):
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(connection.dialect.name, [])
+    for statement in ddl:
+        connection.execute(text(statement))
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_schema(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS search_index"))
+
+
+#=======================================
+# Queries
+#=======================================
+SQLITE_SEARCH = """
+    SELECT rowid % 4 AS kind, rowid / 4 AS id, title,
+           snippet(search_index, 1, :start, :stop, '…', 24) AS highlight,
+           -bm25(search_index, 10.0, 1.0) AS rank
+    FROM search_index
+    WHERE search_index MATCH :query {kind_filter}
+    ORDER BY bm25(search_index, 10.0, 1.0), rowid
+    LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_SOURCES = {
+    'thread': "SELECT 'thread' AS kind, id, title, content AS body, search_vector FROM thread",
+    'comment': "SELECT 'comment' AS kind, id, NULL AS title, content AS body, search_vector FROM comment",
+    'snippet': "SELECT 'snippet' AS kind, id, title, coalesce(description, '') || ' ' || code AS body, "
+               "search_vector FROM snippet",
+    'news': "SELECT 'news' AS kind, id, title, content AS body, search_vector FROM news",
+}
+
+# ts_headline is only evaluated for the rows that survive ORDER BY/LIMIT.
+# Every source contributes at most :candidates rows, the most a page can take
+# from one table, so the merge sorts a few rows instead of every match.
+POSTGRES_SEARCH = """
+    SELECT hits.kind, hits.id, hits.title,
+           ts_headline('english', hits.body, hits.query,
+                       'StartSel=' || :start || ', StopSel=' || :stop || ', MaxWords=35, MinWords=15') AS highlight,
+           hits.rank
+    FROM (
+        {sources}
+    ) AS hits
+    ORDER BY hits.rank DESC, hits.kind, hits.id
+    LIMIT :limit OFFSET :offset
+"""
+POSTGRES_SOURCE = """
+        SELECT * FROM (
+            SELECT matches.kind, matches.id, matches.title, matches.body, matches.query,
+                   ts_rank(matches.search_vector, matches.query) AS rank
+            FROM (
+                SELECT source.*, query
+                FROM ({source}) AS source, websearch_to_tsquery('english', :query) AS query
+                WHERE source.search_vector @@ query
+                LIMIT :max_matches
+            ) AS matches
+            ORDER BY rank DESC, matches.id
+            LIMIT :candidates
+        ) AS ranked
+"""
+
+
+def _fts5_query(query_text):
+    """
+    Turn free text into an FTS5 query: every word must match and the last
+    one may be a prefix. Quoting the words keeps FTS5 operators in the input
+    from being interpreted.
+    """
+    words = re.findall(r'\w+', query_text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def _highlight(fragment):
+    """
+    HTML-escape a highlighted fragment and wrap the matches in <mark> tags.
+    """
+    if not fragment:
+        return fragment
+    return html.escape(fragment).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def search(query_text, kinds=None, page=1, per_page=20):
+    """
+    Ranked full-text search.
+
+    Args:
+        query_text (str): Free text entered by the user.
+        kinds (list[str], optional): Restrict hits to these kinds (see KINDS).
+        page (int): Page number, starting at 1.
+        per_page (int): Hits per page.
+
+    Returns:
+        tuple: ``(hits, has_next)``. Each hit is a dict with ``type``, ``id``,
+        ``title``, ``highlight`` (HTML with <mark> tags) and ``rank``; comment
+        hits also carry ``thread_id`` and ``news_id``.
+
+    Raises:
+        ValidationError: If the query contains no searchable words.
+    """
+    kinds = [kind for kind in (kinds or KINDS) if kind in KINDS]
+    if not re.search(r'\w', query_text or '') or not kinds:
+        raise ValidationError({'q': ['Search query must contain at least one word.']})
+
+    params = {
+        'start': HIGHLIGHT_START,
+        'stop': HIGHLIGHT_STOP,
+        'limit': per_page + 1,
+        'offset': (page - 1) * per_page
+    }
+    if db.engine.dialect.name == 'postgresql':
+        sources = ' UNION ALL '.join(POSTGRES_SOURCE.format(source=POSTGRES_SOURCES[kind]) for kind in kinds)
+        statement = POSTGRES_SEARCH.format(sources=sources)
+        params['query'] = query_text
+        params['candidates'] = params['offset'] + params['limit']
+        params['max_matches'] = current_app.config.get('SEARCH_MAX_MATCHES', 10000)
+    else:
+        kind_filter = ''
+        if len(kinds) < len(KINDS):
+            codes = ', '.join(str(KINDS.index(kind)) for kind in kinds)
+            kind_filter = f'AND rowid % 4 IN ({codes})'
+        statement = SQLITE_SEARCH.format(kind_filter=kind_filter)
+        params['query'] = _fts5_query(query_text)
+
+    rows = db.session.execute(text(statement), params).fetchall()
+    has_next = len(rows) > per_page
+    hits = [{
+        'type': row.kind if isinstance(row.kind, str) else KINDS[row.kind],
+        'id': row.id,
+        'title': row.title or None,
+        'highlight': _highlight(row.highlight),
+        'rank': float(row.rank)
+    } for row in rows[:per_page]]
+
+    # Comments are shown in the context of their thread or news article
+    comment_ids = [hit['id'] for hit in hits if hit['type'] == 'comment']
+    if comment_ids:
+        parents = {
+            comment_id: (thread_id, news_id)
+            for comment_id, thread_id, news_id in db.session.query(
+                Comment.id, Comment.thread_id, Comment.news_id
+            ).filter(Comment.id.in_(comment_ids))
+        }
+        for hit in hits:
+            if hit['type'] == 'comment':
+                hit['thread_id'], hit['news_id'] = parents.get(hit['id'], (None, None))
+
+    return hits, has_next
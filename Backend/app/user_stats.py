@@ -0,0 +1,113 @@
+"""
+Denormalized activity stats of users.
+
+User carries the number of threads, comments and snippets it has written, so
+profiles can show them without counting over the post tables. Unlike the
+forum stats, which are recorded explicitly by the forum write paths, these
+counters follow every post added or deleted through the ORM session (forum
+and news comments, snippets, admin deletes) from an ``after_flush`` hook. The
+counters are incremented in SQL within the same transaction, so concurrent
+posts cannot overwrite each other's updates and the stats commit or roll back
+together with the posts. Bulk imports, which bypass the session, call
+``record_imported`` instead.
+
+``recount`` recomputes the counters from the source rows. It backs the
+``flask users recount`` command and repairs drift, e.g. after bulk deletes
+that bypass the session.
+"""
+
+# External imports
+from sqlalchemy import bindparam, event, func, select, true, update
+
+# Internal imports
+from . import db
+from .models import User, Thread, Comment, Snippet
+
+# Counter column of User for each kind of post
+COUNTERS = {Thread: 'thread_count', Comment: 'comment_count', Snippet: 'snippet_count'}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _count_posts(session, flush_context):
+    # The session still lists the objects of the flush as new and deleted
+    deltas = {}
+    for objects, step in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            column = COUNTERS.get(type(obj))
+            if column and obj.user_id is not None:
+                counts = deltas.setdefault(obj.user_id, {})
+                counts[column] = counts.get(column, 0) + step
+
+    users = User.__table__
+    connection = session.connection()
+    for user_id, counts in deltas.items():
+        values = {column: users.c[column] + delta for column, delta in counts.items() if delta}
+        if values:
+            connection.execute(update(users).where(users.c.id == user_id).values(**values))
+            session.info.setdefault('user_stats_changed', set()).add(user_id)
+
+
+def record_imported(model, user_ids):
+    """
+    Count posts inserted without the ORM (bulk imports) for their authors.
+    The caller commits.
+
+    Args:
+        model (type): Thread, Comment or Snippet.
+        user_ids (Iterable[int]): The author of every inserted post.
+    """
+    column = COUNTERS[model]
+    counts = {}
+    for user_id in user_ids:
+        counts[user_id] = counts.get(user_id, 0) + 1
+    if not counts:
+        return
+    users = User.__table__
+    db.session.execute(
+        update(users)
+        .where(users.c.id == bindparam('target_id'))
+        .values({column: users.c[column] + bindparam('delta')}),
+        [{'target_id': user_id, 'delta': count} for user_id, count in counts.items()]
+    )
+    db.session.info.setdefault('user_stats_changed', set()).update(counts)
+
+
+def changed_users(session):
+    """
+    Pop the IDs of the users whose counters the session changed.
+
+    Args:
+        session (Session): The session that committed.
+
+    Returns:
+        set[int]: The user IDs.
+    """
+    return session.info.pop('user_stats_changed', set())
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop('user_stats_changed', None)
+
+
+def recount(user_ids=None):
+    """
+    Recompute the counters of users from the source rows. The caller commits.
+
+    Args:
+        user_ids (list[int], optional): Limit the repair to these users.
+            Defaults to all of them.
+
+    Returns:
+        int: The number of users recomputed.
+    """
+    user_filter = User.id.in_(user_ids) if user_ids else true()
+    return db.session.execute(
+        update(User)
+        .where(user_filter)
+        .values(**{
+            column: select(func.count(model.id)).where(model.user_id == User.id).scalar_subquery()
+            for model, column in COUNTERS.items()
+        }),
+        execution_options={'synchronize_session': False}
+    ).rowcount
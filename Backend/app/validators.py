@@ -63,15 +63,34 @@ class CommentSchema(Schema):
 
 
 class SnippetsSchema(Schema):
-    content = fields.String(
+    title = fields.String(
         required=True,
-        validate=validate.Length(min=10, max=1000),
+        validate=validate.Length(min=1, max=200),
         error_messages={
-            "required": "Comment content is required.",
-            "null": "Comment content cannot be null.",
-            "validator_failed": "Comment content must be between 10 and 1000 characters."
+            "required": "Title is required.",
+            "null": "Title cannot be null.",
+            "validator_failed": "Title must be between 1 and 200 characters."
+        }
+    )
+    language = fields.String(
+        required=True,
+        validate=validate.Length(min=1, max=50),
+        error_messages={
+            "required": "Language is required.",
+            "null": "Language cannot be null.",
+            "validator_failed": "Language must be between 1 and 50 characters."
+        }
+    )
+    code = fields.String(
+        required=True,
+        validate=validate.Length(min=1),
+        error_messages={
+            "required": "Code is required.",
+            "null": "Code cannot be null.",
+            "validator_failed": "Code cannot be empty."
         }
     )
+    description = fields.String(load_default='')
 
 
 def validate_registration(data):
@@ -0,0 +1,188 @@
+"""
+Synthetic data for the benchmarks.
+
+Fills an empty database with users, categories, subcategories, threads,
+comments, snippets and news through bulk inserts, then computes the
+denormalized forum and user stats. The data is generated from a fixed seed
+and dated within a fixed year (DATA_START to DATA_END), so the same sizes and
+seed always produce the same database, whenever it is generated.
+
+Usage (from the Backend directory; relative SQLite paths are in instance/):
+    python -m benchmarks.data [--database-url sqlite:///benchmark.db] [--scale small|medium|large]
+"""
+
+# External imports
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+
+# Internal imports
+from app import db
+from app import forum_stats, user_stats
+from app.models import User, Category, Subcategory, Thread, Comment, Snippet, News
+
+# Rows per kind for each scale
+SCALES = {
+    'small': {'users': 1_000, 'categories': 5, 'subcategories': 25, 'threads': 10_000,
+              'comments': 50_000, 'snippets': 5_000, 'news': 500},
+    'medium': {'users': 20_000, 'categories': 10, 'subcategories': 80, 'threads': 200_000,
+               'comments': 1_000_000, 'snippets': 50_000, 'news': 5_000},
+    'large': {'users': 100_000, 'categories': 20, 'subcategories': 200, 'threads': 2_000_000,
+              'comments': 10_000_000, 'snippets': 200_000, 'news': 20_000},
+}
+BATCH_SIZE = 10_000
+# Content is dated within this span rather than relative to now, so orderings
+# by date do not depend on when the data was generated
+DATA_START = datetime(2024, 1, 1)
+DATA_END = DATA_START + timedelta(days=365)
+LANGUAGES = ['python', 'javascript', 'c', 'cpp', 'rust', 'go', 'bash']
+WORDS = ('cpu gpu overclock voltage cooling thermal paste fan bios memory timings ram '
+         'benchmark stable crash boot motherboard frequency water loop air tower case '
+         'power supply watt idle load temperature undervolt curve profile driver').split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _timestamps(rng, count):
+    """
+    ``count`` random timestamps between DATA_START and DATA_END.
+    """
+    span = (DATA_END - DATA_START).total_seconds()
+    return [DATA_START + timedelta(seconds=rng.random() * span) for _ in range(count)]
+
+
+def _insert(model, rows):
+    """
+    Insert generated rows in batches and return the IDs they received.
+    """
+    first_id = (db.session.scalar(select(func.max(model.id))) or 0) + 1
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        count += len(batch)
+    db.session.commit()
+    return range(first_id, first_id + count)
+
+
+def generate(sizes, seed=1, log=print):
+    """
+    Fill the database of the current app. Must run in an app context on an
+    empty database.
+
+    Args:
+        sizes (dict): Number of rows per kind, see SCALES.
+        seed (int): Seed of the generator.
+        log (callable): Receives progress messages.
+
+    Returns:
+        dict: ID ranges of the generated rows per kind.
+    """
+    rng = random.Random(seed)
+    ids = {}
+
+    def timed(kind, model, rows):
+        started = time.perf_counter()
+        ids[kind] = _insert(model, rows)
+        log(f"{kind:>14}: {len(ids[kind]):>10} rows in {time.perf_counter() - started:.1f} s")
+
+    timed('users', User, ({
+        'username': f"User{i}",
+        'username_lower': f"user{i}",
+        'email': f"user{i}@example.com",
+        'display_name': f"User {i}",
+        'role': 'user',
+        'created_at': created_at,
+        'last_seen': created_at,
+        'accepted_privacy_policy': True
+    } for i, created_at in enumerate(_timestamps(rng, sizes['users']))))
+    users = ids['users']
+
+    timed('categories', Category, ({'name': f"Category {i}"} for i in range(sizes['categories'])))
+    categories = ids['categories']
+    timed('subcategories', Subcategory, ({
+        'name': f"Subcategory {i}",
+        'description': _text(rng, 8),
+        'category_id': categories[i % len(categories)]
+    } for i in range(sizes['subcategories'])))
+    subcategories = ids['subcategories']
+
+    thread_times = sorted(_timestamps(rng, sizes['threads']))
+    timed('threads', Thread, ({
+        'title': _text(rng, 6),
+        'content': _text(rng, 60),
+        'user_id': rng.choice(users),
+        'subcategory_id': rng.choice(subcategories),
+        'created_at': created_at,
+        'last_activity_at': created_at
+    } for created_at in thread_times))
+    threads = ids['threads']
+
+    def comments():
+        for _ in range(sizes['comments']):
+            # Skew comments towards some threads, like real discussions
+            index = min(int(rng.paretovariate(1.2)) - 1, len(threads) - 1)
+            thread_index = (index * 7919) % len(threads)
+            created_at = thread_times[thread_index] + timedelta(minutes=rng.randrange(60 * 24 * 30))
+            yield {
+                'content': _text(rng, 30),
+                'user_id': rng.choice(users),
+                'thread_id': threads[thread_index],
+                'created_at': created_at
+            }
+    timed('comments', Comment, comments())
+
+    timed('snippets', Snippet, ({
+        'title': _text(rng, 5),
+        'language': rng.choice(LANGUAGES),
+        'code': f"print('{_text(rng, 10)}')\n" * 10,
+        'description': _text(rng, 20),
+        'user_id': rng.choice(users),
+        'created_at': created_at
+    } for created_at in _timestamps(rng, sizes['snippets'])))
+
+    timed('news', News, ({
+        'title': _text(rng, 6),
+        'content': _text(rng, 200),
+        'user_id': rng.choice(users),
+        'created_at': created_at
+    } for created_at in _timestamps(rng, sizes['news'])))
+
+    started = time.perf_counter()
+    forum_stats.recount()
+    user_stats.recount()
+    db.session.commit()
+    log(f"{'stats':>14}: recounted in {time.perf_counter() - started:.1f} s")
+    return ids
+
+
+def main():
+    # Imported here, as benchmarks.harness imports this module
+    from benchmarks.harness import make_app
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        db.create_all()
+        if User.query.first() is not None:
+            parser.error("the database is not empty; drop it first or use another --database-url")
+        generate(SCALES[args.scale], args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Load test of the API endpoints.
+
+Drives the endpoints of the real ``create_app`` application (through the
+WSGI test client, so no server or network is involved) against a local
+SQLite or PostgreSQL database filled by ``benchmarks.data``. For every
+endpoint it reports the throughput, the p50/p95/p99 latency and the number
+of SQL statements per request.
+
+Results can be saved as a JSON baseline and compared with a later run; a
+comparison exits with status 1 when an endpoint regressed beyond the
+tolerance, so it can gate a commit.
+
+Usage (from the Backend directory; relative SQLite paths are in instance/):
+    python -m benchmarks.harness [--database-url sqlite:///benchmark.db] [--generate small]
+        [--requests 200] [--concurrency 1] [--cache] [--only forum_thread ...]
+        [--save baseline.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+
+# External imports
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func, select
+
+# Internal imports
+from app import create_app, db
+from app.models import User, Subcategory, Thread, Snippet, News
+from benchmarks.data import SCALES, WORDS, generate
+from config import TestConfig
+
+_statements = threading.local()
+
+
+def make_app(database_url, cache=False):
+    """
+    Application configured for benchmarking: the given database, no rate
+    limits, no background threads and, unless ``cache``, no response cache.
+    """
+    class BenchmarkConfig(TestConfig):
+        TESTING = False
+        SQLALCHEMY_DATABASE_URI = database_url
+        RATELIMIT_ENABLED = False
+        CACHE_TYPE = 'SimpleCache' if cache else 'NullCache'
+        LOG_LEVEL = 'WARNING'
+
+    return create_app(BenchmarkConfig)
+
+
+def _count_statements(conn, cursor, statement, parameters, context, executemany):
+    _statements.count = getattr(_statements, 'count', 0) + 1
+
+
+#=======================================
+# Scenarios
+#=======================================
+def _scenarios(data, rng):
+    """
+    Requests to measure: name -> callable returning ``(method, url, json)``.
+    """
+    def user_name():
+        return f"user{rng.choice(data['users']) - data['users'][0]}"
+
+    return {
+        'forum_categories': lambda: ('GET', '/forum/categories', None),
+        'forum_latest': lambda: ('GET', '/forum/latest', None),
+        'forum_threads': lambda: ('GET', f"/forum/subcategories/{rng.choice(data['subcategories'])}/threads", None),
+        'forum_threads_activity': lambda: (
+            'GET', f"/forum/subcategories/{rng.choice(data['subcategories'])}/threads?sort=activity", None
+        ),
+        'forum_thread': lambda: ('GET', f"/forum/threads/{rng.choice(data['threads'])}", None),
+        'forum_comments': lambda: ('GET', f"/forum/threads/{rng.choice(data['threads'])}/comments", None),
+        'forum_create_comment': lambda: (
+            'POST', f"/forum/threads/{rng.choice(data['threads'])}/comments",
+            {'content': ' '.join(rng.choice(WORDS) for _ in range(12))}
+        ),
+        'snippets': lambda: ('GET', '/snippets', None),
+        'snippets_language': lambda: ('GET', '/snippets?language=python', None),
+        'snippet': lambda: ('GET', f"/snippets/{rng.choice(data['snippets'])}", None),
+        'news': lambda: ('GET', '/news', None),
+        'news_item': lambda: ('GET', f"/news/{rng.choice(data['news'])}", None),
+        'search': lambda: ('GET', f"/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}", None),
+        'profile': lambda: ('GET', f"/profile/users/{user_name()}", None),
+        'profiles_bulk': lambda: (
+            'GET', '/profile/users?ids=' + ','.join(str(rng.choice(data['users'])) for _ in range(25)), None
+        ),
+    }
+
+
+def _dataset(app):
+    """
+    ID ranges of the rows in the database, for picking request targets.
+    """
+    data = {}
+    with app.app_context():
+        for kind, model in (('users', User), ('subcategories', Subcategory), ('threads', Thread),
+                            ('snippets', Snippet), ('news', News)):
+            low, high = db.session.execute(select(func.min(model.id), func.max(model.id))).one()
+            if low is None:
+                raise SystemExit(f"No {kind} in the database; run with --generate first")
+            data[kind] = range(low, high + 1)
+        data['sizes'] = {
+            kind: db.session.scalar(select(func.count()).select_from(model))
+            for kind, model in (('users', User), ('threads', Thread), ('snippets', Snippet), ('news', News))
+        }
+    return data
+
+
+#=======================================
+# Measurement
+#=======================================
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(app, make_request, requests, concurrency, headers):
+    """
+    Send ``requests`` requests, ``concurrency`` at a time.
+
+    Returns:
+        dict: Requests, errors, req/s, p50/p95/p99 latency in ms and the mean
+        number of SQL statements per request.
+    """
+    local = threading.local()
+
+    def send(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, url, body = make_request()
+        _statements.count = 0
+        started = time.perf_counter()
+        response = client.open(url, method=method, json=body, headers=headers)
+        latency = (time.perf_counter() - started) * 1000
+        return latency, _statements.count, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, _, status in results if status >= 400),
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 0.50), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'p99_ms': round(_percentile(latencies, 0.99), 2),
+        'sql_per_request': round(statistics.mean(count for _, count, _ in results), 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+#=======================================
+# Reporting
+#=======================================
+def print_results(results):
+    print(f"{'endpoint':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<24} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['sql_per_request']:>8.2f} {result['errors']:>7}")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change of every endpoint against a baseline.
+
+    An endpoint regressed when its p95 latency grew or its throughput fell
+    by more than ``tolerance`` (a fraction), or when it runs more SQL
+    statements per request.
+
+    Returns:
+        list[str]: Names of the regressed endpoints.
+    """
+    regressed = []
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):")
+    print(f"{'endpoint':<24} {'req/s':>9} {'p95':>9} {'sql/req':>9}")
+    for name, result in results.items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            print(f"{name:<24} {'new':>9}")
+            continue
+        rps_change = result['rps'] / before['rps'] - 1 if before['rps'] else 0
+        p95_change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+        sql_change = result['sql_per_request'] - before['sql_per_request']
+        worse = rps_change < -tolerance or p95_change > tolerance or sql_change > 0.5
+        if worse:
+            regressed.append(name)
+        print(f"{name:<24} {rps_change:>+9.1%} {p95_change:>+9.1%} {sql_change:>+9.2f}"
+              f"{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--generate', choices=SCALES, help='Fill the database first if it is empty.')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint.')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per endpoint.')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--cache', action='store_true', help='Enable the response cache (SimpleCache).')
+    parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help='Only measure these endpoints.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', metavar='FILE', help='Save the results as a JSON baseline.')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with a saved baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    app = make_app(args.database_url, cache=args.cache)
+    with app.app_context():
+        db.create_all()
+        if args.generate and User.query.first() is None:
+            generate(SCALES[args.generate], args.seed)
+        event.listen(db.engine, 'before_cursor_execute', _count_statements)
+        dialect = db.engine.dialect.name
+        # The writes are made by one generated user
+        headers = {'Authorization': f"Bearer {create_access_token(identity=db.session.scalar(select(func.min(User.id))))}"}
+
+    data = _dataset(app)
+    scenarios = _scenarios(data, random.Random(args.seed))
+    unknown = set(args.only or ()) - set(scenarios)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}; choose from {', '.join(scenarios)}")
+
+    results = {}
+    for name, make_request in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        if args.warmup:
+            measure(app, make_request, args.warmup, args.concurrency, headers)
+        results[name] = measure(app, make_request, args.requests, args.concurrency, headers)
+    print_results(results)
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': dialect,
+            'python': platform.python_version(),
+            'sizes': data['sizes'],
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'cache': args.cache,
+        },
+        'endpoints': results,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark of the login username lookup as the user table grows.
+
+Compares the indexed lookup used by login, registration, OAuth and profiles
+(``username_lower = :name``) with the previous ``lower(username_lower) =
+:name`` filter, which cannot use the unique index and scans the table.
+
+Usage (from the Backend directory):
+    python -m benchmarks.username_lookup [--sizes 1000 10000 100000] [--lookups 500]
+"""
+
+# External imports
+import argparse
+import random
+import time
+from sqlalchemy import func, insert
+
+# Internal imports
+from app import create_app, db
+from app.models import User
+from app.queries import user_by_username
+from config import TestConfig
+
+
+def _fill(target_size):
+    """
+    Grow the user table to ``target_size`` rows.
+    """
+    current = User.query.count()
+    rows = [{
+        'username': f"User{i}",
+        'username_lower': f"user{i}",
+        'email': f"user{i}@example.com",
+        'role': 'user',
+        'accepted_privacy_policy': True
+    } for i in range(current, target_size)]
+    for start in range(0, len(rows), 10000):
+        db.session.execute(insert(User), rows[start:start + 10000])
+    db.session.commit()
+
+
+def _time_lookups(lookup, names):
+    """
+    Mean milliseconds per lookup.
+    """
+    started = time.perf_counter()
+    for name in names:
+        assert lookup(name) is not None
+    return (time.perf_counter() - started) * 1000 / len(names)
+
+
+def _scan_lookup(name):
+    return User.query.filter(func.lower(User.username_lower) == name.lower()).first()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--lookups', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        print(f"{'users':>10} {'indexed ms':>12} {'lower() ms':>12}")
+        for size in sorted(args.sizes):
+            _fill(size)
+            names = [f"USER{random.randrange(size)}" for _ in range(args.lookups)]
+            indexed = _time_lookups(user_by_username, names)
+            scanned = _time_lookups(_scan_lookup, names)
+            print(f"{size:>10} {indexed:>12.3f} {scanned:>12.3f}")
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
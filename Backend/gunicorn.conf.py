@@ -0,0 +1,10 @@
+# Gunicorn settings for running the backend with several workers.
+#
+# Start with PROMETHEUS_MULTIPROC_DIR pointing at an empty directory so that
+# /metrics aggregates every worker (see app/metrics.py).
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the metric files of workers that exited
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,81 @@
+"""Add full-text search
+
+Revision ID: 8c41d07e5b93
+Revises: 2f29d52d4811
+Create Date: 2026-10-18 14:05:12.318442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d07e5b93'
+down_revision = '2f29d52d4811'
+branch_labels = None
+depends_on = None
+
+# (table, kind code, title expression, body expression, indexed columns), see app/search.py
+SQLITE_SOURCES = [
+    ('thread', 0, "{row}.title", "{row}.content", "title, content"),
+    ('comment', 1, "''", "{row}.content", "content"),
+    ('snippet', 2, "{row}.title", "coalesce({row}.description, '') || ' ' || {row}.code", "title, description, code"),
+    ('news', 3, "{row}.title", "{row}.content", "title, content"),
+]
+
+POSTGRES_VECTORS = {
+    'thread': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+              "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+    'comment': "to_tsvector('english', coalesce(content, ''))",
+    'snippet': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+               "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+               "setweight(to_tsvector('english', coalesce(code, '')), 'C')",
+    'news': "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table, vector in POSTGRES_VECTORS.items():
+            op.execute(
+                f'ALTER TABLE "{table}" ADD COLUMN search_vector tsvector '
+                f"GENERATED ALWAYS AS ({vector}) STORED"
+            )
+            op.create_index(f'ix_{table}_search_vector', table, ['search_vector'],
+                            unique=False, postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE search_index USING fts5(title, body, tokenize='porter unicode61')")
+        for table, code, title, body, columns in SQLITE_SOURCES:
+            values = f"{{row}}.id * 4 + {code}, {title}, {body}"
+            op.execute(
+                f"INSERT INTO search_index (rowid, title, body) "
+                f"SELECT {values.format(row=table)} FROM {table}"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO search_index (rowid, title, body) VALUES ({values.format(row='new')}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_search_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+                f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; "
+                f"INSERT INTO search_index (rowid, title, body) VALUES ({values.format(row='new')}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN "
+                f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END"
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table in POSTGRES_VECTORS:
+            op.drop_index(f'ix_{table}_search_vector', table_name=table)
+            op.drop_column(table, 'search_vector')
+    elif dialect == 'sqlite':
+        for table, _code, _title, _body, _columns in SQLITE_SOURCES:
+            for action in ('insert', 'update', 'delete'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+        op.execute("DROP TABLE IF EXISTS search_index")
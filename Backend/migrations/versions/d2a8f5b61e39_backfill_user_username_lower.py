@@ -0,0 +1,30 @@
+"""Backfill user username_lower
+
+Revision ID: d2a8f5b61e39
+Revises: c71f2d9e08a4
+Create Date: 2026-10-18 16:41:09.128573
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f5b61e39'
+down_revision = 'c71f2d9e08a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Username lookups compare username_lower directly (using its unique
+    # index), so every user with a username needs it set.
+    op.execute(
+        'UPDATE "user" SET username_lower = lower(username) '
+        'WHERE username IS NOT NULL AND (username_lower IS NULL OR username_lower <> lower(username))'
+    )
+
+
+def downgrade():
+    # Nothing to undo: the column keeps its values
+    pass
@@ -1,4 +1,6 @@
 import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
 from app import create_app, db
 from config import TestConfig
 from flask_jwt_extended import create_access_token
@@ -32,4 +34,36 @@ def test_user_token(test_client):
 
         # Generera en JWT-token
         token = create_access_token(identity=user.id)
-        return token
\ No newline at end of file
+        return token
+
+
+@pytest.fixture
+def assert_max_queries(test_client):
+    """
+    Fixture som returnerar en context manager som räknar SQL-satser och
+    misslyckas om fler än `limit` körs, så att N+1-regressioner fångas.
+
+    Användning:
+        with assert_max_queries(3):
+            test_client.get("/snippets")
+    """
+    with test_client.application.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counter(limit):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        assert len(statements) <= limit, (
+            f"Expected at most {limit} SQL statements, got {len(statements)}:\n" + "\n".join(statements)
+        )
+
+    return counter
@@ -0,0 +1,195 @@
+from flask_jwt_extended import create_access_token, decode_token
+from app import db
+from app.models import User
+
+
+def _create_user(app, role="user"):
+    with app.app_context():
+        user = User(username="roleuser", username_lower="roleuser", email="roleuser@example.com", role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def test_login_token_carries_role_claim(test_client):
+    """
+    Testa att inloggningens token innehåller användarens roll.
+    """
+    test_client.post("/auth/register", json={
+        "username": "Claimer",
+        "email": "claimer@example.com",
+        "password": "password123",
+        "accepted_privacy_policy": True
+    })
+    response = test_client.post("/auth/login", json={"username": "claimer", "password": "password123"})
+    assert response.status_code == 200
+
+    with test_client.application.app_context():
+        assert decode_token(response.json["access_token"])["role"] == "user"
+
+
+def test_role_claim_authorizes_without_database(test_client, assert_max_queries):
+    """
+    Testa att en rollkontroll med rollen i token inte gör någon databasfråga.
+    """
+    app = test_client.application
+    app.config["JWT_ROLE_CLAIM_ENABLED"] = True
+    user_id = _create_user(app, role="super_admin")
+    with app.app_context():
+        token = create_access_token(identity=user_id, additional_claims={"role": "super_admin"})
+
+    with assert_max_queries(0):
+        response = test_client.get("/auth/super-admin", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+def test_role_claim_is_ignored_by_default(test_client):
+    """
+    Testa att en nedgraderad administratör inte behåller rollen i sin token.
+    """
+    app = test_client.application
+    user_id = _create_user(app, role="user")
+    with app.app_context():
+        token = create_access_token(identity=user_id, additional_claims={"role": "super_admin"})
+
+    response = test_client.get("/auth/super-admin", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
+def test_current_user_is_loaded_once_per_request(test_client, assert_max_queries):
+    """
+    Testa att användaren laddas en gång per request även när både dekorator och vy behöver den.
+    """
+    app = test_client.application
+    user_id = _create_user(app, role="super_admin")
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+
+    with assert_max_queries(1):
+        response = test_client.get("/auth/super-admin", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    with assert_max_queries(1):
+        response = test_client.get("/profile", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+def test_username_lookup_uses_index(test_client):
+    """
+    Testa att användarnamnsuppslaget använder ett index i stället för att skanna tabellen.
+    """
+    from sqlalchemy import text
+    from app.models import User
+
+    with test_client.application.app_context():
+        query = User.query.filter(User.username_lower == User.normalize_username("SomeOne"))
+        sql = str(query.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "USING INDEX" in plan
+    assert "SCAN" not in plan
+
+
+def test_username_lookups_are_case_insensitive(test_client):
+    """
+    Testa att registrering, inloggning och profil hittar användaren oavsett skiftläge.
+    """
+    user = {"username": "MixedCase", "email": "mixed@example.com", "password": "password123",
+            "accepted_privacy_policy": True}
+    assert test_client.post("/auth/register", json=user).status_code == 201
+    assert test_client.post("/auth/register", json={**user, "username": "mixedcase",
+                                                     "email": "other@example.com"}).status_code == 400
+    assert test_client.post("/auth/login", json={"username": "MIXEDCASE", "password": "password123"}).status_code == 200
+
+    response = test_client.get("/profile/users/mixedcase")
+    assert response.status_code == 200
+    assert response.json["username"] == "MixedCase"
+
+
+def test_login_upgrades_outdated_password_hash(test_client):
+    """
+    Testa att en hash med föråldrade parametrar uppgraderas vid lyckad inloggning.
+    """
+    from werkzeug.security import generate_password_hash
+    from app.models import User
+
+    app = test_client.application
+    with app.app_context():
+        db.session.add(User(username="legacy", email="legacy@example.com",
+                            password=generate_password_hash("password123", method="pbkdf2:sha256:500")))
+        db.session.commit()
+
+    response = test_client.post("/auth/login", json={"username": "legacy", "password": "password123"})
+    assert response.status_code == 200
+
+    with app.app_context():
+        stored = User.query.filter_by(username_lower="legacy").one().password
+        assert stored.startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+    assert test_client.post("/auth/login", json={"username": "legacy", "password": "password123"}).status_code == 200
+
+
+def test_password_column_fits_production_hashes():
+    """
+    Testa att lösenordskolumnen rymmer en hash med produktionens parametrar.
+    """
+    from werkzeug.security import generate_password_hash
+    from config import Config
+
+    stored = generate_password_hash("password123", method=Config.PASSWORD_HASH_METHOD)
+    assert len(stored) <= User.__table__.c.password.type.length
+
+
+def test_login_succeeds_when_storing_upgraded_hash_fails(test_client):
+    """
+    Testa att inloggningen lyckas och sessionen rullas tillbaka när den
+    uppgraderade hashen inte kan sparas.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.exc import DataError
+    from werkzeug.security import generate_password_hash
+
+    app = test_client.application
+    legacy_hash = generate_password_hash("password123", method="pbkdf2:sha256:500")
+    with app.app_context():
+        db.session.add(User(username="legacy", email="legacy@example.com", password=legacy_hash))
+        db.session.commit()
+
+    def fail_commit(session):
+        raise DataError("UPDATE user", {}, Exception("value too long"))
+
+    event.listen(db.session, "before_commit", fail_commit)
+    try:
+        response = test_client.post("/auth/login", json={"username": "legacy", "password": "password123"})
+    finally:
+        event.remove(db.session, "before_commit", fail_commit)
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert User.query.filter_by(username_lower="legacy").one().password == legacy_hash
+
+
+def test_login_returns_503_when_hashing_is_saturated(test_client):
+    """
+    Testa att inloggningar avvisas med 503 när hashpoolen är full.
+    """
+    import threading
+    from app.passwords import PasswordHasher
+
+    app = test_client.application
+    test_client.post("/auth/register", json={"username": "busy", "email": "busy@example.com",
+                                             "password": "password123", "accepted_privacy_policy": True})
+
+    hasher = PasswordHasher(method=app.config["PASSWORD_HASH_METHOD"], workers=1, max_pending=1, timeout=5)
+    app.extensions["password_hasher"] = hasher
+    release = threading.Event()
+    hasher._executor.submit(release.wait)
+    assert hasher._pending.acquire(blocking=False)
+    try:
+        response = test_client.post("/auth/login", json={"username": "busy", "password": "password123"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+    finally:
+        hasher._pending.release()
+        release.set()
+
+    response = test_client.post("/auth/login", json={"username": "busy", "password": "password123"})
+    assert response.status_code == 200
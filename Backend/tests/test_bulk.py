@@ -0,0 +1,155 @@
+import json
+import pytest
+from app import db
+from app.models import User, Category, Subcategory, Thread, Comment, Snippet, News, ImportMapping
+
+# Ordning där föräldrar importeras före sina barn
+ORDER = ['categories', 'subcategories', 'threads', 'snippets', 'news', 'comments']
+
+
+@pytest.fixture
+def app(test_client):
+    """
+    Fixture för en app med en användare och innehåll av alla sorter.
+    """
+    app = test_client.application
+    with app.app_context():
+        author = User(username='Exporter', email='exporter@example.com')
+        db.session.add(author)
+        category = Category(name='Hardware')
+        db.session.add(category)
+        db.session.flush()
+        subcategory = Subcategory(name='CPUs', description='', category_id=category.id)
+        db.session.add(subcategory)
+        db.session.flush()
+        thread = Thread(title='Delidding', content='How hot?', user_id=author.id, subcategory_id=subcategory.id)
+        news = News(title='Launch', content='New chips', user_id=author.id)
+        db.session.add_all([thread, news])
+        db.session.flush()
+        db.session.add_all([
+            Comment(content='Very hot', user_id=author.id, thread_id=thread.id),
+            Comment(content='Nice, "quoted"', user_id=author.id, news_id=news.id),
+            Snippet(title='Stress', language='bash', code='stress -c 8', user_id=author.id),
+        ])
+        db.session.commit()
+    return app
+
+
+def _export(app, tmp_path, file_format):
+    runner = app.test_cli_runner()
+    files = {}
+    for kind in ORDER:
+        files[kind] = tmp_path / f"{kind}.{file_format}"
+        result = runner.invoke(args=['data', 'export', kind, str(files[kind])])
+        assert result.exit_code == 0, result.output
+    return files
+
+
+def _import(app, files, *options):
+    runner = app.test_cli_runner()
+    for kind in ORDER:
+        result = runner.invoke(args=['data', 'import', kind, str(files[kind]), *options])
+        assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize('file_format', ['jsonl', 'csv'])
+def test_export_import_round_trip(app, tmp_path, file_format):
+    """
+    Testa att en export importerad under en ny källa ger kopior med nya id:n
+    och omräknad statistik, och att en ny körning hoppar över allt.
+    """
+    files = _export(app, tmp_path, file_format)
+    _import(app, files, '--source', 'oldforum', '--batch-size', '1')
+
+    with app.app_context():
+        # Kategorin slås ihop med den befintliga med samma namn
+        assert Category.query.count() == 1
+        assert Subcategory.query.count() == 2
+        copy = Thread.query.order_by(Thread.id.desc()).first()
+        assert copy.title == 'Delidding'
+        assert copy.subcategory_id == Subcategory.query.order_by(Subcategory.id.desc()).first().id
+        # CSV skiljer inte en tom sträng från ett saknat värde
+        assert copy.subcategory.description == ('' if file_format == 'jsonl' else None)
+        assert copy.comment_count == 1
+        assert copy.subcategory.thread_count == 1
+        news_copy = News.query.order_by(News.id.desc()).first()
+        assert Comment.query.filter_by(news_id=news_copy.id).one().content == 'Nice, "quoted"'
+        author = User.query.filter_by(username='Exporter').one()
+        assert (author.thread_count, author.comment_count, author.snippet_count) == (2, 4, 2)
+
+    _import(app, files, '--source', 'oldforum')
+    with app.app_context():
+        assert Thread.query.count() == 2
+        assert Comment.query.count() == 4
+        assert ImportMapping.query.filter_by(source='oldforum').count() == 7
+
+
+def test_import_resolves_authors_and_resumes(app, tmp_path):
+    """
+    Testa att okända föräldrar och författare avbryter importen med radnummer,
+    och att importen fortsätter efter de redan importerade raderna.
+    """
+    with app.app_context():
+        thread = Thread.query.one()
+        thread_id, comment_count = thread.id, thread.comment_count
+    comments = tmp_path / 'comments.jsonl'
+    records = [
+        {'id': 1, 'content': 'First', 'thread_id': thread_id, 'author': 'exporter'},
+        {'id': 2, 'content': 'Second', 'thread_id': thread_id, 'author': 'ghost'},
+    ]
+    comments.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['data', 'import', 'comments', str(comments)])
+    assert result.exit_code != 0
+    assert 'Unknown thread_id' in result.output
+
+    # Tråden mappas som om den hade importerats
+    with app.app_context():
+        db.session.add(ImportMapping(source='default', kind='threads', source_id=thread_id, target_id=thread_id))
+        db.session.commit()
+
+    result = runner.invoke(args=['data', 'import', 'comments', str(comments), '--batch-size', '1'])
+    assert result.exit_code != 0
+    assert 'Line 2: Unknown author ghost' in result.output
+    with app.app_context():
+        assert Comment.query.filter_by(content='First').count() == 1
+
+    result = runner.invoke(args=['data', 'import', 'comments', str(comments), '--default-author', 'Exporter'])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 1 comments, skipped 1' in result.output
+    with app.app_context():
+        assert Comment.query.filter_by(content='First').count() == 1
+        assert Thread.query.one().comment_count == comment_count + 2
+
+
+def test_import_keeps_latest_activity_out_of_order(app, tmp_path):
+    """
+    Testa att äldre kommentarer som importeras efter nyare inte flyttar
+    trådens och underkategorins senaste aktivitet bakåt.
+    """
+    with app.app_context():
+        thread = Thread.query.one()
+        thread_id, subcategory_id = thread.id, thread.subcategory_id
+        db.session.add(ImportMapping(source='default', kind='threads', source_id=thread_id, target_id=thread_id))
+        db.session.commit()
+    comments = tmp_path / 'comments.jsonl'
+    records = [
+        {'id': 1, 'content': 'Newest', 'thread_id': thread_id, 'author': 'exporter',
+         'created_at': '2030-01-02T00:00:00'},
+        {'id': 2, 'content': 'Older', 'thread_id': thread_id, 'author': 'exporter',
+         'created_at': '2030-01-01T00:00:00'},
+    ]
+    comments.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+
+    result = app.test_cli_runner().invoke(args=['data', 'import', 'comments', str(comments), '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        newest_id = Comment.query.filter_by(content='Newest').one().id
+        thread = db.session.get(Thread, thread_id)
+        subcategory = db.session.get(Subcategory, subcategory_id)
+        assert thread.last_post_id == newest_id
+        assert subcategory.last_post_id == newest_id
+        assert subcategory.last_thread_id == thread_id
+        assert str(thread.last_activity_at) == '2030-01-02 00:00:00'
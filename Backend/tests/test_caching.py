@@ -0,0 +1,149 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.caching import invalidate
+from app.models import User, Category
+from config import TestConfig
+
+
+class CachingTestConfig(TestConfig):
+    CACHE_TYPE = 'SimpleCache'
+
+
+@pytest.fixture
+def cached_client():
+    """
+    Fixture som skapar en testklient med aktiverad cache.
+    """
+    app = create_app(CachingTestConfig)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _auth_headers(app):
+    with app.app_context():
+        user = User(username="cacheuser", username_lower="cacheuser", email="cacheuser@example.com")
+        db.session.add(user)
+        db.session.commit()
+        return {"Authorization": f"Bearer {create_access_token(identity=user.id)}"}
+
+
+def test_categories_are_cached_until_tag_is_invalidated(cached_client):
+    """
+    Testa att kategorilistan cachas och att den uppdateras först när taggen 'category' rensas.
+    """
+    assert cached_client.get("/forum/categories").json == []
+
+    with cached_client.application.app_context():
+        db.session.add(Category(name="Overclocking"))
+        db.session.commit()
+
+    assert cached_client.get("/forum/categories").json == []
+
+    with cached_client.application.app_context():
+        invalidate('category')
+
+    assert [c["name"] for c in cached_client.get("/forum/categories").json] == ["Overclocking"]
+
+
+def test_post_snippet_purges_snippet_listings(cached_client):
+    """
+    Testa att en ny snippet rensar både den ofiltrerade och den språkfiltrerade listan.
+    """
+    headers = _auth_headers(cached_client.application)
+    assert cached_client.get("/snippets").json["snippets"] == []
+    assert cached_client.get("/snippets?language=python").json["snippets"] == []
+
+    response = cached_client.post(
+        "/snippets",
+        json={"title": "Hello", "language": "python", "code": "print('hello')"},
+        headers=headers
+    )
+    assert response.status_code == 201
+
+    assert [s["title"] for s in cached_client.get("/snippets").json["snippets"]] == ["Hello"]
+    assert [s["title"] for s in cached_client.get("/snippets?language=python").json["snippets"]] == ["Hello"]
+
+
+def _seed_snippets(app, languages):
+    from app.models import Snippet
+    with app.app_context():
+        user = User(username="snippetuser", username_lower="snippetuser", email="snippetuser@example.com")
+        db.session.add(user)
+        db.session.flush()
+        for language in languages:
+            db.session.add(Snippet(title=f"{language} snippet", language=language, code="...", user_id=user.id))
+        db.session.commit()
+
+
+def test_snippet_cache_key_includes_whitelisted_query_args(cached_client):
+    """
+    Testa att språkfiltret ingår i cachenyckeln och att okända parametrar ignoreras.
+    """
+    from app.caching import key_stats
+
+    _seed_snippets(cached_client.application, ["haskell", "ocaml"])
+
+    assert [s["language"] for s in cached_client.get("/snippets?language=haskell").json["snippets"]] == ["haskell"]
+    assert [s["language"] for s in cached_client.get("/snippets?language=ocaml").json["snippets"]] == ["ocaml"]
+
+    response = cached_client.get("/snippets?language=%20haskell%20&limit=020&utm_source=spam")
+    assert [s["language"] for s in response.json["snippets"]] == ["haskell"]
+
+    stats = key_stats()["view//snippets?language=haskell&limit=20"]
+    assert stats["misses"] >= 1
+    assert stats["hits"] >= 1
+
+
+def test_empty_snippet_listings_are_not_cached(cached_client):
+    """
+    Testa att listor utan träffar inte cachas, så att slumpade filtervärden inte fyller cachen.
+    """
+    from app.caching import key_stats
+
+    cached_client.get("/snippets?language=brainfudge")
+    cached_client.get("/snippets?language=brainfudge")
+
+    assert key_stats()["view//snippets?language=brainfudge&limit=20"]["hits"] == 0
+
+
+def test_cache_lookups_do_not_create_tag_keys(cached_client):
+    """
+    Testa att läsningar inte skapar taggnycklar, så att klienter inte kan fylla
+    cachen med taggar genom att variera filtervärden.
+    """
+    from app import cache
+    from app.caching import TAG_KEY_PREFIX
+
+    _seed_snippets(cached_client.application, ["zig"])
+    for language in ["zig", "nim", "odin"]:
+        cached_client.get(f"/snippets?language={language}")
+
+    with cached_client.application.app_context():
+        assert cache.get(TAG_KEY_PREFIX + "snippets:lang:nim") is None
+        assert cache.get(TAG_KEY_PREFIX + "snippets:lang:zig") is None
+        invalidate("snippets:lang:zig")
+        assert cache.get(TAG_KEY_PREFIX + "snippets:lang:zig") is not None
+
+
+def test_cache_stats_requires_super_admin(cached_client):
+    """
+    Testa att cachestatistiken bara visas för superadministratörer.
+    """
+    app = cached_client.application
+    headers = _auth_headers(app)
+    assert cached_client.get("/admin/cache-stats", headers=headers).status_code == 403
+
+    with app.app_context():
+        User.query.filter_by(username="cacheuser").update({"role": "super_admin"})
+        db.session.commit()
+
+    cached_client.get("/forum/categories")
+    response = cached_client.get("/admin/cache-stats", headers=headers)
+    assert response.status_code == 200
+    assert "view//forum/categories" in [entry["key"] for entry in response.json]
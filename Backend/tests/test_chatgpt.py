@@ -0,0 +1,259 @@
+import json
+import os
+import signal
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.chatgpt import ChatGPTBusy, get_chatgpt
+from app.models import User
+from config import TestConfig
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """
+    Lokal fejkserver för OpenAI:s chat completions som strömmar svaret i
+    bitar. `release` styr när svaret får skickas, `requests` sparar anropen
+    och `api_keys` nycklarna de gjordes med.
+    """
+    tokens = ["Raise ", "the ", "vcore ", "slowly."]
+    release = threading.Event()
+    requests = []
+    api_keys = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests.append(body)
+        self.api_keys.append(self.headers['Authorization'].removeprefix('Bearer '))
+        if not self.release.wait(timeout=5):
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for token in self.tokens:
+            chunk = {
+                'id': 'chatcmpl-test', 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeOpenAI.release.set()
+    FakeOpenAI.requests.clear()
+    FakeOpenAI.api_keys.clear()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    FakeOpenAI.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def chat_client(fake_openai):
+    """
+    Fixture för en testklient vars ChatGPT-tjänst pratar med fejkservern,
+    med en enda plats och kort timeout.
+    """
+    class ChatConfig(TestConfig):
+        OPENAI_BASE_URL = fake_openai
+        CHATGPT_MAX_CONCURRENCY = 1
+        CHATGPT_TIMEOUT = 1
+
+    app = create_app(ChatConfig)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            user = User(username="asker", email="asker@example.com")
+            db.session.add(user)
+            db.session.commit()
+            client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {create_access_token(identity=user.id)}"
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_ask_returns_complete_answer(chat_client):
+    """
+    Testa att frågan skickas till OpenAI och att svaret returneras som JSON.
+    """
+    response = chat_client.post("/chatgpt/ask", json={"question": "Safe vcore?"})
+    assert response.status_code == 200
+    assert response.json["answer"] == "Raise the vcore slowly."
+    assert FakeOpenAI.requests[0]["messages"] == [{"role": "user", "content": "Safe vcore?"}]
+    assert FakeOpenAI.requests[0]["stream"] is True
+
+
+def test_ask_streams_tokens(chat_client):
+    """
+    Testa att svaret strömmas som Server-Sent Events.
+    """
+    response = chat_client.post(
+        "/chatgpt/ask", json={"question": "Safe vcore?"}, headers={"Accept": "text/event-stream"}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = response.get_data(as_text=True).strip().split("\n\n")
+    tokens = [json.loads(event[len("data: "):])["token"] for event in events if event.startswith("data: ")]
+    assert tokens == FakeOpenAI.tokens
+    assert events[-1].startswith("event: done")
+
+
+def test_ask_rejects_when_busy(chat_client):
+    """
+    Testa att en fråga avvisas med 503 när alla platser är upptagna.
+    """
+    FakeOpenAI.release.clear()
+    with chat_client.application.app_context():
+        pending = get_chatgpt().stream("Occupy the only slot")
+        with pytest.raises(ChatGPTBusy):
+            get_chatgpt().stream("Second question")
+
+    response = chat_client.post("/chatgpt/ask", json={"question": "Safe vcore?"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+    FakeOpenAI.release.set()
+    assert "".join(pending) == "Raise the vcore slowly."
+
+
+def test_ask_times_out(chat_client):
+    """
+    Testa att ett för långsamt svar ger 504.
+    """
+    FakeOpenAI.release.clear()
+    response = chat_client.post("/chatgpt/ask", json={"question": "Safe vcore?"})
+    assert response.status_code == 504
+    FakeOpenAI.release.set()
+
+
+def test_ask_requires_question(chat_client):
+    """
+    Testa att en fråga krävs.
+    """
+    response = chat_client.post("/chatgpt/ask", json={})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def cached_chat_client(fake_openai):
+    """
+    Fixture för en testklient med svarscache i en SimpleCache.
+    """
+    class CachedChatConfig(TestConfig):
+        OPENAI_BASE_URL = fake_openai
+        CHATGPT_MAX_CONCURRENCY = 1
+        CHATGPT_TIMEOUT = 2
+        CACHE_TYPE = 'SimpleCache'
+
+    app = create_app(CachedChatConfig)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            user = User(username="asker", email="asker@example.com", role="super_admin")
+            db.session.add(user)
+            db.session.commit()
+            client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {create_access_token(identity=user.id)}"
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_repeated_question_is_answered_from_cache(cached_chat_client):
+    """
+    Testa att samma fråga, oavsett skiftläge och blanksteg, bara ställs till OpenAI en gång.
+    """
+    first = cached_chat_client.post("/chatgpt/ask", json={"question": "Safe vcore?"})
+    second = cached_chat_client.post("/chatgpt/ask", json={"question": "  SAFE   vcore? "})
+    assert first.json["answer"] == second.json["answer"] == "Raise the vcore slowly."
+    assert len(FakeOpenAI.requests) == 1
+
+    stats = cached_chat_client.get("/admin/chatgpt-stats").json
+    assert stats["hits"] == 1
+    assert stats["upstream_calls"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_concurrent_questions_share_one_upstream_call(cached_chat_client):
+    """
+    Testa att samtidiga identiska frågor följer samma anrop i stället för att avvisas.
+    """
+    FakeOpenAI.release.clear()
+    with cached_chat_client.application.app_context():
+        service = get_chatgpt()
+        leader = service.stream("Safe vcore?")
+        follower = service.stream("safe vcore?")
+        FakeOpenAI.release.set()
+        assert "".join(follower) == "Raise the vcore slowly."
+        assert "".join(leader) == "Raise the vcore slowly."
+        assert service.stats()["deduplicated"] == 1
+
+    assert len(FakeOpenAI.requests) == 1
+
+
+def test_api_key_is_rotated_from_key_file(fake_openai, tmp_path):
+    """
+    Testa att nyckeln läses en gång från nyckelfilen och byts vid omladdning,
+    även via SIGHUP, utan att klienten byggs om per anrop.
+    """
+    key_file = tmp_path / "openai_key"
+    key_file.write_text("sk-first\n")
+
+    class RotatingConfig(TestConfig):
+        OPENAI_BASE_URL = fake_openai
+        OPENAI_API_KEY_FILE = str(key_file)
+        CHATGPT_KEY_REFRESH_INTERVAL = 0
+
+    previous_handler = signal.getsignal(signal.SIGHUP)
+    try:
+        app = create_app(RotatingConfig)
+        with app.app_context():
+            service = get_chatgpt()
+            assert service.ask("First question") == "Raise the vcore slowly."
+            assert service.reload_credentials() is False
+
+            key_file.write_text("sk-second\n")
+            os.kill(os.getpid(), signal.SIGHUP)
+            assert service.ask("Second question") == "Raise the vcore slowly."
+    finally:
+        signal.signal(signal.SIGHUP, previous_handler)
+
+    assert FakeOpenAI.api_keys == ["sk-first", "sk-second"]
+
+
+def test_cancelled_question_makes_no_upstream_call(cached_chat_client):
+    """
+    Testa att en fråga vars alla väntande har gått inte ställs till OpenAI,
+    varken efter väntan på en annan process eller direkt.
+    """
+    import hashlib
+    from app.chatgpt import LOCK_KEY_PREFIX, ChatGPTError, _Flight, normalize_question
+
+    with cached_chat_client.application.app_context():
+        service = get_chatgpt()
+        key = hashlib.sha256(normalize_question("Safe vcore?").encode()).hexdigest()
+        # En annan process håller på med samma fråga
+        service.shared_cache.add(LOCK_KEY_PREFIX + key, 1)
+        for locked in (True, False):
+            if not locked:
+                service.shared_cache.delete(LOCK_KEY_PREFIX + key)
+            flight = _Flight()
+            flight.cancelled.set()
+            service._run("Safe vcore?", key, flight)
+            assert flight.done
+            assert isinstance(flight.error, ChatGPTError)
+
+    assert FakeOpenAI.requests == []
+    assert service.stats()["upstream_calls"] == 0
@@ -68,3 +68,181 @@ def test_create_thread_invalid_data(test_client, test_user_token):
     response = test_client.post("/forum/threads", json={"title": "Only Title"}, headers=headers)
     assert response.status_code == 400
     assert "Invalid input" in response.json["message"]
+
+
+def _seed_threads(app, count):
+    """
+    Hjälpfunktion som skapar en subkategori med `count` trådar och returnerar dess ID.
+    """
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import User, Category, Subcategory, Thread
+
+    with app.app_context():
+        user = User(username="author", username_lower="author", email="author@example.com", password="password")
+        category = Category(name="Seed Category")
+        db.session.add_all([user, category])
+        db.session.flush()
+        subcategory = Subcategory(name="Seed Subcategory", category_id=category.id)
+        db.session.add(subcategory)
+        db.session.flush()
+
+        start = datetime(2025, 1, 1)
+        for i in range(count):
+            db.session.add(Thread(
+                title=f"Thread {i}",
+                content="This is a seeded thread",
+                created_at=start + timedelta(minutes=i),
+                user_id=user.id,
+                subcategory_id=subcategory.id
+            ))
+        db.session.commit()
+        return subcategory.id
+
+
+def test_get_threads_in_subcategory_paginates_with_cursor(test_client):
+    """
+    Testa att trådlistan pagineras med cursor och att alla trådar returneras exakt en gång.
+    """
+    subcategory_id = _seed_threads(test_client.application, 5)
+
+    first = test_client.get(f"/forum/subcategories/{subcategory_id}/threads?limit=2")
+    assert first.status_code == 200
+    assert [t["title"] for t in first.json["threads"]] == ["Thread 4", "Thread 3"]
+    assert "content" not in first.json["threads"][0]
+    assert first.json["threads"][0]["author"]["username"] == "author"
+    assert first.json["next_cursor"]
+
+    seen = [t["id"] for t in first.json["threads"]]
+    cursor = first.json["next_cursor"]
+    while cursor:
+        page = test_client.get(f"/forum/subcategories/{subcategory_id}/threads?limit=2&cursor={cursor}")
+        assert page.status_code == 200
+        seen += [t["id"] for t in page.json["threads"]]
+        cursor = page.json["next_cursor"]
+
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_get_threads_in_subcategory_invalid_cursor(test_client):
+    """
+    Testa att en ogiltig cursor ger 400.
+    """
+    subcategory_id = _seed_threads(test_client.application, 1)
+    response = test_client.get(f"/forum/subcategories/{subcategory_id}/threads?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert "cursor" in response.json["errors"]
+
+
+def test_get_threads_in_subcategory_rejects_cursor_of_other_sort(test_client):
+    """
+    Testa att en cursor från en sortering ger 400 med en annan sortering.
+    """
+    subcategory_id = _seed_threads(test_client.application, 3)
+    url = f"/forum/subcategories/{subcategory_id}/threads?limit=1"
+
+    created_cursor = test_client.get(url).json["next_cursor"]
+    activity_cursor = test_client.get(f"{url}&sort=activity").json["next_cursor"]
+    assert test_client.get(f"{url}&sort=activity&cursor={created_cursor}").status_code == 400
+    assert test_client.get(f"{url}&sort=created&cursor={activity_cursor}").status_code == 400
+    assert test_client.get(f"{url}&sort=activity&cursor={activity_cursor}").status_code == 200
+
+
+def test_get_thread_pages_comments(test_client):
+    """
+    Testa att en tråd returnerar första sidan kommentarer och att resten hämtas via cursor.
+    """
+    from datetime import datetime, timedelta
+    from app import db
+    from app.models import Thread, Comment
+
+    subcategory_id = _seed_threads(test_client.application, 1)
+    with test_client.application.app_context():
+        thread = Thread.query.filter_by(subcategory_id=subcategory_id).first()
+        start = datetime(2025, 2, 1)
+        for i in range(5):
+            db.session.add(Comment(content=f"Comment {i}", created_at=start + timedelta(minutes=i),
+                                   user_id=thread.user_id, thread_id=thread.id))
+        db.session.commit()
+        thread_id = thread.id
+
+    response = test_client.get(f"/forum/threads/{thread_id}?limit=2")
+    assert response.status_code == 200
+    assert response.json["content"] == "This is a seeded thread"
+    assert [c["content"] for c in response.json["comments"]] == ["Comment 0", "Comment 1"]
+
+    cursor = response.json["next_cursor"]
+    page = test_client.get(f"/forum/threads/{thread_id}/comments?limit=2&cursor={cursor}")
+    assert page.status_code == 200
+    assert [c["content"] for c in page.json["comments"]] == ["Comment 2", "Comment 3"]
+
+    last = test_client.get(f"/forum/threads/{thread_id}/comments?limit=2&cursor={page.json['next_cursor']}")
+    assert [c["content"] for c in last.json["comments"]] == ["Comment 4"]
+    assert last.json["next_cursor"] is None
+
+
+def test_posting_updates_activity_stats(test_client, test_user_token):
+    """
+    Testa att nya trådar och kommentarer räknas i subkategorin och tråden,
+    och att trådlistan kan sorteras på senaste aktivitet.
+    """
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    category_id = test_client.post("/forum/categories", json={"name": "Stats"}, headers=headers).json["category"]["id"]
+    subcategory_id = test_client.post(
+        f"/forum/categories/{category_id}/subcategories", json={"name": "Counters"}, headers=headers
+    ).json["subcategory"]["id"]
+
+    thread_ids = [
+        test_client.post(
+            "/forum/threads",
+            json={"title": title, "content": "Thread content", "subcategory_id": subcategory_id},
+            headers=headers
+        ).json["thread"]["id"]
+        for title in ("First", "Second")
+    ]
+    comment = test_client.post(
+        f"/forum/threads/{thread_ids[0]}/comments", json={"content": "Bumping this thread"}, headers=headers
+    )
+    assert comment.status_code == 201
+
+    subcategory = test_client.get("/forum/categories").json[0]["subcategories"][0]
+    assert subcategory["thread_count"] == 2
+    assert subcategory["comment_count"] == 1
+    assert subcategory["last_post_id"] == comment.json["comment"]["id"]
+    assert subcategory["last_thread"] == {"id": thread_ids[0], "title": "First"}
+
+    response = test_client.get(f"/forum/subcategories/{subcategory_id}/threads?sort=activity")
+    assert [thread["id"] for thread in response.json["threads"]] == thread_ids
+    assert response.json["threads"][0]["comment_count"] == 1
+
+    response = test_client.post("/forum/threads/999/comments", json={"content": "Lost comment text"}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_recount_command_repairs_stats(test_client):
+    """
+    Testa att `flask forum recount` räknar om statistik som har glidit isär.
+    """
+    from app import db
+    from app.models import Subcategory, Thread, Comment, User
+
+    app = test_client.application
+    subcategory_id = _seed_threads(app, 3)
+    with app.app_context():
+        thread = Thread.query.filter_by(subcategory_id=subcategory_id).order_by(Thread.id).first()
+        user_id = User.query.first().id
+        db.session.add(Comment(content="Unrecorded", user_id=user_id, thread_id=thread.id))
+        db.session.commit()
+        thread_id = thread.id
+
+    result = app.test_cli_runner().invoke(args=["forum", "recount"])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        subcategory = db.session.get(Subcategory, subcategory_id)
+        thread = db.session.get(Thread, thread_id)
+        assert subcategory.thread_count == 3
+        assert subcategory.comment_count == 1
+        assert thread.comment_count == 1
+        assert subcategory.last_thread_id == thread_id
+        assert subcategory.last_post_id == thread.last_post_id
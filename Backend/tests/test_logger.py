@@ -0,0 +1,89 @@
+import json
+import logging
+import queue
+from app.logger import BoundedQueueHandler, JsonFormatter, REQUEST_ID_HEADER
+
+
+def capture(test_client, max_field_length=50, maxsize=0):
+    """
+    Kopplar en egen köhanterare till appens logger och returnerar den och kön.
+    """
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = BoundedQueueHandler(log_queue, max_field_length)
+    test_client.application.logger.addHandler(handler)
+    return handler, log_queue
+
+
+def drain(log_queue):
+    records = []
+    while not log_queue.empty():
+        records.append(json.loads(JsonFormatter().format(log_queue.get_nowait())))
+    return records
+
+
+def test_requests_are_logged_as_json_lines(test_client):
+    """
+    Testar att varje anrop loggas som JSON med request id, route och latens,
+    och att request id skickas tillbaka i svaret.
+    """
+    handler, log_queue = capture(test_client)
+    try:
+        response = test_client.get('/forum/categories', headers={REQUEST_ID_HEADER: 'abc123'})
+    finally:
+        test_client.application.logger.removeHandler(handler)
+
+    assert response.headers[REQUEST_ID_HEADER] == 'abc123'
+    [entry] = [entry for entry in drain(log_queue) if entry['message'] == 'request completed']
+    assert entry['request_id'] == 'abc123'
+    assert entry['route'] == 'forum.forum_get_categories'
+    assert entry['method'] == 'GET'
+    assert entry['status'] == 200
+    assert entry['latency_ms'] >= 0
+
+
+def test_long_fields_are_truncated(test_client):
+    """
+    Testar att långa meddelanden och fält kortas av innan de köas.
+    """
+    handler, log_queue = capture(test_client, max_field_length=10)
+    logger = test_client.application.logger
+    try:
+        logger.info("x" * 100, extra={'body': "y" * 100})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed %s", "here")
+    finally:
+        logger.removeHandler(handler)
+
+    truncated, failed = drain(log_queue)
+    assert truncated['message'] == "x" * 10 + "... [90 more characters]"
+    assert truncated['body'].startswith("y" * 10 + "...")
+    assert failed['message'] == "failed her... [1 more characters]"
+    assert 'ValueError: boom' in failed['exception']
+
+
+def test_full_queue_drops_and_counts(test_client):
+    """
+    Testar att en full kö inte blockerar utan räknar bortkastade poster.
+    """
+    from prometheus_client import REGISTRY
+
+    dropped = REGISTRY.get_sample_value('log_records_dropped_total')
+    handler, log_queue = capture(test_client, maxsize=2)
+    logger = test_client.application.logger
+    try:
+        for i in range(5):
+            logger.warning("message %d", i)
+    finally:
+        logger.removeHandler(handler)
+
+    assert log_queue.qsize() == 2
+    assert REGISTRY.get_sample_value('log_records_dropped_total') == dropped + 3
+
+
+def test_level_comes_from_config(test_client):
+    """
+    Testar att loggnivån sätts från LOG_LEVEL.
+    """
+    assert test_client.application.logger.level == logging.getLevelName(test_client.application.config['LOG_LEVEL'])
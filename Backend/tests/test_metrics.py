@@ -0,0 +1,96 @@
+from prometheus_client.parser import text_string_to_metric_families
+from app import create_app, db
+from config import TestConfig
+
+
+def sample(test_client, name, **labels):
+    """
+    Läser ett värde från /metrics, 0 om serien saknas.
+    """
+    text = test_client.get('/metrics').get_data(as_text=True)
+    for family in text_string_to_metric_families(text):
+        for metric in family.samples:
+            if metric.name == name and all(metric.labels.get(k) == v for k, v in labels.items()):
+                return metric.value
+    return 0
+
+
+def test_requests_are_measured(test_client, test_user_token):
+    """
+    Testar att latens och SQL-satser per endpoint hamnar i /metrics.
+    """
+    endpoint = 'profile.get_profile'
+    before = sample(test_client, 'http_request_duration_seconds_count', endpoint=endpoint, status='200')
+    statements_before = sample(test_client, 'db_statements_per_request_sum', endpoint=endpoint)
+
+    response = test_client.get('/profile', headers={'Authorization': f'Bearer {test_user_token}'})
+    assert response.status_code == 200
+
+    assert sample(test_client, 'http_request_duration_seconds_count', endpoint=endpoint, status='200') == before + 1
+    assert sample(test_client, 'db_statements_per_request_sum', endpoint=endpoint) >= statements_before + 1
+    assert test_client.get('/metrics').content_type.startswith('text/plain')
+
+
+def test_failed_statements_leave_no_state_on_connection(test_client):
+    """
+    Testar att en sats som misslyckas inte lämnar kvar något på den poolade
+    anslutningen.
+    """
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    with test_client.application.app_context():
+        connection = db.session.connection()
+        def snapshot():
+            return {key: list(value) if isinstance(value, list) else value
+                    for key, value in connection.info.items()}
+
+        before = snapshot()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM no_such_table"))
+        assert snapshot() == before
+
+
+def test_rate_limited_requests_are_counted(test_client):
+    """
+    Testar att 429-beslut från limitern räknas per endpoint.
+    """
+    endpoint = 'forum.forum_get_latest_posts'
+    before = sample(test_client, 'rate_limited_requests_total', endpoint=endpoint)
+    statuses = [test_client.get('/forum/latest').status_code for _ in range(11)]
+    assert statuses.count(429) == 1
+    assert sample(test_client, 'rate_limited_requests_total', endpoint=endpoint) == before + 1
+
+
+def test_cache_hits_and_misses_are_counted():
+    """
+    Testar att träffar och missar i vy-cachen räknas.
+    """
+    class CachingConfig(TestConfig):
+        CACHE_TYPE = 'SimpleCache'
+
+    app = create_app(CachingConfig)
+    client = app.test_client()
+    endpoint = 'forum.forum_get_categories'
+    with app.app_context():
+        db.create_all()
+    hits = sample(client, 'cache_requests_total', endpoint=endpoint, result='hit')
+    misses = sample(client, 'cache_requests_total', endpoint=endpoint, result='miss')
+    client.get('/forum/categories')
+    client.get('/forum/categories')
+    assert sample(client, 'cache_requests_total', endpoint=endpoint, result='miss') == misses + 1
+    assert sample(client, 'cache_requests_total', endpoint=endpoint, result='hit') == hits + 1
+
+
+def test_metrics_token():
+    """
+    Testar att /metrics kräver token när METRICS_AUTH_TOKEN är satt.
+    """
+    class TokenConfig(TestConfig):
+        METRICS_AUTH_TOKEN = 'scrape-secret'
+
+    client = create_app(TokenConfig).test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
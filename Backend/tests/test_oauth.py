@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import create_app, db
+from app.models import User
+from config import TestConfig
+
+
+class FakeProviders(BaseHTTPRequestHandler):
+    """
+    Lokal stub för GitHubs och Googles API:er. `calls` sparar anropade
+    sökvägar med tidpunkter och `failures` låter en sökväg svara 503 ett
+    antal gånger innan den lyckas. Ett svar i form av bytes skickas som det är.
+    """
+    delay = 0.3
+    calls = []
+    failures = {}
+    responses = {
+        '/github/user': {'id': 42, 'login': 'Octocat'},
+        '/github/user/emails': [
+            {'email': 'old@example.com', 'primary': False, 'verified': True},
+            {'email': 'octocat@example.com', 'primary': True, 'verified': True},
+        ],
+        '/google/oauth2/v2/userinfo': {'id': '1001', 'name': 'Googler', 'email': 'googler@example.com'},
+    }
+
+    def do_GET(self):
+        self.calls.append((self.path, time.monotonic()))
+        if self.failures.get(self.path):
+            self.failures[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        time.sleep(self.delay)
+        body = self.responses[self.path]
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def oauth_client():
+    """
+    Fixture för en testklient vars OAuth-anrop går till stubservern.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeProviders)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeProviders.calls.clear()
+    FakeProviders.failures.clear()
+
+    class OAuthConfig(TestConfig):
+        GITHUB_API_URL = f"http://127.0.0.1:{server.server_port}/github"
+        GOOGLE_API_URL = f"http://127.0.0.1:{server.server_port}/google"
+        CACHE_TYPE = 'SimpleCache'
+
+    app = create_app(OAuthConfig)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+    server.shutdown()
+    server.server_close()
+
+
+def _login(client, provider, token="token-1"):
+    with client.session_transaction() as session:
+        session[f"{provider}_oauth_token"] = {"access_token": token, "token_type": "bearer"}
+    return client.get(f"/oauth/callback/{provider}")
+
+
+def test_github_login_fetches_profile_concurrently(oauth_client):
+    """
+    Testa att GitHub-anropen görs samtidigt och att användaren skapas.
+    """
+    response = _login(oauth_client, "github")
+    assert response.status_code == 200
+    assert response.json["username"] == "Octocat"
+
+    started = [at for _, at in FakeProviders.calls]
+    assert len(started) == 2
+    assert abs(started[0] - started[1]) < FakeProviders.delay
+
+    with oauth_client.application.app_context():
+        user = User.query.filter_by(oauth_provider="github", oauth_id="42").one()
+        assert user.email == "octocat@example.com"
+
+
+def test_login_finds_user_by_provider_account_and_caches_profile(oauth_client):
+    """
+    Testa att en återkommande användare hittas via sitt leverantörskonto och
+    att profilen cachas per åtkomsttoken.
+    """
+    assert _login(oauth_client, "google").status_code == 200
+    assert _login(oauth_client, "google").status_code == 200
+    assert len(FakeProviders.calls) == 1
+
+    FakeProviders.responses['/google/oauth2/v2/userinfo']['name'] = 'Renamed'
+    try:
+        response = _login(oauth_client, "google", token="token-2")
+    finally:
+        FakeProviders.responses['/google/oauth2/v2/userinfo']['name'] = 'Googler'
+    assert response.status_code == 200
+    assert response.json["username"] == "Googler"
+
+    with oauth_client.application.app_context():
+        assert User.query.count() == 1
+
+
+def test_provider_errors_are_retried(oauth_client):
+    """
+    Testa att tillfälliga 503-svar görs om och att bestående fel ger 502.
+    """
+    FakeProviders.failures['/google/oauth2/v2/userinfo'] = 1
+    assert _login(oauth_client, "google").status_code == 200
+
+    FakeProviders.failures['/github/user'] = 10
+    response = _login(oauth_client, "github")
+    assert response.status_code == 502
+
+
+def test_malformed_profiles_are_provider_errors(oauth_client):
+    """
+    Testa att ett svar som inte är JSON och en profil utan id ger 502.
+    """
+    path = '/google/oauth2/v2/userinfo'
+    profile = FakeProviders.responses[path]
+    try:
+        FakeProviders.responses[path] = b'<html>Maintenance</html>'
+        assert _login(oauth_client, "google").status_code == 502
+
+        FakeProviders.responses[path] = {'name': 'Nameless', 'email': 'nameless@example.com'}
+        assert _login(oauth_client, "google", token="token-2").status_code == 502
+    finally:
+        FakeProviders.responses[path] = profile
+
+    with oauth_client.application.app_context():
+        assert User.query.count() == 0
+
+
+def test_unexpected_github_emails_are_provider_errors(oauth_client):
+    """
+    Testa att ett e-postsvar från GitHub som inte är en lista med objekt ger 502.
+    """
+    path = '/github/user/emails'
+    emails = FakeProviders.responses[path]
+    try:
+        FakeProviders.responses[path] = {'message': 'Requires authentication'}
+        assert _login(oauth_client, "github").status_code == 502
+
+        FakeProviders.responses[path] = ['octocat@example.com']
+        assert _login(oauth_client, "github", token="token-2").status_code == 502
+    finally:
+        FakeProviders.responses[path] = emails
+
+    with oauth_client.application.app_context():
+        assert User.query.count() == 0
+
+
+def test_login_does_not_take_over_existing_username(oauth_client):
+    """
+    Testa att en OAuth-inloggning inte loggar in på ett befintligt konto med samma användarnamn.
+    """
+    with oauth_client.application.app_context():
+        db.session.add(User(username="octocat", username_lower="octocat", email="someone@example.com"))
+        db.session.commit()
+
+    response = _login(oauth_client, "github")
+    assert response.status_code == 409
@@ -0,0 +1,93 @@
+from datetime import datetime
+from flask_caching.backends import SimpleCache
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import User
+from app.presence import PresenceTracker, get_presence
+
+
+def make_users(test_client, count):
+    """
+    Skapar användare med ett gammalt last_seen och returnerar deras id:n och tokens.
+    """
+    with test_client.application.app_context():
+        users = [
+            User(username=f"user{i}", email=f"user{i}@example.com", last_seen=datetime(2020, 1, 1))
+            for i in range(count)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [(user.id, create_access_token(identity=user.id)) for user in users]
+
+
+def test_requests_are_written_in_one_batch(test_client, assert_max_queries):
+    """
+    Testar att autentiserade anrop inte skriver till databasen direkt och att
+    flush skriver alla användares last_seen med en enda sats.
+    """
+    users = make_users(test_client, 3)
+    with assert_max_queries(6) as statements:
+        for _, token in users:
+            test_client.get('/profile', headers={'Authorization': f'Bearer {token}'})
+    assert not any(statement.startswith('UPDATE') for statement in statements)
+
+    with test_client.application.app_context():
+        with assert_max_queries(1) as statements:
+            assert get_presence().flush() == 3
+        assert 'VALUES' in statements[0]
+        assert all(user.last_seen > datetime(2020, 1, 1) for user in User.query.all())
+
+
+def test_last_seen_is_written_once_per_interval(test_client):
+    """
+    Testar att en användare skrivs högst en gång per PRESENCE_WRITE_INTERVAL.
+    """
+    [(user_id, token)] = make_users(test_client, 1)
+    headers = {'Authorization': f'Bearer {token}'}
+    with test_client.application.app_context():
+        presence = get_presence()
+        test_client.get('/profile', headers=headers)
+        assert presence.flush() == 1
+        test_client.get('/profile', headers=headers)
+        assert presence.flush() == 0
+
+        presence.record(user_id, now=presence._claimed[user_id] + presence.write_interval)
+        assert presence.flush() == 1
+
+
+def test_throttle_is_shared_between_workers():
+    """
+    Testar att två processer som delar cache bara köar en skrivning per intervall.
+    """
+    shared = SimpleCache()
+    first = PresenceTracker(shared, write_interval=300, online_window=300)
+    second = PresenceTracker(shared, write_interval=300, online_window=300)
+    first.record(1)
+    second.record(1)
+    second.record(2)
+    assert set(first._pending) == {1}
+    assert set(second._pending) == {2}
+
+
+def test_online_users_are_shared_without_user_queries(test_client, assert_max_queries):
+    """
+    Testar att online-listan delas mellan processer via cachen och aldrig
+    frågar användartabellen.
+    """
+    shared = SimpleCache()
+    first = PresenceTracker(shared, write_interval=300, online_window=300)
+    second = PresenceTracker(shared, write_interval=300, online_window=300)
+    first.record(1, now=1000)
+    second.record(2, now=1100)
+    first.record(3, now=500)
+    first._pending.clear()
+    second._pending.clear()
+    first.flush(now=1100)
+    second.flush(now=1100)
+    assert PresenceTracker(shared, 300, 300).online_user_ids(now=1200) == [1, 2]
+
+    [(user_id, token)] = make_users(test_client, 1)
+    test_client.get('/profile', headers={'Authorization': f'Bearer {token}'})
+    with assert_max_queries(0):
+        response = test_client.get('/profile/online')
+    assert response.json == {'count': 1, 'user_ids': [user_id]}
@@ -0,0 +1,233 @@
+import io
+import os
+import pytest
+from PIL import Image
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import TestConfig
+
+
+def png_upload(width=300, height=200, color='red', name='avatar.png'):
+    """
+    Skapar en PNG i minnet som kan skickas som multipart-fil.
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    buffer.seek(0)
+    return {'file': (buffer, name)}
+
+
+@pytest.fixture
+def upload_folder(test_client, tmp_path):
+    """
+    Fixture som lägger uppladdningar i en temporär katalog.
+    """
+    test_client.application.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+
+def make_token(test_client, username):
+    with test_client.application.app_context():
+        user = User(username=username, email=f"{username}@example.com", password="password")
+        db.session.add(user)
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def test_upload_stores_resized_variants(test_client, test_user_token, upload_folder):
+    """
+    Testar att en uppladdad bild sparas i alla storlekar som WebP och JPEG
+    under sin innehållshash.
+    """
+    response = test_client.post(
+        '/profile/upload', data=png_upload(), content_type='multipart/form-data',
+        headers={'Authorization': f'Bearer {test_user_token}'}
+    )
+    assert response.status_code == 200
+    pictures = response.json['profile_pictures']
+    assert set(pictures) == {'32', '64', '256'}
+    assert response.json['profile_picture'] == pictures['256']['jpeg']
+
+    files = sorted(os.listdir(upload_folder / 'avatars'))
+    assert len(files) == 6
+    for name in files:
+        size = int(name.rsplit('-', 1)[1].split('.')[0])
+        with Image.open(upload_folder / 'avatars' / name) as image:
+            assert image.size == (size, size)
+            assert image.format == ('WEBP' if name.endswith('.webp') else 'JPEG')
+        assert pictures[str(size)]['webp' if name.endswith('.webp') else 'jpeg'].endswith('uploads/avatars/' + name)
+
+
+def test_identical_uploads_are_deduplicated(test_client, test_user_token, upload_folder):
+    """
+    Testar att två användare som laddar upp samma bild delar samma filer.
+    """
+    other_token = make_token(test_client, 'otheruser')
+    first = test_client.post(
+        '/profile/upload', data=png_upload(), content_type='multipart/form-data',
+        headers={'Authorization': f'Bearer {test_user_token}'}
+    )
+    second = test_client.post(
+        '/profile/upload', data=png_upload(name='copy.png'), content_type='multipart/form-data',
+        headers={'Authorization': f'Bearer {other_token}'}
+    )
+    assert first.json['profile_pictures'] == second.json['profile_pictures']
+    assert len(os.listdir(upload_folder / 'avatars')) == 6
+
+
+def test_concurrent_identical_uploads(tmp_path):
+    """
+    Testar att samtidiga uppladdningar av samma bild i en process inte skriver
+    till samma tillfälliga fil.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from app.avatars import store_avatar
+
+    image = png_upload()['file'][0].getvalue()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda _: store_avatar(io.BytesIO(image), str(tmp_path), (32, 64, 256), 40_000_000), range(8)
+        ))
+    assert len(set(results)) == 1
+    assert len(os.listdir(tmp_path / 'avatars')) == 6
+    assert os.listdir(tmp_path / '.tmp') == []
+
+
+def test_upload_rejects_invalid_image(test_client, test_user_token, upload_folder):
+    """
+    Testar att en fil som inte är en bild avvisas utan att något sparas.
+    """
+    response = test_client.post(
+        '/profile/upload', data={'file': (io.BytesIO(b'not an image'), 'avatar.png')},
+        content_type='multipart/form-data', headers={'Authorization': f'Bearer {test_user_token}'}
+    )
+    assert response.status_code == 400
+    assert os.listdir(upload_folder / 'avatars') == []
+    assert os.listdir(upload_folder / '.tmp') == []
+
+
+def test_profiles_include_picture_variants(test_client, test_user_token, upload_folder):
+    """
+    Testar att både den egna och den publika profilen innehåller bildvarianterna.
+    """
+    headers = {'Authorization': f'Bearer {test_user_token}'}
+    uploaded = test_client.post(
+        '/profile/upload', data=png_upload(), content_type='multipart/form-data', headers=headers
+    ).json['profile_pictures']
+
+    own = test_client.get('/profile', headers=headers).json
+    public = test_client.get('/profile/users/TestUser').json
+    assert own['profile_pictures'] == uploaded
+    assert public['profile_pictures'] == uploaded
+    assert public['profile_picture'] == uploaded['256']['jpeg']
+
+
+def test_legacy_picture_is_used_for_every_size(test_client, test_user_token):
+    """
+    Testar att en gammal profilbild utan varianter används för alla storlekar.
+    """
+    response = test_client.get('/profile/users/testuser')
+    pictures = response.json['profile_pictures']
+    assert all(variant == {'webp': pictures['32']['jpeg'], 'jpeg': pictures['32']['jpeg']} for variant in pictures.values())
+    assert response.json['profile_picture'].endswith('uploads/default.jpg')
+
+
+def test_bulk_profiles_in_one_query(test_client, test_user_token, assert_max_queries):
+    """
+    Testar att många profiler hämtas med en enda fråga, i efterfrågad ordning.
+    """
+    for name in ('alice', 'bob'):
+        make_token(test_client, name)
+    with test_client.application.app_context():
+        ids = {user.username: user.id for user in User.query.all()}
+
+    with assert_max_queries(1):
+        response = test_client.get(f"/profile/users?ids={ids['bob']},{ids['testuser']}&usernames=ALICE,bob,ghost")
+    assert response.status_code == 200
+    assert [user['username'] for user in response.json['users']] == ['bob', 'testuser', 'alice']
+    assert response.json['users'][0]['stats'] == {'threads': 0, 'comments': 0, 'snippets': 0}
+    assert 'email' not in response.json['users'][0]
+
+    assert test_client.get('/profile/users').status_code == 400
+    assert test_client.get('/profile/users?ids=1,x').status_code == 400
+    assert test_client.get('/profile/users?ids=' + ','.join(['1'] * 101)).status_code == 400
+
+
+def test_posts_update_user_stats(test_client, test_user_token):
+    """
+    Testar att trådar, kommentarer och snippets räknas på författaren och
+    att borttagningar räknas ned.
+    """
+    headers = {'Authorization': f'Bearer {test_user_token}'}
+    category_id = test_client.post('/forum/categories', json={'name': 'Stats'}, headers=headers).json['category']['id']
+    subcategory_id = test_client.post(
+        f'/forum/categories/{category_id}/subcategories', json={'name': 'Users'}, headers=headers
+    ).json['subcategory']['id']
+    thread_id = test_client.post(
+        '/forum/threads', json={'title': 'Hello', 'content': 'Thread content', 'subcategory_id': subcategory_id},
+        headers=headers
+    ).json['thread']['id']
+    test_client.post(f'/forum/threads/{thread_id}/comments', json={'content': 'First comment'}, headers=headers)
+    snippet_ids = [
+        test_client.post(
+            '/snippets', json={'title': f'Snippet {i}', 'language': 'python', 'code': 'print(1)'}, headers=headers
+        ).json['snippet']['id']
+        for i in range(2)
+    ]
+    assert test_client.get('/profile/users/testuser').json['stats'] == {'threads': 1, 'comments': 1, 'snippets': 2}
+
+    test_client.delete(f'/snippets/{snippet_ids[0]}', headers=headers)
+    assert test_client.get('/profile/users/testuser').json['stats']['snippets'] == 1
+
+
+class ProfileCacheConfig(TestConfig):
+    CACHE_TYPE = 'SimpleCache'
+
+
+@pytest.fixture
+def cached_client():
+    """
+    Fixture för en testklient med aktiverad cache.
+    """
+    app = create_app(ProfileCacheConfig)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_profiles_are_cached_until_user_changes(cached_client, assert_max_queries):
+    """
+    Testar att profiler cachas och rensas när användaren ändras eller skriver något.
+    """
+    token = make_token(cached_client, 'cached')
+    headers = {'Authorization': f'Bearer {token}'}
+    cached_client.get('/profile/users?usernames=cached')
+
+    with assert_max_queries(0):
+        assert cached_client.get('/profile/users/Cached').json['title'] is None
+
+    cached_client.put('/profile/users/cached', json={'title': 'Overclocker', 'displayName': 'C'}, headers=headers)
+    assert cached_client.get('/profile/users/cached').json['title'] == 'Overclocker'
+
+    cached_client.post('/snippets', json={'title': 'Cached', 'language': 'c', 'code': 'int x;'}, headers=headers)
+    assert cached_client.get('/profile/users/cached').json['stats']['snippets'] == 1
+
+
+def test_users_recount_command(test_client, test_user_token):
+    """
+    Testar att `flask users recount` räknar om statistik som har glidit isär.
+    """
+    app = test_client.application
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.snippet_count = 7
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['users', 'recount'])
+    assert result.exit_code == 0, result.output
+    assert test_client.get('/profile/users/testuser').json['stats']['snippets'] == 0
@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, Category, Subcategory, Thread, Comment, Snippet, News
+
+AUTHORS = 5
+
+
+@pytest.fixture
+def seeded(test_client):
+    """
+    Fixture som skapar flera författare med trådar, kommentarer, snippets och nyheter,
+    så att en lat inladdning av författaren per rad syns i antalet SQL-satser.
+    """
+    with test_client.application.app_context():
+        category = Category(name="Category")
+        db.session.add(category)
+        db.session.flush()
+        subcategory = Subcategory(name="Subcategory", category_id=category.id)
+        db.session.add(subcategory)
+        db.session.flush()
+
+        start = datetime(2025, 1, 1)
+        thread_ids = []
+        news_ids = []
+        for i in range(AUTHORS):
+            user = User(username=f"user{i}", username_lower=f"user{i}", email=f"user{i}@example.com")
+            db.session.add(user)
+            db.session.flush()
+            thread = Thread(title=f"Thread {i}", content="Thread content", created_at=start + timedelta(minutes=i),
+                            user_id=user.id, subcategory_id=subcategory.id)
+            news = News(title=f"News {i}", content="News content", user_id=user.id)
+            db.session.add_all([thread, news])
+            db.session.flush()
+            thread_ids.append(thread.id)
+            news_ids.append(news.id)
+            db.session.add(Snippet(title=f"Snippet {i}", language="python", code="print()", user_id=user.id))
+
+        # Every author comments on the first thread and the first news article
+        for user in User.query.all():
+            db.session.add(Comment(content="A comment on the thread", user_id=user.id, thread_id=thread_ids[0]))
+            db.session.add(Comment(content="A comment on the news", user_id=user.id, news_id=news_ids[0]))
+        db.session.commit()
+
+        return {'subcategory_id': subcategory.id, 'thread_id': thread_ids[0], 'news_id': news_ids[0]}
+
+
+@pytest.mark.parametrize("path, max_queries", [
+    ("/forum/subcategories/{subcategory_id}/threads", 2),
+    ("/forum/threads/{thread_id}", 2),
+    ("/forum/threads/{thread_id}/comments", 2),
+    ("/snippets", 1),
+    ("/news", 2),
+    ("/news/{news_id}/comments", 2),
+])
+def test_listing_query_count(test_client, seeded, assert_max_queries, path, max_queries):
+    """
+    Testa att listningarna inte laddar författaren med en egen SELECT per rad.
+    """
+    with assert_max_queries(max_queries):
+        response = test_client.get(path.format(**seeded))
+    assert response.status_code == 200
+
+
+def test_snippet_listing_returns_paginated_previews(test_client, seeded):
+    """
+    Testa att snippetlistan pagineras och bara innehåller en förhandsvisning av koden.
+    """
+    first = test_client.get("/snippets?limit=3")
+    assert first.status_code == 200
+    assert len(first.json["snippets"]) == 3
+    assert "code" not in first.json["snippets"][0]
+    assert first.json["snippets"][0]["code_preview"] == "print()"
+
+    rest = test_client.get(f"/snippets?limit=3&cursor={first.json['next_cursor']}")
+    assert len(rest.json["snippets"]) == AUTHORS - 3
+    assert rest.json["next_cursor"] is None
@@ -0,0 +1,143 @@
+import json
+import pytest
+from app import create_app, db
+from app.models import User, Category, Subcategory, Thread
+from app.query_profiler import statement_shape
+from config import TestConfig
+
+
+class ProfilerConfig(TestConfig):
+    QUERY_PROFILER_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = 10_000
+    N_PLUS_ONE_THRESHOLD = 3
+
+
+@pytest.fixture
+def profiled_app():
+    """
+    Fixture för en app med SQL-profileraren påslagen och en route med N+1-mönster.
+    """
+    app = create_app(ProfilerConfig)
+
+    @app.route('/lazy-authors')
+    def lazy_authors():
+        return {'authors': [thread.author.username for thread in Thread.query.all()]}
+
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Profiling')
+        db.session.add(category)
+        db.session.flush()
+        subcategory = Subcategory(name='Queries', category_id=category.id)
+        db.session.add(subcategory)
+        db.session.flush()
+        for i in range(4):
+            user = User(username=f'author{i}', email=f'author{i}@example.com')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Thread(title=f'Thread {i}', content='Content', user_id=user.id,
+                                  subcategory_id=subcategory.id))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def reports(caplog):
+    return [record.query_report for record in caplog.records if hasattr(record, 'query_report')]
+
+
+def test_statement_shape_ignores_parameters():
+    """
+    Testar att satser som bara skiljer sig i parametrar får samma form.
+    """
+    assert statement_shape("SELECT * FROM user WHERE id IN (?, ?, ?)") == \
+        statement_shape("SELECT *\n FROM user WHERE id IN (?)")
+    assert statement_shape("SELECT * FROM user WHERE id = %(pk_1)s") == \
+        statement_shape("SELECT * FROM user WHERE id = %(pk_2)s")
+
+
+def test_repeated_statements_are_reported(profiled_app, caplog):
+    """
+    Testar att lata laddningar av författare rapporteras med route och rad.
+    """
+    with caplog.at_level('WARNING', logger='Backend'):
+        response = profiled_app.test_client().get('/lazy-authors')
+    assert response.status_code == 200
+
+    [report] = [report for report in reports(caplog) if report['type'] == 'n_plus_one']
+    assert report['route'] == 'lazy_authors'
+    assert report['count'] == 4
+    assert 'FROM user' in report['statement']
+    assert report['location'].startswith('tests/test_query_profiler.py:')
+
+
+def test_slow_statements_are_reported_with_plan(profiled_app, caplog):
+    """
+    Testar att långsamma satser loggas med sin EXPLAIN-plan.
+    """
+    profiled_app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+    with caplog.at_level('WARNING', logger='Backend'):
+        profiled_app.test_client().get('/forum/latest')
+
+    slow = [report for report in reports(caplog) if report['type'] == 'slow_query']
+    assert slow
+    assert all(report['route'] == 'forum.forum_get_latest_posts' for report in slow)
+    assert any('SCAN' in line or 'SEARCH' in line for report in slow for line in report['plan'])
+
+
+def test_failed_explain_is_rolled_back_to_savepoint():
+    """
+    Testar att en EXPLAIN som misslyckas utanför SQLite rullas tillbaka till
+    en savepoint, så att requestens transaktion kan fortsätta.
+    """
+    from types import SimpleNamespace
+    from app.query_profiler import _explain
+
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, parameters=None):
+            executed.append(sql.split(' ')[0])
+            if sql.startswith('EXPLAIN'):
+                raise RuntimeError('cannot plan')
+
+        def close(self):
+            pass
+
+    connection = SimpleNamespace(
+        dialect=SimpleNamespace(name='postgresql'),
+        connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=Cursor)),
+    )
+    assert _explain(connection, 'SELECT 1', {}) == ['EXPLAIN failed: cannot plan']
+    assert executed == ['SAVEPOINT', 'EXPLAIN', 'ROLLBACK']
+
+
+def test_profiler_is_off_by_default(test_client, caplog):
+    """
+    Testar att profileraren inte rapporterar något om den inte är påslagen.
+    """
+    with caplog.at_level('WARNING', logger='Backend'):
+        test_client.get('/forum/latest')
+    assert reports(caplog) == []
+
+
+def test_report_command_aggregates_logs(profiled_app, tmp_path):
+    """
+    Testar att `flask queries report` summerar rapporterna i loggfilen.
+    """
+    report = {'type': 'n_plus_one', 'route': 'forum.get_thread', 'location': 'app/routes/forum.py:10 in get_thread',
+              'statement': 'SELECT user.id FROM user WHERE user.id = ?', 'count': 20, 'duration_ms': 4.0}
+    log = tmp_path / 'app.log'
+    log.write_text('\n'.join([
+        json.dumps({'message': 'request completed'}),
+        'not json',
+        json.dumps({'query_report': report}),
+        json.dumps({'query_report': {**report, 'count': 30, 'duration_ms': 6.0}}),
+    ]))
+
+    result = profiled_app.test_cli_runner().invoke(args=['queries', 'report', '--log', str(log)])
+    assert result.exit_code == 0, result.output
+    assert 'n_plus_one  2x  forum.get_thread  app/routes/forum.py:10 in get_thread' in result.output
+    assert 'total 10.0 ms, max 6.0 ms, up to 30 statements per request' in result.output
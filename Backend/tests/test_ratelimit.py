@@ -0,0 +1,70 @@
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter, FixedWindowRateLimiter
+from flask_jwt_extended import create_access_token
+from app.ratelimit import SQLiteStorage, rate_limit_key
+
+
+def test_sqlite_storage_moving_window_is_shared_between_instances(tmp_path):
+    """
+    Testa att två lagringsinstanser mot samma fil delar räknare, som två workers gör.
+    """
+    uri = f"sqlite:///{tmp_path / 'ratelimits.db'}"
+    first = MovingWindowRateLimiter(storage_from_string(uri))
+    second = MovingWindowRateLimiter(storage_from_string(uri))
+    limit = parse("3 per minute")
+
+    assert isinstance(first.storage, SQLiteStorage)
+    assert first.hit(limit, "user:1")
+    assert second.hit(limit, "user:1")
+    assert first.hit(limit, "user:1")
+    assert not second.hit(limit, "user:1")
+    assert second.hit(limit, "user:2")
+
+    assert first.get_window_stats(limit, "user:1").remaining == 0
+
+
+def test_sqlite_storage_fixed_window_and_cost(tmp_path):
+    """
+    Testa fast fönster och att en träff med högre kostnad dras av fullt ut.
+    """
+    limiter = FixedWindowRateLimiter(storage_from_string(f"sqlite:///{tmp_path / 'ratelimits.db'}"))
+    limit = parse("10 per minute")
+
+    assert limiter.hit(limit, "ip:127.0.0.1", cost=8)
+    assert not limiter.hit(limit, "ip:127.0.0.1", cost=3)
+
+    limiter.clear(limit, "ip:127.0.0.1")
+    assert limiter.get_window_stats(limit, "ip:127.0.0.1").remaining == 10
+
+
+def test_rate_limit_key_uses_jwt_identity_or_ip(test_client):
+    """
+    Testa att nyckeln är användarens ID med giltig token och IP-adressen annars.
+    """
+    app = test_client.application
+    with app.app_context():
+        token = create_access_token(identity=42)
+
+    with app.test_request_context("/", headers={"Authorization": f"Bearer {token}"}):
+        assert rate_limit_key() == "user:42"
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        assert rate_limit_key() == "ip:10.0.0.1"
+    with app.test_request_context("/", headers={"Authorization": "Bearer garbage"},
+                                  environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        assert rate_limit_key() == "ip:10.0.0.1"
+
+
+def test_breached_limit_is_logged(test_client, caplog):
+    """
+    Testa att ett 429-beslut loggas strukturerat.
+    """
+    for _ in range(10):
+        test_client.get("/forum/latest")
+    with caplog.at_level("WARNING", logger="Backend"):
+        response = test_client.get("/forum/latest")
+
+    assert response.status_code == 429
+    record = next(r for r in caplog.records if getattr(r, "rate_limit", None))
+    assert record.rate_limit["endpoint"] == "forum.forum_get_latest_posts"
+    assert record.rate_limit["key"] == "ip:127.0.0.1"
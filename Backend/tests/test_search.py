@@ -0,0 +1,130 @@
+import pytest
+from app import db
+from app.models import User, Category, Subcategory, Thread, Comment, Snippet, News
+
+
+@pytest.fixture
+def corpus(test_client):
+    """
+    Fixture som skapar en tråd, en kommentar, en snippet och en nyhet som alla
+    nämner "overclocking", så att sökningen träffar alla fyra typerna.
+    """
+    with test_client.application.app_context():
+        user = User(username="author", username_lower="author", email="author@example.com")
+        category = Category(name="Hardware")
+        db.session.add_all([user, category])
+        db.session.flush()
+        subcategory = Subcategory(name="CPU", category_id=category.id)
+        db.session.add(subcategory)
+        db.session.flush()
+
+        thread = Thread(title="Overclocking a Ryzen", content="Voltage and <b>cooling</b> tips",
+                        user_id=user.id, subcategory_id=subcategory.id)
+        news = News(title="Memory prices", content="Overclocking memory got cheaper", user_id=user.id)
+        snippet = Snippet(title="Fan curve", language="python", description="Script for overclocking fans",
+                          code="set_fan(100)", user_id=user.id)
+        db.session.add_all([thread, news, snippet])
+        db.session.flush()
+        comment = Comment(content="I tried overclocking too", user_id=user.id, thread_id=thread.id)
+        db.session.add(comment)
+        db.session.commit()
+
+        return {'thread_id': thread.id, 'news_id': news.id, 'snippet_id': snippet.id, 'comment_id': comment.id}
+
+
+def test_search_ranks_all_kinds(test_client, corpus):
+    """
+    Testa att sökningen hittar alla typer och rankar titelträffen högst.
+    """
+    response = test_client.get("/search?q=overclock")
+    assert response.status_code == 200
+
+    results = response.json['results']
+    assert {hit['type'] for hit in results} == {'thread', 'comment', 'snippet', 'news'}
+    assert results[0]['type'] == 'thread'
+    assert results[0]['id'] == corpus['thread_id']
+    assert [hit['rank'] for hit in results] == sorted((hit['rank'] for hit in results), reverse=True)
+
+    comment = next(hit for hit in results if hit['type'] == 'comment')
+    assert comment['thread_id'] == corpus['thread_id']
+    assert comment['news_id'] is None
+
+
+def test_search_highlight_is_escaped(test_client, corpus):
+    """
+    Testa att träffar markeras med <mark> och att övrig HTML escapas.
+    """
+    response = test_client.get("/search?q=cooling&type=thread")
+    assert response.status_code == 200
+
+    highlight = response.json['results'][0]['highlight']
+    assert '<mark>cooling</mark>' in highlight
+    assert '&lt;b&gt;' in highlight
+    assert '<b>' not in highlight
+
+
+def test_search_type_filter_and_pagination(test_client, corpus):
+    """
+    Testa filtrering på typ och sidindelning.
+    """
+    response = test_client.get("/search?q=overclocking&type=snippet,news")
+    assert {hit['type'] for hit in response.json['results']} == {'snippet', 'news'}
+
+    response = test_client.get("/search?q=overclocking&per_page=1&page=2")
+    assert response.status_code == 200
+    assert len(response.json['results']) == 1
+    assert response.json['has_next'] is True
+
+    response = test_client.get("/search?q=overclocking&type=user")
+    assert response.status_code == 400
+
+
+def test_search_index_follows_changes(test_client, corpus):
+    """
+    Testa att indexet följer uppdateringar och borttagningar.
+    """
+    with test_client.application.app_context():
+        snippet = db.session.get(Snippet, corpus['snippet_id'])
+        snippet.description = "Script for quiet fans"
+        db.session.delete(db.session.get(Comment, corpus['comment_id']))
+        db.session.commit()
+
+    response = test_client.get("/search?q=overclocking")
+    assert {hit['type'] for hit in response.json['results']} == {'thread', 'news'}
+
+    response = test_client.get("/search?q=quiet")
+    assert [hit['id'] for hit in response.json['results']] == [corpus['snippet_id']]
+
+
+def test_new_comment_does_not_reindex_thread(test_client, corpus):
+    """
+    Testa att räknaruppdateringen av tråden vid en ny kommentar inte skriver
+    om trådens rad i sökindexet.
+    """
+    from app.forum_stats import record_comment
+
+    with test_client.application.app_context():
+        thread = db.session.get(Thread, corpus['thread_id'])
+        statements = []
+        db.session.connection().connection.driver_connection.set_trace_callback(statements.append)
+        try:
+            comment = Comment(content="Mine runs at 5 GHz", user_id=thread.user_id, thread_id=thread.id)
+            db.session.add(comment)
+            record_comment(comment, thread)
+            db.session.commit()
+        finally:
+            db.session.connection().connection.driver_connection.set_trace_callback(None)
+
+    thread_update = next(i for i, sql in enumerate(statements) if sql.startswith("UPDATE thread"))
+    assert not any("search_index" in sql for sql in statements[thread_update:])
+
+    response = test_client.get("/search?q=ghz")
+    assert [hit['type'] for hit in response.json['results']] == ['comment']
+
+
+def test_search_requires_query(test_client):
+    """
+    Testa att en tom sökning ger 400.
+    """
+    response = test_client.get("/search?q=%20*%20")
+    assert response.status_code == 400
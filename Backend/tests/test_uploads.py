@@ -0,0 +1,95 @@
+import pytest
+from app import create_app
+from config import TestConfig
+
+VARIANT = 'avatars/' + 'a' * 64 + '-64.webp'
+
+
+@pytest.fixture
+def upload_folder(test_client, tmp_path):
+    """
+    Fixture med en uppladdningskatalog som innehåller en hashad variant och
+    en gammal profilbild.
+    """
+    (tmp_path / 'avatars').mkdir()
+    (tmp_path / VARIANT).write_bytes(b'0123456789' * 10)
+    (tmp_path / 'legacy.jpg').write_bytes(b'legacy picture')
+    test_client.application.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+
+def test_variant_is_cached_as_immutable(test_client, upload_folder):
+    """
+    Testar att hashade varianter cachas i ett år och kan valideras med ETag.
+    """
+    response = test_client.get(f'/uploads/{VARIANT}')
+    assert response.status_code == 200
+    assert response.data == b'0123456789' * 10
+    assert response.mimetype == 'image/webp'
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert response.headers['Last-Modified']
+
+    revalidated = test_client.get(f'/uploads/{VARIANT}', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+
+def test_legacy_file_is_revalidated(test_client, upload_folder):
+    """
+    Testar att övriga filer bara cachas kort och inte är immutable.
+    """
+    response = test_client.get('/uploads/legacy.jpg')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age == TestConfig.UPLOADS_MAX_AGE
+
+
+def test_range_request(test_client, upload_folder):
+    """
+    Testar att en del av filen kan hämtas med Range.
+    """
+    response = test_client.get(f'/uploads/{VARIANT}', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == b'0123456789'
+    assert response.headers['Content-Range'] == 'bytes 10-19/100'
+
+
+def test_missing_and_outside_files(test_client, upload_folder):
+    """
+    Testar att saknade filer och sökvägar utanför katalogen ger 404.
+    """
+    assert test_client.get('/uploads/missing.jpg').status_code == 404
+    assert test_client.get('/uploads/../config.py').status_code == 404
+    assert test_client.get('/uploads/avatars').status_code == 404
+
+
+def test_temporary_files_are_not_served(test_client, upload_folder):
+    """
+    Testar att ofärdiga uppladdningar och andra filer än varianter och gamla
+    profilbilder ger 404.
+    """
+    (upload_folder / '.tmp').mkdir()
+    (upload_folder / '.tmp' / 'raw.upload').write_bytes(b'unvalidated')
+    (upload_folder / 'avatars' / 'raw.upload').write_bytes(b'unvalidated')
+    (upload_folder / f'{VARIANT}.1.2.partial').write_bytes(b'half')
+
+    for name in ['.tmp/raw.upload', 'avatars/raw.upload', f'{VARIANT}.1.2.partial']:
+        assert test_client.get(f'/uploads/{name}').status_code == 404
+
+
+def test_accel_redirect(upload_folder):
+    """
+    Testar att nginx får skicka filen när UPLOADS_ACCEL_REDIRECT_PREFIX är satt.
+    """
+    class AccelConfig(TestConfig):
+        UPLOAD_FOLDER = str(upload_folder)
+        UPLOADS_ACCEL_REDIRECT_PREFIX = '/protected-uploads/'
+
+    app = create_app(AccelConfig)
+    response = app.test_client().get(f'/uploads/{VARIANT}')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/{VARIANT}'
+    assert response.mimetype == 'image/webp'
+    assert response.cache_control.immutable
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import api from '../../services/api';
+import { askChatGPTStream } from '../../services/api';
 
 const Chat: React.FC = () => {
   const [question, setQuestion] = useState('');
@@ -7,9 +7,9 @@ const Chat: React.FC = () => {
 
   const handleAsk = async (e: React.FormEvent) => {
     e.preventDefault();
+    setAnswer('');
     try {
-      const response = await api.post('/chatgpt/ask', { question });
-      setAnswer(response.data.answer);
+      await askChatGPTStream(question, (token) => setAnswer((previous) => previous + token));
     } catch (error) {
       console.error(error);
       alert('Kunde inte få svar från ChatGPT');
@@ -6,8 +6,7 @@ interface Snippet {
   id: number;
   title: string;
   language: string;
-  code: string;
-  description: string;
+  code_preview: string;
   author: string;
   created_at: string;
 }
@@ -20,7 +19,7 @@ const SnippetList: React.FC = () => {
     const fetchSnippets = async () => {
       try {
         const response = await api.get('/snippets/', { params: { language } });
-        setSnippets(response.data);
+        setSnippets(response.data.snippets);
       } catch (error) {
         console.error(error);
         alert('Could not fetch codesnippets');
@@ -55,7 +54,7 @@ const SnippetList: React.FC = () => {
           </Link>
           <p className="text-gray-600">Language: {snippet.language} | By {snippet.author} | {new Date(snippet.created_at).toLocaleString()}</p>
           <pre className="bg-gray-100 p-2 mt-2 overflow-auto">
-            <code>{snippet.code.substring(0, 200)}...</code>
+            <code>{snippet.code_preview}...</code>
           </pre>
         </div>
       ))}
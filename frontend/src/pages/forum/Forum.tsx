@@ -5,13 +5,13 @@ import api from '../../services/api';
 interface Subcategory {
   id: number;
   name: string;
-  threadCount: number;
-  postCount: number;
-  latestPost: {
+  thread_count: number;
+  comment_count: number;
+  last_activity_at: string | null;
+  last_post_id: number | null;
+  last_thread: {
     id: number;
     title: string;
-    createdAt: string;
-    author: { id: number; username: string };
   } | null;
 }
 
@@ -106,15 +106,16 @@ const Forum: React.FC = () => {
                         {subcategory.name}
                       </Link>
                     </div>
-                    <div className="w-1/4 text-center">{subcategory.threadCount}</div>
-                    <div className="w-1/4 text-center">{subcategory.postCount}</div>
+                    <div className="w-1/4 text-center">{subcategory.thread_count}</div>
+                    <div className="w-1/4 text-center">{subcategory.thread_count + subcategory.comment_count}</div>
                     <div className="w-1/4 text-right">
-                      {subcategory.latestPost ? (
+                      {subcategory.last_thread ? (
                         <Link
-                          to={`/forum/thread/${subcategory.latestPost.id}`}
+                          to={`/forum/thread/${subcategory.last_thread.id}`}
                           className="text-[#C3BFC0] hover:text-[#F19A57] hover:underline"
                         >
-                          {subcategory.latestPost.title} by {subcategory.latestPost.author.username}
+                          {subcategory.last_thread.title}
+                          {subcategory.last_activity_at && ` (${new Date(subcategory.last_activity_at).toLocaleString()})`}
                         </Link>
                       ) : (
                         'No posts yet'
@@ -21,7 +21,7 @@ const SubcategoryThreads: React.FC = () => {
     const fetchThreads = async () => {
       try {
         const response = await api.get(`/forum/subcategories/${id}/threads`);
-        setThreads(response.data);
+        setThreads(response.data.threads);
       } catch (err) {
         console.error('Failed to fetch threads:', err);
         setError('Failed to load threads. Please try again later.');
@@ -5,7 +5,7 @@ import api from '../../services/api';
 interface Snippet {
   id: number;
   title: string;
-  content: string;
+  code_preview: string;
   language: string;
   created_at: string;
 }
@@ -21,7 +21,7 @@ const CodeSnippets: React.FC = () => {
     const fetchSnippets = async () => {
       try {
         const response = await api.get('/snippets');
-        setSnippets(response.data);
+        setSnippets(response.data.snippets);
       } catch (error) {
         console.error('Failed to fetch snippets:', error);
       }
@@ -46,7 +46,7 @@ const CodeSnippets: React.FC = () => {
       const response = await api.get(`/snippets`, {
         params: { search, language },
       });
-      setSnippets(response.data);
+      setSnippets(response.data.snippets);
     } catch (error) {
       console.error('Failed to search snippets:', error);
     }
@@ -98,7 +98,7 @@ const CodeSnippets: React.FC = () => {
                 {snippet.language}
               </p>
               <pre className="bg-gray-100 dark:bg-gray-800 p-3 rounded text-sm text-gray-900 dark:text-gray-200 overflow-auto">
-                {snippet.content.slice(0, 100)}...
+                {snippet.code_preview.slice(0, 100)}...
               </pre>
               <div className="mt-4">
                 <button className="px-4 py-2 text-white bg-blue-500 hover:bg-blue-600 rounded">
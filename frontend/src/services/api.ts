@@ -48,10 +48,10 @@ export const getForumCategories = async () => {
   }
 };
 
-export const getThreadsInSubcategory = async (subcategoryId: number) => {
+export const getThreadsInSubcategory = async (subcategoryId: number, cursor?: string) => {
   try {
-    const response = await api.get(`/forum/subcategories/${subcategoryId}/threads`);
-    return response.data || [];
+    const response = await api.get(`/forum/subcategories/${subcategoryId}/threads`, { params: { cursor } });
+    return response.data || { threads: [], next_cursor: null };
   } catch (error) {
     console.error('Error fetching threads:', error);
     throw error;
@@ -100,6 +100,19 @@ export const getUserProfile = async (username: string) => {
   }
 };
 
+// Hämtar många profiler (t.ex. alla författare på en sida) med ett anrop, max 100
+export const getUserProfiles = async ({ ids = [], usernames = [] }: { ids?: number[]; usernames?: string[] }) => {
+  try {
+    const response = await api.get('/profile/users', {
+      params: { ids: ids.join(',') || undefined, usernames: usernames.join(',') || undefined },
+    });
+    return response.data.users;
+  } catch (error) {
+    console.error('Error fetching user profiles:', error);
+    throw error;
+  }
+};
+
 export const updateUserProfile = async (
   username: string,
   data: {
@@ -121,5 +134,41 @@ export const updateUserProfile = async (
   }
 };
 
+// API för ChatGPT -- strömmar svaret som Server-Sent Events
+export const askChatGPTStream = async (question: string, onToken: (token: string) => void) => {
+  const token = localStorage.getItem('access_token');
+  const response = await fetch(`${API_URL}/chatgpt/ask`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ question }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`ChatGPT request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop() ?? '';
+    for (const event of events) {
+      if (event.startsWith('event: error')) {
+        throw new Error('Error communicating with OpenAI');
+      }
+      if (event.startsWith('data: ')) {
+        onToken(JSON.parse(event.slice('data: '.length)).token);
+      }
+    }
+  }
+};
+
 
 export default api;